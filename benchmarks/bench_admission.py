@@ -0,0 +1,136 @@
+"""Всплеск просмотра меню: задержка админов и заказов с допуском и без.
+
+Обработчик держит одно из db-slots мест «базы» work-ms миллисекунд, как
+запросы к пулу читателей. Меню приходит с частотой rate, больше, чем база
+успевает, заказы и действия админа — по одному на каждые ratio апдейтов
+меню. Без допуска все стоят в одной очереди к базе, с допуском заказы и
+админы обгоняют меню, а лишнее меню получает ответ «попробуйте еще раз».
+Задержка — от прихода апдейта до конца обработки.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_admission --browse 3000 --rate 1000 --work-ms 10
+"""
+
+import argparse
+import asyncio
+import datetime
+import time
+
+from aiogram import Bot, Dispatcher, Router
+from aiogram.client.session.base import BaseSession
+from aiogram.types import CallbackQuery, Chat, Message, Update, User
+
+from benchmarks.common import summary_ms
+from middlewares.admission import CLASSES, AdmissionMiddleware
+
+TOKEN = "42:BENCH"
+ADMIN_ID = 1
+
+
+class OfflineSession(BaseSession):
+    """Сессия без сети: все методы успешны"""
+
+    async def make_request(self, bot, method, timeout=None):
+        return True
+
+    async def stream_content(self, *args, **kwargs):
+        yield b""
+
+    async def close(self):
+        pass
+
+
+def callback(update_id: int, user_id: int, data: str) -> Update:
+    return Update(
+        update_id=update_id,
+        callback_query=CallbackQuery(
+            id=str(update_id),
+            chat_instance="bench",
+            from_user=User(id=user_id, is_bot=False, first_name="Load"),
+            message=Message(
+                message_id=update_id,
+                date=datetime.datetime.now(),
+                chat=Chat(id=user_id, type="private"),
+                text="menu",
+            ),
+            data=data,
+        ),
+    )
+
+
+def workload(args) -> list:
+    """Апдейты всплеска и их класс для отчета"""
+    updates = []
+    for i in range(args.browse):
+        update_id = len(updates) + 1
+        updates.append((2, callback(update_id, 1000 + i, "category_1")))
+        if i % args.ratio == 0:
+            updates.append((1, callback(update_id + 1, 1000 + i, "checkout")))
+            updates.append((0, callback(update_id + 2, ADMIN_ID, "admin_view_stats")))
+    return updates
+
+
+async def run(args, admission: bool):
+    database = asyncio.Semaphore(args.db_slots)
+    router = Router()
+
+    @router.callback_query()
+    async def handle(call: CallbackQuery):
+        async with database:
+            await asyncio.sleep(args.work_ms / 1000)
+        await call.answer()
+
+    dp = Dispatcher()
+    middleware = None
+    if admission:
+        middleware = AdmissionMiddleware(
+            [ADMIN_ID],
+            limit=args.limit,
+            max_wait=args.max_wait,
+            max_queue=args.max_queue,
+        )
+        dp.callback_query.outer_middleware(middleware)
+    dp.include_router(router)
+    bot = Bot(TOKEN, session=OfflineSession())
+
+    latencies = {priority: [] for priority in CLASSES}
+
+    async def feed(priority: int, update: Update):
+        started = time.perf_counter()
+        await dp.feed_update(bot, update)
+        latencies[priority].append(time.perf_counter() - started)
+
+    tasks = []
+    started = time.perf_counter()
+    for index, item in enumerate(workload(args)):
+        delay = started + index / args.rate - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(feed(*item)))
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - started
+
+    print(f"admission={admission}: {elapsed:.2f}s")
+    for priority, name in CLASSES.items():
+        shed = middleware.shed[priority] if middleware else 0
+        print(f"  {name}: {summary_ms(latencies[priority])} shed={shed}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--browse", type=int, default=3000)
+    parser.add_argument("--rate", type=float, default=1000, help="апдейтов в секунду")
+    parser.add_argument("--ratio", type=int, default=50)
+    parser.add_argument("--work-ms", type=float, default=10)
+    parser.add_argument("--db-slots", type=int, default=4)
+    parser.add_argument("--limit", type=int, default=8)
+    parser.add_argument("--max-wait", type=float, default=2)
+    parser.add_argument("--max-queue", type=int, default=500)
+    args = parser.parse_args()
+
+    for admission in (False, True):
+        await run(args, admission)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,70 @@
+"""Задержка нажатий +/- в корзине: SQL на каждое нажатие против CartStore.
+
+Каждое нажатие как в handlers/cart.py: изменение количества и перерисовка
+корзины через get_cart_items.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_cart --users 200 --taps 50
+"""
+
+import argparse
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.common import seed_database, summary_ms
+from services.database import Database
+
+
+async def run(db_path: Path, cart_store: bool, users: int, taps: int, dishes: int):
+    db = Database(db_path, group_commit=True, cart_store=cart_store)
+    await db.connect()
+
+    latencies = []
+
+    async def client(user_id: int):
+        for i in range(taps):
+            dish_id = (user_id + i) % dishes + 1
+            started = time.perf_counter()
+            if i % 3 == 2:
+                await db.decrease_quantity(user_id, dish_id)
+            else:
+                await db.add_to_cart(user_id, dish_id, "", 0)
+            await db.get_cart_items(user_id)
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client(user_id) for user_id in range(1, users + 1)))
+    elapsed = time.perf_counter() - started
+    batches = db.write_queue.batches
+    await db.close()
+
+    print(
+        f"cart_store={cart_store}: {summary_ms(latencies)} "
+        f"throughput={len(latencies) / elapsed:.0f} taps/s write_batches={batches}"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--dishes", type=int, default=100)
+    parser.add_argument("--taps", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "bench.sqlite3"
+        db = Database(db_path, readers=0)
+        await db.connect()
+        await db.close()
+        seed_database(
+            db_path, users=args.users, dishes=args.dishes, orders=0, cart_lines=0
+        )
+
+        for cart_store in (False, True):
+            await run(db_path, cart_store, args.users, args.taps, args.dishes)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,161 @@
+"""Одновременные нажатия в одном чате: с очередью чата и без нее.
+
+Каждый из users пользователей жмет «➕» в корзине taps раз сразу, не
+дожидаясь ответа, а потом дважды отправляет телефон на последнем шаге
+заказа. Апдейты идут через настоящие обработчики и middleware из loader с
+сессией, которая не ходит в Telegram. Проверяем итоговое количество в
+базе, что корзина не перерисовывалась старым количеством поверх нового и
+что второй телефон не получил ответ «Ваша корзина пуста».
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_contention --users 100 --taps 10
+"""
+
+import argparse
+import asyncio
+import os
+import re
+import sqlite3
+import sys
+import tempfile
+import time
+
+from benchmarks.common import seed_database, summary_ms
+
+EMPTY_CART_TEXT = "Ваша корзина пуста"
+QUANTITY = re.compile(r" x(\d+) = ")
+
+
+async def run(args):
+    os.environ.setdefault("BOT_TOKEN", "42:TEST")
+    os.environ.setdefault("FSM_STORAGE", "memory")
+    os.environ.setdefault("ADMIN_IDS", "0")
+
+    from aiogram import Dispatcher
+    from aiogram.types import Update
+
+    import loader
+    from benchmarks.offline import RecordingSession, Updates
+    from handlers import register_all_handlers
+    from handlers.order import OrderProcess
+    from middlewares import register_all_middlewares
+    from states import CartActions
+
+    updates = Updates()
+
+    bot, dp, db = await loader.setup()
+    session = RecordingSession()
+    bot.session = session
+    register_all_middlewares(dp)
+    register_all_handlers(dp)
+    seed_database(db.db_path, users=args.users, dishes=1, orders=0, cart_lines=0)
+    users = range(1, args.users + 1)
+
+    async def reset():
+        conn = sqlite3.connect(db.db_path)
+        conn.execute("DELETE FROM cart")
+        conn.executemany(
+            "INSERT INTO cart (user_id, dish_id, name, price, quantity) "
+            "VALUES (?, 1, 'Блюдо 0', 100, 1)",
+            ((user_id,) for user_id in users),
+        )
+        conn.commit()
+        conn.close()
+        session.texts.clear()
+        for user_id in users:
+            state = dp.fsm.get_context(bot, user_id, user_id)
+            await state.set_state(CartActions.ManageCart)
+
+    async def mode(name: str, feed):
+        await reset()
+        latencies = []
+
+        async def tap(update: Update):
+            started = time.perf_counter()
+            await feed(bot, update)
+            latencies.append(time.perf_counter() - started)
+
+        taps = [
+            updates.callback(user_id, "change_qty_inc_1")
+            for _ in range(args.taps)
+            for user_id in users
+        ]
+        started = time.perf_counter()
+        await asyncio.gather(*(tap(update) for update in taps))
+        elapsed = time.perf_counter() - started
+
+        expected = 1 + args.taps
+        quantities = dict(_quantities(db.db_path))
+        wrong_db = sum(quantities.get(user_id) != expected for user_id in users)
+        # Перерисовка со старым количеством после более новой
+        stale = 0
+        for user_id in users:
+            rendered = [
+                int(match.group(1))
+                for text in session.texts.get(user_id, [])
+                for match in [QUANTITY.search(text)]
+                if match
+            ]
+            stale += sum(b < a for a, b in zip(rendered, rendered[1:]))
+            stale += not rendered or rendered[-1] != expected
+
+        session.texts.clear()
+        for user_id in users:
+            state = dp.fsm.get_context(bot, user_id, user_id)
+            await state.set_state(OrderProcess.EnterPhone)
+            await state.set_data({"delivery_type": "pickup"})
+        await asyncio.gather(
+            *(feed(bot, updates.contact(user_id)) for user_id in users for _ in "12")
+        )
+        double = sum(
+            EMPTY_CART_TEXT in text
+            for user_id in users
+            for text in session.texts.get(user_id, [])
+        )
+
+        print(
+            f"{name}: {summary_ms(latencies)} "
+            f"throughput={len(taps) / elapsed:.0f} taps/s "
+            f"wrong_quantity={wrong_db} stale_cart={stale} empty_cart_reply={double}"
+        )
+        return wrong_db + stale + double
+
+    try:
+        # Без очереди: обработчик Dispatcher напрямую, мимо SequentialDispatcher
+        await mode(
+            "parallel", lambda bot, update: Dispatcher.feed_update(dp, bot, update)
+        )
+        failures = await mode("sequential", dp.feed_update)
+        print(f"executor: {dp.chat_executor.stats()}")
+    finally:
+        await db.close()
+    return 1 if failures else 0
+
+
+def _quantities(db_path) -> list:
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute("SELECT user_id, quantity FROM cart").fetchall()
+    finally:
+        conn.close()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--taps", type=int, default=10)
+    args = parser.parse_args()
+
+    root = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        # loader открывает базу по относительному пути: создаем ее во временной папке
+        os.chdir(tmp)
+        sys.path.insert(0, root)
+        try:
+            return asyncio.run(run(args))
+        finally:
+            os.chdir(root)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
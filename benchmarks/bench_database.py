@@ -0,0 +1,211 @@
+"""Время каждого публичного метода Database на базах разного размера.
+
+Для каждого размера из benchmarks/datagen.py база генерируется один раз и
+хранится в --data-dir, а каждый прогон идет на ее копии: методы записи не
+меняют данные следующего прогона. Методы вызываются с ID из сгенерированных
+данных; аргументы, которые не зависят от данных, берутся из
+scripts/check_query_plans.py. Каждый метод вызывается --repeat раз, но не
+дольше --budget секунд (и не меньше --min-runs раз).
+
+Корзины в сгенерированных данных есть лишь у процента пользователей,
+поэтому перед каждым вызовом метода корзины (вне замера) кладем в корзину
+пользователя блюдо вызова: иначе мерили бы пустую корзину. Удаление блюда
+и категории мерим на только что созданных записях, а не на занятых
+заказами, где удаление падает на внешнем ключе.
+
+Результат пишется в JSON: два файла сравнивает scripts/check_db_regression.py.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_database --sizes small medium --out base.json
+"""
+
+import argparse
+import asyncio
+import datetime
+import gc
+import inspect
+import json
+import logging
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.common import percentile, summary_ms
+from benchmarks.datagen import SIZES, create_schema, generate
+from scripts.check_query_plans import SAMPLE_ARGS, SAMPLE_KWARGS, public_methods
+from services.database import Database
+
+# Аргументы, которые выбираются из сгенерированных данных на каждый вызов
+ID_RANGES = {
+    "user_id": "users",
+    "order_id": "orders",
+    "dish_id": "dishes",
+    "category_id": "categories",
+}
+
+# Методы, которым для настоящей работы нужна непустая корзина
+CART_METHODS = {
+    "get_cart_items",
+    "clear_cart",
+    "decrease_quantity",
+    "increase_quantity",
+    "place_order",
+    "remove_from_cart",
+}
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+async def prepare(data_dir: Path, name: str, size: dict, seed: int, fresh: bool):
+    """Путь к эталонной базе размера name, при необходимости генерируем ее"""
+    path = data_dir / f"{name}-seed{seed}.sqlite3"
+    if path.exists() and not fresh:
+        return path
+    path.unlink(missing_ok=True)
+    print(f"Генерируем {name}: {size}", file=sys.stderr)
+    started = time.perf_counter()
+    await create_schema(path)
+    generate(path, **size, seed=seed, progress=True)
+    print(f"Готово за {time.perf_counter() - started:.0f} с", file=sys.stderr)
+    return path
+
+
+def call_args(name: str, method, size: dict, rng: random.Random) -> dict:
+    """Аргументы одного вызова: ID из данных, остальное из SAMPLE_ARGS"""
+    args = {}
+    for param in list(inspect.signature(method).parameters)[1:]:
+        if param in ID_RANGES:
+            args[param] = rng.randint(1, size[ID_RANGES[param]])
+        elif param in SAMPLE_ARGS:
+            args[param] = SAMPLE_ARGS[param]
+    args.update(SAMPLE_KWARGS.get(name, {}))
+    return args
+
+
+async def prepare_call(
+    db: Database, name: str, kwargs: dict, size: dict, rng: random.Random
+):
+    """Данные для вызова name, создаются вне замера; kwargs дополняются"""
+    if name in CART_METHODS:
+        user_id = kwargs["user_id"]
+        dish_id = kwargs.get("dish_id") or rng.randint(1, size["dishes"])
+        for dish in {dish_id, rng.randint(1, size["dishes"])}:
+            await db.add_to_cart(user_id, dish, f"Блюдо {dish}", 100.0)
+    elif name == "delete_dish":
+        rows = await db._execute(
+            "INSERT INTO dishes (name, price, category_id) VALUES (?, ?, ?) "
+            "RETURNING dish_id",
+            ("Удаляемое блюдо", 100.0, rng.randint(1, size["categories"])),
+        )
+        kwargs["dish_id"] = rows[0][0]
+    elif name == "delete_category":
+        rows = await db._execute(
+            "INSERT INTO categories (name) VALUES (?) RETURNING category_id",
+            (f"Удаляемая категория {rng.random()}",),
+        )
+        kwargs["category_id"] = rows[0][0]
+
+
+async def bench_size(path: Path, size: dict, args) -> dict:
+    results = {}
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory(dir=path.parent) as tmp:
+        work = Path(tmp) / path.name
+        shutil.copyfile(path, work)
+        db = Database(work)
+        await db.connect()
+        try:
+            for name, method in public_methods():
+                # Первый вызов прогревает кэши и соединения, в замер не идет
+                kwargs = call_args(name, method, size, rng)
+                await prepare_call(db, name, kwargs, size, rng)
+                await method(db, **kwargs)
+                # Мусор предыдущего метода не должен собираться в замере этого
+                gc.collect()
+                times = []
+                deadline = time.perf_counter() + args.budget
+                while len(times) < args.repeat and (
+                    len(times) < args.min_runs or time.perf_counter() < deadline
+                ):
+                    kwargs = call_args(name, method, size, rng)
+                    await prepare_call(db, name, kwargs, size, rng)
+                    started = time.perf_counter()
+                    await method(db, **kwargs)
+                    times.append(time.perf_counter() - started)
+                print(f"  {name}: {summary_ms(times)}")
+                results[name] = {
+                    "n": len(times),
+                    "mean": sum(times) / len(times) * 1000,
+                    "p50": percentile(times, 50) * 1000,
+                    "p95": percentile(times, 95) * 1000,
+                    "p99": percentile(times, 99) * 1000,
+                }
+        finally:
+            await db.close()
+    return results
+
+
+async def run(args) -> dict:
+    data_dir = Path(args.data_dir)
+    data_dir.mkdir(parents=True, exist_ok=True)
+    report = {
+        "commit": git_commit(),
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "seed": args.seed,
+        "sizes": {},
+    }
+    for name in args.sizes:
+        size = SIZES[name]
+        path = await prepare(data_dir, name, size, args.seed, args.fresh)
+        print(f"{name}: {size}")
+        report["sizes"][name] = {
+            "rows": size,
+            "methods": await bench_size(path, size, args),
+        }
+    return report
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", nargs="+", choices=SIZES, default=["small"])
+    parser.add_argument("--out", required=True, help="куда записать JSON")
+    parser.add_argument(
+        "--data-dir", default=os.path.join(tempfile.gettempdir(), "vpbot-bench")
+    )
+    parser.add_argument("--fresh", action="store_true", help="сгенерировать заново")
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--min-runs", type=int, default=3)
+    parser.add_argument("--budget", type=float, default=3.0, help="секунд на метод")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    # Ошибки методов на случайных ID (удаление занятой категории) не мешают замеру
+    logging.disable(logging.ERROR)
+    report = asyncio.run(run(args))
+    with open(args.out, "w", encoding="utf-8") as file:
+        json.dump(report, file, ensure_ascii=False, indent=2)
+    print(f"Результаты: {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,181 @@
+"""Сквозной прогон бота из main.py против локального фейкового Bot API.
+
+В отличие от bench_flows, апдейты идут через HTTP: бот забирает их через
+getUpdates или получает на вебхук, отвечает через aiohttp-сессию с JSON и
+multipart, фото профиля скачивает через getFile. Бот направлен на фейк
+через TELEGRAM_API_URL, обработчики и middleware — те же, что в main.py.
+
+Задержка апдейта — от его появления у «Telegram» до конца обработки в
+диспетчере, то есть вместе со всеми ответами бота. Задержку ответов Bot API
+и долю ответов 429 задают --latency-ms, --jitter-ms и --flood-rate. Лимиты
+чатов по умолчанию подняты, чтобы мерить бота, а не паузы флуд-контроля;
+--real-limits оставляет их как в конфиге.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_e2e --mode polling --users 100 --latency-ms 30
+"""
+
+import argparse
+import asyncio
+import itertools
+import os
+import random
+import sys
+import tempfile
+import time
+
+from benchmarks.bench_flows import FLOWS, flow_steps, seed_menu
+from benchmarks.common import summary_ms
+from benchmarks.fake_telegram import TOKEN, FakeTelegram, free_port
+
+
+async def run(args) -> int:
+    telegram = FakeTelegram(
+        latency=args.latency_ms / 1000,
+        jitter=args.jitter_ms / 1000,
+        flood_rate=args.flood_rate,
+    )
+    await telegram.start()
+    os.environ["BOT_TOKEN"] = TOKEN
+    os.environ["TELEGRAM_API_URL"] = telegram.base
+    os.environ.setdefault("ADMIN_IDS", "0")
+    if not args.real_limits:
+        os.environ.setdefault("FLOOD_GLOBAL_RATE", "1000000")
+        os.environ.setdefault("FLOOD_PRIVATE_RATE", "1000000")
+
+    import loader
+    from aiohttp import web
+    from benchmarks.offline import Updates
+    from handlers import register_all_handlers
+    from middlewares import register_all_middlewares
+    from services.webhook import WebhookServer
+
+    bot, dp, db = await loader.setup()
+    seed_menu(str(db.db_path), args.categories, args.dishes)
+
+    waiting = {}
+
+    async def completion(handler, event, data):
+        # Самая внешняя middleware: сюда доходят и отброшенные допуском апдейты
+        try:
+            return await handler(event, data)
+        finally:
+            future = waiting.pop(event.update_id, None)
+            if future is not None:
+                future.set_result(time.perf_counter())
+
+    dp.update.outer_middleware(completion)
+    register_all_middlewares(dp)
+    register_all_handlers(dp)
+
+    if args.mode == "polling":
+        polling = asyncio.create_task(
+            dp.start_polling(bot, handle_signals=False, polling_timeout=10)
+        )
+    else:
+        port = free_port()
+        server = WebhookServer(bot, dp, f"http://127.0.0.1:{port}")
+        runner = web.AppRunner(server.app())
+        # На старте сервер вызывает setWebhook, и фейк начинает слать апдейты
+        await runner.setup()
+        await web.TCPSite(runner, "127.0.0.1", port).start()
+
+    updates = Updates()
+    dish_ids = list(range(1, args.dishes + 1))
+    weights = [1 / dish_id for dish_id in dish_ids]
+    photo = os.urandom(args.photo_kb * 1024)
+    loop = asyncio.get_running_loop()
+    flows = {flow: [] for flow in FLOWS}
+    latencies = []
+    update_ids = itertools.count(1)
+
+    async def send(update):
+        payload = update.model_dump(mode="json", by_alias=True, exclude_none=True)
+        # Telegram нумерует апдейты по порядку поступления: на этом стоит offset
+        payload["update_id"] = next(update_ids)
+        future = waiting[payload["update_id"]] = loop.create_future()
+        started = time.perf_counter()
+        telegram.push(payload)
+        latencies.append(await future - started)
+
+    async def user(user_id: int):
+        rng = random.Random(user_id)
+        dishes = rng.choices(dish_ids, weights, k=2)
+        file_id = None
+        if rng.random() < args.photos:
+            file_id = f"photo_{user_id}"
+            telegram.add_file(file_id, photo)
+        for flow in FLOWS:
+            started = time.perf_counter()
+            for step in flow_steps(
+                updates, flow, user_id, dishes, args.categories, file_id
+            ):
+                await send(step)
+            flows[flow].append(time.perf_counter() - started)
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def limited(user_id: int):
+        async with semaphore:
+            await user(user_id)
+
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*(limited(1000 + i) for i in range(args.users)))
+        elapsed = time.perf_counter() - started
+        orders = (await db.get_admin_stats())["total_orders"]
+    finally:
+        if args.mode == "polling":
+            await dp.stop_polling()
+            await polling
+        else:
+            await runner.cleanup()
+        await bot.session.close()
+        await db.close()
+        await telegram.stop()
+
+    for flow in FLOWS:
+        print(f"{flow}: {summary_ms(flows[flow])}")
+    print(f"update: {summary_ms(latencies)}")
+    print(
+        f"mode={args.mode} users={args.users} "
+        f"throughput={len(latencies) / elapsed:.0f} updates/s "
+        f"orders={orders} ({orders / elapsed:.1f}/s) "
+        f"calls={dict(telegram.calls)} throttled={sum(telegram.throttled.values())} "
+        f"retries={loader.flood_control.stats()['retry_after']} "
+        f"shed={loader.admission.stats()['browse']['shed']}"
+    )
+    if orders != args.users:
+        print(f"Оформление заказа не дошло до конца: заказов {orders} из {args.users}")
+        return 1
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--mode", choices=("polling", "webhook"), default="polling")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--categories", type=int, default=10)
+    parser.add_argument("--dishes", type=int, default=100)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    parser.add_argument("--flood-rate", type=float, default=0, help="доля ответов 429")
+    parser.add_argument("--photos", type=float, default=0.1, help="доля фото профиля")
+    parser.add_argument("--photo-kb", type=int, default=64)
+    parser.add_argument("--real-limits", action="store_true")
+    args = parser.parse_args()
+
+    root = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        # loader открывает базу по относительному пути: создаем ее во временной папке
+        os.chdir(tmp)
+        sys.path.insert(0, root)
+        try:
+            return asyncio.run(run(args))
+        finally:
+            os.chdir(root)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
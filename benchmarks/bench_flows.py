@@ -0,0 +1,213 @@
+"""Нагрузочный прогон сценариев пользователей через Dispatcher.feed_update.
+
+Каждый синтетический пользователь проходит сценарии по порядку:
+регистрация через /start, меню → категория → блюдо → в корзину, изменение
+количества в корзине, оформление заказа и отзыв. Блюда выбираются с
+перекосом: первые в меню берут чаще. Апдейты идут через настоящие
+обработчики и middleware из loader, исходящие вызовы записывает сессия
+без сети, поэтому прогон не требует Telegram и подходит для CI.
+
+Для каждого сценария печатаем p50/p95/p99 его длительности и среднее
+число SQL-запросов; в конце — апдейты и заказы в секунду. Запросы считает
+профайлер из services/profiler.py (DB_PROFILE=1), --no-profile убирает его
+накладные расходы из замера пропускной способности.
+
+Оформление заказа идет только апдейтами: четные пользователи выбирают
+самовывоз, нечетные — доставку с адресом. Если бот не доводит сценарий до
+заказа, прогон завершается с кодом 1.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_flows --users 200 --concurrency 50
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+from benchmarks.common import summary_ms
+
+FLOWS = ("register", "browse", "cart", "checkout", "feedback")
+
+
+def category_of(dish_id: int, categories: int) -> int:
+    return (dish_id - 1) % categories + 1
+
+
+def seed_menu(db_path: str, categories: int, dishes: int):
+    conn = sqlite3.connect(db_path)
+    conn.executemany(
+        "INSERT INTO categories (category_id, name) VALUES (?, ?)",
+        ((i, f"Категория {i}") for i in range(1, categories + 1)),
+    )
+    conn.executemany(
+        "INSERT INTO dishes (dish_id, name, description, price, category_id) "
+        "VALUES (?, ?, '', ?, ?)",
+        (
+            (i, f"Блюдо {i}", 100 + i % 400, category_of(i, categories))
+            for i in range(1, dishes + 1)
+        ),
+    )
+    conn.commit()
+    conn.close()
+
+
+def flow_steps(
+    updates, flow: str, user_id: int, dishes: list, categories: int, photo=None
+) -> list:
+    """Апдейты сценария по порядку"""
+    first, second = dishes
+    if flow == "register":
+        # С photo регистрация идет через getFile и скачивание фото профиля
+        last = (
+            updates.photo(user_id, photo)
+            if photo
+            else updates.message(user_id, "/skip")
+        )
+        return [
+            updates.message(user_id, "/start"),
+            updates.contact(user_id),
+            updates.message(user_id, f"User {user_id}"),
+            last,
+        ]
+    if flow == "browse":
+        result = []
+        for dish_id in dishes:
+            result += [
+                updates.message(user_id, "/menu"),
+                updates.callback(
+                    user_id, f"category_{category_of(dish_id, categories)}"
+                ),
+                updates.callback(user_id, f"dish_{dish_id}"),
+                updates.callback(user_id, f"add_to_cart_{dish_id}"),
+            ]
+        return result
+    if flow == "cart":
+        return [
+            updates.message(user_id, "/cart"),
+            updates.callback(user_id, f"change_qty_inc_{first}"),
+            updates.callback(user_id, f"change_qty_inc_{second}"),
+            updates.callback(user_id, f"change_qty_dec_{first}"),
+        ]
+    if flow == "checkout":
+        if user_id % 2:
+            delivery = [
+                updates.callback(user_id, "delivery_delivery"),
+                updates.message(user_id, f"ул. Тестовая, {user_id}"),
+            ]
+        else:
+            delivery = [updates.callback(user_id, "delivery_pickup")]
+        return [
+            updates.callback(user_id, "checkout"),
+            *delivery,
+            updates.contact(user_id),
+        ]
+    return [
+        updates.message(user_id, "✏️ Оставить отзыв"),
+        updates.message(user_id, "⭐️ 5"),
+        updates.message(user_id, "Все вкусно"),
+    ]
+
+
+async def run(args) -> int:
+    os.environ.setdefault("BOT_TOKEN", "42:TEST")
+    os.environ.setdefault("ADMIN_IDS", "0")
+    os.environ["DB_PROFILE"] = "0" if args.no_profile else "1"
+    # Профиль пишет N+1 в лог; для прогона нужны только числа
+    os.environ.setdefault("DB_PROFILE_REPEAT", "1000")
+
+    import loader
+    from benchmarks.offline import RecordingSession, Updates
+    from handlers import register_all_handlers
+    from middlewares import register_all_middlewares
+    from services.profiler import UpdateProfile, current_profile
+
+    bot, dp, db = await loader.setup()
+    session = RecordingSession()
+    bot.session = session
+    register_all_middlewares(dp)
+    register_all_handlers(dp)
+    seed_menu(str(db.db_path), args.categories, args.dishes)
+
+    updates = Updates()
+    # Перекос популярности: вес блюда обратно пропорционален его номеру
+    dish_ids = list(range(1, args.dishes + 1))
+    weights = [1 / dish_id for dish_id in dish_ids]
+
+    latencies = {flow: [] for flow in FLOWS}
+    queries = {flow: [] for flow in FLOWS}
+    fed = 0
+
+    async def user(user_id: int):
+        nonlocal fed
+        rng = random.Random(user_id)
+        dishes = rng.choices(dish_ids, weights, k=2)
+        for flow in FLOWS:
+            profile = UpdateProfile(flow)
+            token = current_profile.set(profile)
+            started = time.perf_counter()
+            for step in flow_steps(updates, flow, user_id, dishes, args.categories):
+                await dp.feed_update(bot, step)
+                fed += 1
+            latencies[flow].append(time.perf_counter() - started)
+            current_profile.reset(token)
+            queries[flow].append(len(profile.statements))
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def limited(user_id: int):
+        async with semaphore:
+            await user(user_id)
+
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*(limited(1000 + i) for i in range(args.users)))
+        elapsed = time.perf_counter() - started
+        orders = (await db.get_admin_stats())["total_orders"]
+    finally:
+        await db.close()
+
+    for flow in FLOWS:
+        per_flow = (
+            f" queries={sum(queries[flow]) / len(queries[flow]):.1f}"
+            if not args.no_profile
+            else ""
+        )
+        print(f"{flow}: {summary_ms(latencies[flow])}{per_flow}")
+    print(
+        f"users={args.users} updates={fed} throughput={fed / elapsed:.0f} updates/s "
+        f"orders={orders} ({orders / elapsed:.1f}/s) "
+        f"calls={dict(session.calls)} shed={loader.admission.stats()['browse']['shed']}"
+    )
+    if orders != args.users:
+        print(f"Оформление заказа не дошло до конца: заказов {orders} из {args.users}")
+        return 1
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--categories", type=int, default=10)
+    parser.add_argument("--dishes", type=int, default=100)
+    parser.add_argument("--no-profile", action="store_true")
+    args = parser.parse_args()
+
+    root = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        # loader открывает базу по относительному пути: создаем ее во временной папке
+        os.chdir(tmp)
+        sys.path.insert(0, root)
+        try:
+            return asyncio.run(run(args))
+        finally:
+            os.chdir(root)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,151 @@
+"""Прием апдейтов: long polling против вебхука на локальном фейковом Telegram.
+
+Фейковый Bot API отдает апдейты через getUpdates или шлет их POST-запросом
+на вебхук и ждет ответа бота через sendMessage. Задержка — от появления
+апдейта у «Telegram» до ответа бота на него.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_ingest --updates 5000 --rate 1000 --work-ms 5
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+from aiogram import Bot, Router
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from aiogram.types import Message
+from aiohttp import ClientSession, web
+
+from benchmarks.common import summary_ms
+from benchmarks.fake_telegram import TOKEN, FakeTelegram, free_port, make_update
+from services.chat_executor import SequentialDispatcher
+from services.webhook import SECRET_HEADER, WebhookServer
+
+SECRET = "bench-secret"
+
+
+def make_dispatcher(work_ms: float, concurrency: int) -> SequentialDispatcher:
+    router = Router()
+
+    @router.message()
+    async def echo(message: Message):
+        # Имитация работы обработчика: запросы к базе, форматирование
+        await asyncio.sleep(work_ms / 1000)
+        await message.answer(message.text)
+
+    # Как в loader: очередь чатов и лимит одновременных обработчиков
+    dp = SequentialDispatcher(concurrency=concurrency)
+    dp.include_router(router)
+    return dp
+
+
+async def feed(telegram: FakeTelegram, args, deliver):
+    """Выдаем апдейты с заданной частотой (rate=0 — без пауз)"""
+    started = time.perf_counter()
+    for update_id in range(1, args.updates + 1):
+        if args.rate:
+            delay = started + update_id / args.rate - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        await deliver(make_update(update_id, update_id % args.chats + 1))
+
+
+async def run_polling(args) -> FakeTelegram:
+    telegram = FakeTelegram(args.updates)
+    await telegram.start()
+    session = AiohttpSession(api=TelegramAPIServer.from_base(telegram.base))
+    bot = Bot(TOKEN, session=session)
+    dp = make_dispatcher(args.work_ms, args.concurrency)
+    polling = asyncio.create_task(
+        dp.start_polling(bot, handle_signals=False, polling_timeout=10)
+    )
+
+    async def deliver(update: dict):
+        telegram.push(update)
+
+    await feed(telegram, args, deliver)
+    await telegram.done.wait()
+    await dp.stop_polling()
+    await polling
+    await session.close()
+    await telegram.stop()
+    return telegram
+
+
+async def run_webhook(args) -> FakeTelegram:
+    telegram = FakeTelegram(args.updates)
+    await telegram.start()
+    session = AiohttpSession(api=TelegramAPIServer.from_base(telegram.base))
+    bot = Bot(TOKEN, session=session)
+    dp = make_dispatcher(args.work_ms, args.concurrency)
+
+    port = free_port()
+    server = WebhookServer(
+        bot,
+        dp,
+        f"http://127.0.0.1:{port}",
+        secret=SECRET,
+    )
+    runner = web.AppRunner(server.app())
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", port).start()
+
+    # Как и Telegram, держим ограниченное число одновременных доставок
+    semaphore = asyncio.Semaphore(args.connections)
+    pending = set()
+    async with ClientSession() as client:
+
+        async def post(update: dict):
+            async with semaphore:
+                async with client.post(
+                    server.url,
+                    data=json.dumps(update),
+                    headers={
+                        SECRET_HEADER: SECRET,
+                        "Content-Type": "application/json",
+                    },
+                ) as response:
+                    assert response.status == 200, response.status
+
+        async def deliver(update: dict):
+            # Апдейт появился у «Telegram» сейчас, ожидание соединения в счет
+            telegram.mark_sent(update["update_id"])
+            task = asyncio.create_task(post(update))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+
+        await feed(telegram, args, deliver)
+        await asyncio.gather(*pending)
+        await telegram.done.wait()
+
+    await runner.cleanup()
+    await session.close()
+    await telegram.stop()
+    return telegram
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--updates", type=int, default=5000)
+    parser.add_argument("--rate", type=float, default=1000, help="апдейтов в секунду")
+    parser.add_argument("--chats", type=int, default=1000)
+    parser.add_argument("--work-ms", type=float, default=5)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--connections", type=int, default=40)
+    args = parser.parse_args()
+
+    for name, run in (("polling", run_polling), ("webhook", run_webhook)):
+        telegram = await run(args)
+        elapsed = telegram.last_reply - telegram.first_sent
+        print(
+            f"{name}: {summary_ms(telegram.latencies)} "
+            f"throughput={len(telegram.latencies) / elapsed:.0f} updates/s "
+            f"out_of_order={telegram.out_of_order}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,95 @@
+"""Стоимость сборки и сериализации клавиатур меню с кэшем и без.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_keyboards --dishes 500
+"""
+
+import argparse
+import time
+
+from aiogram import Bot
+from aiogram.methods import EditMessageText
+
+from keyboards.cache import markup_cache
+from keyboards.inline import (
+    cached_dishes_keyboard,
+    cached_menu_categories_keyboard,
+    dishes_keyboard,
+    menu_categories_keyboard,
+)
+from services.session import BotSession
+
+
+def timeit(label: str, func, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    per_call = (time.perf_counter() - started) / repeat
+    print(f"{label:<42} {per_call * 1e6:10.1f} µs")
+    return per_call
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--dishes", type=int, default=500)
+    parser.add_argument("--categories", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    categories = [
+        {"category_id": i, "name": f"Категория {i}"}
+        for i in range(1, args.categories + 1)
+    ]
+    dishes = [(i, f"Блюдо {i}", "", 100 + i) for i in range(1, args.dishes + 1)]
+
+    session = BotSession()
+    bot = Bot(token="42:BENCHMARK", session=session)
+
+    def send(markup):
+        method = EditMessageText(
+            chat_id=1, message_id=1, text="Выберите блюдо:", reply_markup=markup
+        )
+        session.build_form_data(bot, method)
+
+    version = 1
+    print(f"{args.dishes} блюд, {args.categories} категорий")
+    base = timeit(
+        "categories: сборка",
+        lambda: menu_categories_keyboard(categories),
+        args.repeat,
+    )
+    cached = timeit(
+        "categories: из кэша",
+        lambda: cached_menu_categories_keyboard(version, categories),
+        args.repeat,
+    )
+    print(f"{'':<42} x{base / cached:.0f}")
+
+    base = timeit(
+        "dishes: сборка",
+        lambda: dishes_keyboard(dishes, 1),
+        args.repeat,
+    )
+    cached = timeit(
+        "dishes: из кэша",
+        lambda: cached_dishes_keyboard(version, dishes, 1),
+        args.repeat,
+    )
+    print(f"{'':<42} x{base / cached:.0f}")
+
+    base = timeit(
+        "dishes: сборка + сериализация запроса",
+        lambda: send(dishes_keyboard(dishes, 1)),
+        args.repeat,
+    )
+    cached = timeit(
+        "dishes: кэш + готовый JSON",
+        lambda: send(cached_dishes_keyboard(version, dishes, 1)),
+        args.repeat,
+    )
+    print(f"{'':<42} x{base / cached:.0f}")
+    print(markup_cache.stats())
+
+
+if __name__ == "__main__":
+    main()
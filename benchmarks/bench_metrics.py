@@ -0,0 +1,58 @@
+"""Цена MetricsMiddleware на один апдейт.
+
+Вызываем middleware с пустым обработчиком и сравниваем с вызовом
+обработчика напрямую; разница — накладные расходы метрик на горячем пути.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_metrics --calls 200000
+"""
+
+import argparse
+import asyncio
+import time
+
+from middlewares.metrics import MetricsMiddleware
+from services.metrics import Metrics
+
+
+class HandlerObject:
+    """Как aiogram HandlerObject: нужен только callback"""
+
+    def __init__(self, callback):
+        self.callback = callback
+
+
+async def handle(event, data):
+    return None
+
+
+async def run(args):
+    middleware = MetricsMiddleware(Metrics())
+    data = {"handler": HandlerObject(handle)}
+
+    started = time.perf_counter()
+    for _ in range(args.calls):
+        await handle(None, data)
+    bare = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for _ in range(args.calls):
+        await middleware(handle, None, data)
+    measured = time.perf_counter() - started
+
+    overhead = (measured - bare) / args.calls * 1e6
+    print(
+        f"bare={bare / args.calls * 1e6:.2f}us "
+        f"with_metrics={measured / args.calls * 1e6:.2f}us "
+        f"overhead={overhead:.2f}us per update"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=200_000)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Задержка чтения корзины во время тяжелого агрегата по всем заказам.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_pool --orders 500000 --readers 0 4
+"""
+
+import argparse
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.common import seed_database, summary_ms
+from services.database import Database
+
+
+async def run(db_path: Path, readers: int, clients: int, requests: int, users: int):
+    db = Database(db_path, readers=readers)
+    await db.connect()
+
+    stop = asyncio.Event()
+    stats_runs = 0
+
+    async def stats_loop():
+        nonlocal stats_runs
+        # Бывший get_admin_stats: теперь он читает order_stats, а полный
+        # проход по orders остался типичным тяжелым отчетом
+        while not stop.is_set():
+            async with db.pool.reader() as conn:
+                async with conn.execute(
+                    "SELECT COUNT(*), AVG(total_amount), SUM(total_amount) FROM orders"
+                ) as cursor:
+                    await cursor.fetchone()
+            stats_runs += 1
+
+    latencies = []
+
+    async def client(n: int):
+        for i in range(requests):
+            user_id = (n * requests + i) % users + 1
+            started = time.perf_counter()
+            await db.get_cart_items(user_id)
+            latencies.append(time.perf_counter() - started)
+
+    stats_task = asyncio.create_task(stats_loop())
+    # Даем статистике стартовать, чтобы чтения гарантированно шли параллельно
+    await asyncio.sleep(0.01)
+    started = time.perf_counter()
+    await asyncio.gather(*(client(n) for n in range(clients)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await stats_task
+    await db.close()
+
+    print(
+        f"readers={readers}: {summary_ms(latencies)} "
+        f"throughput={len(latencies) / elapsed:.0f} req/s stats_runs={stats_runs}"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--orders", type=int, default=300_000)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--readers", type=int, nargs="+", default=[0, 4])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "bench.sqlite3"
+        db = Database(db_path, readers=0)
+        await db.connect()
+        await db.close()
+        seed_database(db_path, users=args.users, orders=args.orders)
+
+        for readers in args.readers:
+            await run(db_path, readers, args.clients, args.requests, args.users)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
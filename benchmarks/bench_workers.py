@@ -0,0 +1,86 @@
+"""Пропускная способность при раскладке апдейтов по процессам-воркерам.
+
+Входной процесс забирает апдейты у фейкового Telegram через getUpdates и
+раскладывает их по chat_id между воркерами. Обработчик тратит cpu-ms
+процессорного времени, поэтому один процесс упирается в одно ядро.
+Заодно считаем ответы, пришедшие в чат не в порядке апдейтов.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_workers --workers 1 2 4 --updates 4000 --cpu-ms 2
+"""
+
+import argparse
+import asyncio
+import time
+
+from aiogram import Bot, Router
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from aiogram.types import Message
+
+from benchmarks.fake_telegram import TOKEN, FakeTelegram, make_update
+from services.chat_executor import SequentialDispatcher
+from services.workers import WorkerPool, poll
+
+
+async def bench_app(index: int, workers: int, base: str, cpu_ms: float):
+    """Бот и диспетчер воркера, которые ходят в фейковый Telegram"""
+    router = Router()
+
+    @router.message()
+    async def echo(message: Message):
+        # Рендер текста и клавиатур — чистая работа процессора
+        deadline = time.perf_counter() + cpu_ms / 1000
+        while time.perf_counter() < deadline:
+            pass
+        await message.answer(message.text)
+
+    dp = SequentialDispatcher()
+    dp.include_router(router)
+    session = AiohttpSession(api=TelegramAPIServer.from_base(base))
+    return Bot(TOKEN, session=session), dp, None
+
+
+async def run(workers: int, args):
+    telegram = FakeTelegram(args.updates)
+    await telegram.start()
+    session = AiohttpSession(api=TelegramAPIServer.from_base(telegram.base))
+    bot = Bot(TOKEN, session=session)
+    pool = WorkerPool(
+        workers, bench_app, {"base": telegram.base, "cpu_ms": args.cpu_ms}
+    )
+    pool.start()
+
+    # Апдейты готовы заранее: меряем обработку, а не скорость генерации
+    for update_id in range(1, args.updates + 1):
+        telegram.push(make_update(update_id, update_id % args.chats + 1))
+    polling = asyncio.create_task(poll(bot, pool, ["message"]))
+    await telegram.done.wait()
+    polling.cancel()
+    await asyncio.gather(polling, return_exceptions=True)
+    await pool.stop()
+    await session.close()
+    await telegram.stop()
+
+    # Считаем от первого ответа: запуск процессов в замер не входит
+    elapsed = telegram.last_reply - telegram.first_reply
+    print(
+        f"workers={workers}: throughput={(args.updates - 1) / elapsed:.0f} updates/s "
+        f"out_of_order={telegram.out_of_order} routed={pool.routed}"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--updates", type=int, default=4000)
+    parser.add_argument("--chats", type=int, default=500)
+    parser.add_argument("--cpu-ms", type=float, default=2)
+    args = parser.parse_args()
+
+    for workers in args.workers:
+        await run(workers, args)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,64 @@
+"""Всплеск нажатий change_qty_ с групповым коммитом и без него.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_write_queue --users 200 --taps 20
+"""
+
+import argparse
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.common import seed_database, summary_ms
+from services.database import Database
+
+
+async def run(db_path: Path, group_commit: bool, users: int, taps: int):
+    db = Database(db_path, group_commit=group_commit)
+    await db.connect()
+    latencies = []
+
+    async def user(user_id: int):
+        for i in range(taps):
+            started = time.perf_counter()
+            if i % 2:
+                await db.decrease_quantity(user_id, 1)
+            else:
+                await db.increase_quantity(user_id, 1)
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(user(uid) for uid in range(1, users + 1)))
+    elapsed = time.perf_counter() - started
+    stats = db.write_queue.stats() if db.write_queue else None
+    await db.close()
+
+    mode = "group_commit" if group_commit else "per-write"
+    print(
+        f"{mode}: {summary_ms(latencies)} "
+        f"throughput={len(latencies) / elapsed:.0f} writes/s"
+    )
+    if stats:
+        print(f"  {stats}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--taps", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "bench.sqlite3"
+        db = Database(db_path, readers=0)
+        await db.connect()
+        await db.close()
+        seed_database(db_path, users=args.users, orders=0, cart_lines=1)
+
+        for group_commit in (False, True):
+            await run(db_path, group_commit, args.users, args.taps)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
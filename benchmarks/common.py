@@ -0,0 +1,62 @@
+import sqlite3
+from pathlib import Path
+from typing import Sequence, Union
+
+
+def percentile(values: Sequence[float], q: float) -> float:
+    """Перцентиль по отсортированной выборке (q от 0 до 100)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summary_ms(values: Sequence[float]) -> str:
+    """Краткая сводка задержек в миллисекундах"""
+    return (
+        f"p50={percentile(values, 50) * 1000:.2f}ms "
+        f"p95={percentile(values, 95) * 1000:.2f}ms "
+        f"p99={percentile(values, 99) * 1000:.2f}ms "
+        f"n={len(values)}"
+    )
+
+
+def seed_database(
+    db_path: Union[str, Path],
+    users: int = 1000,
+    dishes: int = 100,
+    orders: int = 100_000,
+    cart_lines: int = 5,
+):
+    """Быстро наполняем созданную Database схему синтетическими данными"""
+    conn = sqlite3.connect(db_path)
+    conn.execute(
+        "INSERT OR IGNORE INTO categories (category_id, name) VALUES (1, 'Bench')"
+    )
+    conn.executemany(
+        "INSERT INTO dishes (name, description, price, category_id) VALUES (?, ?, ?, 1)",
+        ((f"Блюдо {i}", "", 100 + i % 400) for i in range(dishes)),
+    )
+    conn.executemany(
+        "INSERT INTO users (user_id, username, full_name, phone) VALUES (?, ?, ?, ?)",
+        (
+            (uid, f"user{uid}", f"User {uid}", "+70000000000")
+            for uid in range(1, users + 1)
+        ),
+    )
+    conn.executemany(
+        "INSERT INTO orders (user_id, total_amount, delivery_type, address, phone) "
+        "VALUES (?, ?, 'pickup', '', '+70000000000')",
+        ((i % users + 1, 100 + i % 3000) for i in range(orders)),
+    )
+    conn.executemany(
+        "INSERT INTO cart (user_id, dish_id, name, price, quantity) VALUES (?, ?, ?, ?, 1)",
+        (
+            (uid, line % dishes + 1, f"Блюдо {line % dishes}", 100)
+            for uid in range(1, users + 1)
+            for line in range(cart_lines)
+        ),
+    )
+    conn.commit()
+    conn.close()
@@ -0,0 +1,316 @@
+"""Генератор синтетической базы в схеме data/restaurant.sqlite3.
+
+Размеры задаются пресетом (--size) или отдельными числами. Данные с
+перекосом, как в жизни: популярность блюд и активность пользователей
+убывают как 1/номер**skew, заказы идут с пиками в обед и вечером, чаще по
+выходным, отзывы в основном на пятерку. Агрегаты order_stats и срезы
+продаж заполняют триггеры схемы, поэтому они сходятся с заказами.
+
+Запуск из корня репозитория:
+    python -m benchmarks.datagen --size medium --out /tmp/medium.sqlite3
+"""
+
+import argparse
+import asyncio
+import bisect
+import datetime
+import itertools
+import random
+import sqlite3
+import sys
+import time
+from pathlib import Path
+from typing import Union
+
+# Пресеты размеров: medium генерируется минуту, large — около 15 минут и ~2 ГБ
+SIZES = {
+    "small": {
+        "categories": 10,
+        "dishes": 200,
+        "users": 10_000,
+        "orders": 50_000,
+        "order_items": 200_000,
+    },
+    "medium": {
+        "categories": 20,
+        "dishes": 1_000,
+        "users": 100_000,
+        "orders": 500_000,
+        "order_items": 2_000_000,
+    },
+    "large": {
+        "categories": 50,
+        "dishes": 5_000,
+        "users": 1_000_000,
+        "orders": 5_000_000,
+        "order_items": 20_000_000,
+    },
+}
+
+# Заказы по часам суток: пики в обед и вечером
+HOUR_WEIGHTS = (
+    *(1, 1, 0, 0, 0, 0, 1, 2, 3, 4, 5, 8),
+    *(12, 11, 7, 5, 6, 9, 12, 12, 10, 7, 4, 2),
+)
+RATING_WEIGHTS = {5: 55, 4: 25, 3: 10, 2: 5, 1: 5}
+QUANTITY_WEIGHTS = {1: 80, 2: 15, 3: 5}
+# Пользователей или заказов на одну транзакцию
+CHUNK = 20_000
+
+
+def zipf_weights(n: int, skew: float) -> list:
+    """Накопленные веса 1/номер**skew для выбора с перекосом"""
+    return list(itertools.accumulate(1 / rank**skew for rank in range(1, n + 1)))
+
+
+def _picker(rng: random.Random, values: list, cum_weights: list):
+    """Быстрый выбор по накопленным весам: bisect вместо random.choices"""
+    total = cum_weights[-1]
+    last = len(values) - 1
+
+    def pick():
+        return values[min(bisect.bisect(cum_weights, rng.random() * total), last)]
+
+    return pick
+
+
+async def create_schema(db_path: Union[str, Path]):
+    """Пустая база с актуальной схемой: миграции выполняет Database"""
+    from services.database import Database
+
+    db = Database(db_path, readers=0)
+    await db.connect()
+    await db.close()
+
+
+def generate(
+    db_path: Union[str, Path],
+    categories: int,
+    dishes: int,
+    users: int,
+    orders: int,
+    order_items: int,
+    feedback: float = 0.2,
+    carts: float = 0.01,
+    days: int = 365,
+    skew: float = 1.0,
+    seed: int = 0,
+    progress: bool = False,
+):
+    """Наполняем базу со схемой Database синтетическими данными.
+
+    feedback — доля заказов с отзывом, carts — доля пользователей с
+    непустой корзиной. Последний заказ приходится на текущий момент, так что
+    отчеты «за сегодня» и «за 30 дней» видят данные.
+    """
+    rng = random.Random(seed)
+    conn = sqlite3.connect(db_path)
+    # База одноразовая: при сбое генерацию проще повторить
+    conn.execute("PRAGMA synchronous = OFF")
+    conn.execute("PRAGMA cache_size = -262144")
+    now = datetime.datetime.now(datetime.timezone.utc).replace(
+        tzinfo=None, microsecond=0
+    )
+    start = now - datetime.timedelta(days=days)
+    started = time.perf_counter()
+
+    conn.executemany(
+        "INSERT INTO categories (category_id, name) VALUES (?, ?)",
+        ((i, f"Категория {i}") for i in range(1, categories + 1)),
+    )
+    prices = {}
+    dish_rows = []
+    for dish_id in range(1, dishes + 1):
+        prices[dish_id] = round(rng.lognormvariate(5.8, 0.5), -1) or 10.0
+        dish_rows.append(
+            (
+                dish_id,
+                f"Блюдо {dish_id}",
+                f"Описание блюда {dish_id}",
+                prices[dish_id],
+                rng.randint(1, categories),
+            )
+        )
+    conn.executemany(
+        "INSERT INTO dishes (dish_id, name, description, price, category_id) "
+        "VALUES (?, ?, ?, ?, ?)",
+        dish_rows,
+    )
+
+    # Пользователи регистрируются равномерно за весь период
+    step = days * 86400 / max(users, 1)
+    for first in range(1, users + 1, CHUNK):
+        conn.executemany(
+            "INSERT INTO users (user_id, username, full_name, phone, registration_date) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (
+                (
+                    user_id,
+                    f"user{user_id}",
+                    f"Пользователь {user_id}",
+                    f"+7900{user_id:07d}",
+                    str(start + datetime.timedelta(seconds=int(user_id * step))),
+                )
+                for user_id in range(first, min(first + CHUNK, users + 1))
+            ),
+        )
+        conn.commit()
+
+    # Активные пользователи: номер по популярности перемешан с user_id
+    user_ids = list(range(1, users + 1))
+    rng.shuffle(user_ids)
+    pick_user = _picker(rng, user_ids, zipf_weights(users, skew))
+    pick_dish = _picker(rng, list(range(1, dishes + 1)), zipf_weights(dishes, skew))
+    pick_quantity = _picker(
+        rng,
+        list(QUANTITY_WEIGHTS),
+        list(itertools.accumulate(QUANTITY_WEIGHTS.values())),
+    )
+    pick_rating = _picker(
+        rng, list(RATING_WEIGHTS), list(itertools.accumulate(RATING_WEIGHTS.values()))
+    )
+    pick_hour = _picker(rng, list(range(24)), list(itertools.accumulate(HOUR_WEIGHTS)))
+    items_per_order = order_items / max(orders, 1)
+
+    # Заказы по дням: выходные на треть чаще, внутри дня по часам
+    day_weights = [
+        1.3 if (start + datetime.timedelta(days=day)).weekday() >= 5 else 1.0
+        for day in range(days + 1)
+    ]
+    scale = orders / sum(day_weights)
+    per_day = [int(weight * scale) for weight in day_weights]
+    per_day[-1] += orders - sum(per_day)
+
+    order_id = 0
+    items_total = 0
+    order_rows, item_rows, feedback_rows = [], [], []
+
+    def flush():
+        conn.executemany(
+            "INSERT INTO orders (order_id, user_id, total_amount, delivery_type, "
+            "address, phone, status, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            order_rows,
+        )
+        conn.executemany(
+            "INSERT INTO order_items (order_id, dish_id, quantity, price) "
+            "VALUES (?, ?, ?, ?)",
+            item_rows,
+        )
+        conn.executemany(
+            "INSERT INTO feedback (user_id, order_id, rating, comment, created_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            feedback_rows,
+        )
+        conn.commit()
+        order_rows.clear()
+        item_rows.clear()
+        feedback_rows.clear()
+        if progress:
+            print(
+                f"  заказов {order_id}/{orders}, позиций {items_total}, "
+                f"{time.perf_counter() - started:.0f} с",
+                file=sys.stderr,
+            )
+
+    for day, count in enumerate(per_day):
+        day_start = start.replace(hour=0, minute=0, second=0) + datetime.timedelta(
+            days=day
+        )
+        moments = sorted(pick_hour() * 3600 + rng.randrange(3600) for _ in range(count))
+        for seconds in moments:
+            created = day_start + datetime.timedelta(seconds=seconds)
+            if created > now:
+                created = now
+            order_id += 1
+            user_id = pick_user()
+            # В среднем items_per_order разных блюд, минимум одно
+            lines = min(max(1, round(rng.expovariate(1 / items_per_order))), dishes)
+            chosen = set()
+            while len(chosen) < lines:
+                chosen.add(pick_dish())
+            total = 0.0
+            for dish_id in chosen:
+                quantity = pick_quantity()
+                total += quantity * prices[dish_id]
+                item_rows.append((order_id, dish_id, quantity, prices[dish_id]))
+                items_total += 1
+            if (now - created).days >= 1:
+                status = "cancelled" if rng.random() < 0.05 else "completed"
+            else:
+                status = rng.choice(("new", "processing", "completed"))
+            delivery = rng.random() < 0.6
+            order_rows.append(
+                (
+                    order_id,
+                    user_id,
+                    round(total, 2),
+                    "delivery" if delivery else "pickup",
+                    f"ул. Тестовая, {user_id % 200 + 1}" if delivery else "",
+                    f"+7900{user_id:07d}",
+                    status,
+                    str(created),
+                )
+            )
+            if status == "completed" and rng.random() < feedback:
+                rating = pick_rating()
+                feedback_rows.append(
+                    (
+                        user_id,
+                        order_id,
+                        rating,
+                        None if rating >= 4 else "Долго везли",
+                        str(min(created + datetime.timedelta(hours=2), now)),
+                    )
+                )
+            if len(order_rows) >= CHUNK:
+                flush()
+    flush()
+
+    cart_rows = []
+    for user_id in rng.sample(range(1, users + 1), int(users * carts)):
+        for dish_id in {pick_dish() for _ in range(rng.randint(1, 5))}:
+            cart_rows.append(
+                (user_id, dish_id, f"Блюдо {dish_id}", prices[dish_id], pick_quantity())
+            )
+    conn.executemany(
+        "INSERT INTO cart (user_id, dish_id, name, price, quantity) "
+        "VALUES (?, ?, ?, ?, ?)",
+        cart_rows,
+    )
+    conn.commit()
+    conn.close()
+    return {"orders": order_id, "order_items": items_total}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size", choices=SIZES, default="small")
+    parser.add_argument("--out", required=True)
+    for name in SIZES["small"]:
+        parser.add_argument(f"--{name.replace('_', '-')}", type=int)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--skew", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    out = Path(args.out)
+    if out.exists():
+        print(f"{out} уже существует", file=sys.stderr)
+        return 1
+    size = {
+        name: getattr(args, name) or value for name, value in SIZES[args.size].items()
+    }
+    started = time.perf_counter()
+    asyncio.run(create_schema(out))
+    counts = generate(
+        out, **size, days=args.days, skew=args.skew, seed=args.seed, progress=True
+    )
+    print(
+        f"{out}: {size} -> {counts} за {time.perf_counter() - started:.0f} с, "
+        f"{out.stat().st_size / 2**20:.0f} МБ"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,282 @@
+"""Локальный фейковый Bot API для бенчмарков через настоящий HTTP.
+
+Реализует то, чем пользуется бот: getUpdates и setWebhook для приема
+апдейтов, sendMessage, editMessageText, answerCallbackQuery, sendPhoto,
+getFile и скачивание файлов. Задержка ответа и доля ответов 429 задаются
+при создании, поэтому можно проверить поведение бота под медленным или
+перегруженным Telegram. Бот направляется сюда через TELEGRAM_API_URL.
+"""
+
+import asyncio
+import itertools
+import json
+import random
+import socket
+import time
+from collections import Counter
+from typing import Dict, Optional
+
+from aiohttp import ClientSession, web
+
+from services.webhook import SECRET_HEADER
+
+TOKEN = "42:BENCH"
+
+# Методы, на которые Telegram отвечает 429 при превышении лимитов чата
+LIMITED = ("sendMessage", "editMessageText", "sendPhoto")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def make_update(update_id: int, chat_id: int) -> dict:
+    user = {"id": chat_id, "is_bot": False, "first_name": "Load"}
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "from": user,
+            "text": str(update_id),
+        },
+    }
+
+
+class FakeTelegram:
+    """Минимальный Bot API с настраиваемой задержкой и ответами 429.
+
+    Апдейты из push() бот забирает через getUpdates, а после setWebhook
+    они уходят POST-запросом на его вебхук. Если текст ответа бота — номер
+    апдейта, считаем задержку от push() до ответа: так меряет bench_ingest.
+    """
+
+    def __init__(
+        self,
+        expected: int = 0,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        flood_rate: float = 0.0,
+        retry_after: int = 1,
+        connections: int = 40,
+        seed: int = 0,
+    ):
+        self.expected = expected
+        self.latency = latency
+        self.jitter = jitter
+        self.flood_rate = flood_rate
+        self.retry_after = retry_after
+        self.pending = []
+        self.sent_at = {}
+        self.latencies = []
+        self.first_sent = None
+        self.first_reply = None
+        self.last_reply = None
+        # Ответы чата пришли не в порядке апдейтов
+        self.out_of_order = 0
+        self.calls = Counter()
+        self.throttled = Counter()
+        self.files: Dict[str, bytes] = {}
+        self.webhook_url: Optional[str] = None
+        self.webhook_secret = ""
+        self.delivery_retries = 0
+        self._last_by_chat = {}
+        self._message_ids = itertools.count(1)
+        self._random = random.Random(seed)
+        self._deliveries = set()
+        self._connections = asyncio.Semaphore(connections)
+        self._client: Optional[ClientSession] = None
+        self.done = asyncio.Event()
+        self._new = asyncio.Event()
+        self.port = free_port()
+        self.base = f"http://127.0.0.1:{self.port}"
+        self._runner = None
+
+    async def start(self):
+        app = web.Application(client_max_size=20 * 1024 * 1024)
+        app.router.add_post("/bot{token}/{method}", self.handle)
+        app.router.add_get("/file/bot{token}/{path:.+}", self.download)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, "127.0.0.1", self.port).start()
+        self._client = ClientSession()
+
+    async def stop(self):
+        if self._deliveries:
+            await asyncio.gather(*self._deliveries, return_exceptions=True)
+        await self._client.close()
+        await self._runner.cleanup()
+
+    def mark_sent(self, update_id: int):
+        now = time.perf_counter()
+        self.sent_at[update_id] = now
+        if self.first_sent is None:
+            self.first_sent = now
+
+    def push(self, update: dict):
+        """Новый апдейт: в очередь getUpdates или на вебхук бота"""
+        self.mark_sent(update["update_id"])
+        if self.webhook_url:
+            task = asyncio.create_task(self._deliver(update))
+            self._deliveries.add(task)
+            task.add_done_callback(self._deliveries.discard)
+            return
+        self.pending.append(update)
+        self._new.set()
+
+    def add_file(self, file_id: str, data: bytes):
+        """Файл, который бот сможет получить через getFile"""
+        self.files[file_id] = data
+
+    async def _deliver(self, update: dict):
+        # Как и Telegram, повторяем доставку, пока бот не ответит 200
+        body = json.dumps(update)
+        headers = {
+            SECRET_HEADER: self.webhook_secret,
+            "Content-Type": "application/json",
+        }
+        while True:
+            async with self._connections:
+                try:
+                    async with self._client.post(
+                        self.webhook_url, data=body, headers=headers
+                    ) as response:
+                        if response.status == 200:
+                            return
+                except OSError:
+                    pass
+            self.delivery_retries += 1
+            await asyncio.sleep(0.1)
+
+    async def handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        params = dict(await request.post())
+        self.calls[method] += 1
+        if self.latency or self.jitter:
+            await asyncio.sleep(self.latency + self._random.random() * self.jitter)
+        if (
+            method in LIMITED
+            and self.flood_rate
+            and self._random.random() < self.flood_rate
+        ):
+            self.throttled[method] += 1
+            return web.json_response(
+                {
+                    "ok": False,
+                    "error_code": 429,
+                    "description": f"Too Many Requests: retry after {self.retry_after}",
+                    "parameters": {"retry_after": self.retry_after},
+                },
+                status=429,
+            )
+
+        if method == "getUpdates":
+            result = await self.get_updates(params)
+        elif method in ("sendMessage", "editMessageText"):
+            result = self.reply(params)
+        elif method == "sendPhoto":
+            result = await self.send_photo(params)
+        elif method == "getFile":
+            result = self.get_file(params)
+            if result is None:
+                return web.json_response(
+                    {
+                        "ok": False,
+                        "error_code": 400,
+                        "description": "Bad Request: invalid file_id",
+                    },
+                    status=400,
+                )
+        elif method == "setWebhook":
+            self.webhook_url = params["url"]
+            self.webhook_secret = params.get("secret_token", "")
+            result = True
+        elif method == "deleteWebhook":
+            self.webhook_url = None
+            result = True
+        elif method == "getMe":
+            result = {"id": 42, "is_bot": True, "first_name": "Bench"}
+        else:
+            result = True
+        return web.json_response({"ok": True, "result": result})
+
+    async def get_updates(self, params: dict) -> list:
+        offset = int(params.get("offset", 0))
+        limit = int(params.get("limit", 100))
+        timeout = float(params.get("timeout", 0))
+        self.pending = [u for u in self.pending if u["update_id"] >= offset]
+        if not self.pending and timeout:
+            self._new.clear()
+            try:
+                await asyncio.wait_for(self._new.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return self.pending[:limit]
+
+    def _message(self, chat_id: int, **fields) -> dict:
+        return {
+            "message_id": next(self._message_ids),
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            **fields,
+        }
+
+    def reply(self, params: dict) -> dict:
+        chat_id = int(params["chat_id"])
+        text = params.get("text", "")
+        if text.isdigit() and int(text) in self.sent_at:
+            self._track(chat_id, int(text))
+        return self._message(chat_id, text=text)
+
+    def _track(self, chat_id: int, update_id: int):
+        now = time.perf_counter()
+        self.latencies.append(now - self.sent_at[update_id])
+        if self.first_reply is None:
+            self.first_reply = now
+        self.last_reply = now
+        if len(self.latencies) == self.expected:
+            self.done.set()
+        if update_id < self._last_by_chat.get(chat_id, 0):
+            self.out_of_order += 1
+        self._last_by_chat[chat_id] = update_id
+
+    async def send_photo(self, params: dict) -> dict:
+        photo = params["photo"]
+        if isinstance(photo, web.FileField):
+            # Загруженный файл сохраняем: бот может отправить его снова по file_id
+            file_id = f"upload_{len(self.files) + 1}"
+            self.files[file_id] = photo.file.read()
+        else:
+            file_id = photo
+        size = {
+            "file_id": file_id,
+            "file_unique_id": file_id,
+            "width": 640,
+            "height": 640,
+        }
+        return self._message(
+            int(params["chat_id"]), photo=[size], caption=params.get("caption", "")
+        )
+
+    def get_file(self, params: dict) -> Optional[dict]:
+        file_id = params["file_id"]
+        data = self.files.get(file_id)
+        if data is None:
+            return None
+        return {
+            "file_id": file_id,
+            "file_unique_id": file_id,
+            "file_size": len(data),
+            "file_path": f"photos/{file_id}.jpg",
+        }
+
+    async def download(self, request: web.Request) -> web.Response:
+        file_id = request.match_info["path"].rpartition("/")[2].rpartition(".")[0]
+        data = self.files.get(file_id)
+        if data is None:
+            return web.Response(status=404)
+        self.calls["download"] += 1
+        return web.Response(body=data, content_type="image/jpeg")
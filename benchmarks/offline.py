@@ -0,0 +1,106 @@
+"""Бот без сети для бенчмарков через Dispatcher.feed_update.
+
+Сессия записывает исходящие вызовы вместо запросов к Telegram, фабрика
+собирает апдейты от имени синтетических пользователей.
+"""
+
+import datetime
+import itertools
+from collections import Counter
+
+from aiogram.client.session.base import BaseSession
+from aiogram.methods import EditMessageText, SendMessage, SendPhoto
+from aiogram.types import (
+    CallbackQuery,
+    Chat,
+    Contact,
+    Message,
+    PhotoSize,
+    Update,
+    User,
+)
+
+
+class RecordingSession(BaseSession):
+    """Сессия без сети: запоминает вызовы и тексты, отправленные в каждый чат"""
+
+    def __init__(self):
+        super().__init__()
+        self.calls = Counter()
+        self.texts = {}
+
+    async def make_request(self, bot, method, timeout=None):
+        self.calls[type(method).__name__] += 1
+        if isinstance(method, (SendMessage, EditMessageText, SendPhoto)):
+            text = getattr(method, "text", None) or getattr(method, "caption", None)
+            self.texts.setdefault(method.chat_id, []).append(text)
+            return Message(
+                message_id=1,
+                date=datetime.datetime.now(),
+                chat=Chat(id=method.chat_id, type="private"),
+                text=text,
+            )
+        return True
+
+    async def stream_content(self, *args, **kwargs):
+        yield b""
+
+    async def close(self):
+        pass
+
+
+class Updates:
+    """Апдейты синтетических пользователей со сквозной нумерацией"""
+
+    def __init__(self):
+        self._ids = itertools.count(1)
+
+    @staticmethod
+    def _user(user_id: int) -> User:
+        return User(
+            id=user_id, is_bot=False, first_name="Load", username=f"load{user_id}"
+        )
+
+    def _message(self, user_id: int, **fields) -> Update:
+        update_id = next(self._ids)
+        return Update(
+            update_id=update_id,
+            message=Message(
+                message_id=update_id,
+                date=datetime.datetime.now(),
+                chat=Chat(id=user_id, type="private"),
+                from_user=self._user(user_id),
+                **fields,
+            ),
+        )
+
+    def message(self, user_id: int, text: str) -> Update:
+        return self._message(user_id, text=text)
+
+    def contact(self, user_id: int, phone: str = "+70000000000") -> Update:
+        return self._message(
+            user_id,
+            contact=Contact(phone_number=phone, first_name="Load", user_id=user_id),
+        )
+
+    def photo(self, user_id: int, file_id: str) -> Update:
+        size = PhotoSize(file_id=file_id, file_unique_id=file_id, width=640, height=640)
+        return self._message(user_id, photo=[size])
+
+    def callback(self, user_id: int, data: str) -> Update:
+        update_id = next(self._ids)
+        return Update(
+            update_id=update_id,
+            callback_query=CallbackQuery(
+                id=str(update_id),
+                chat_instance="bench",
+                from_user=self._user(user_id),
+                message=Message(
+                    message_id=update_id,
+                    date=datetime.datetime.now(),
+                    chat=Chat(id=user_id, type="private"),
+                    text="bench",
+                ),
+                data=data,
+            ),
+        )
@@ -5,5 +5,43 @@ from pathlib import Path
 load_dotenv()
 
 BOT_TOKEN = os.getenv("BOT_TOKEN")
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", "")
 ADMIN_IDS = list(map(int, os.getenv("ADMIN_IDS").split(",")))
 DATABASE_URL = Path("data/restaurant.sqlite3")
+DB_READERS = int(os.getenv("DB_READERS", 4))
+DB_BUSY_TIMEOUT = int(os.getenv("DB_BUSY_TIMEOUT", 5000))
+DB_GROUP_COMMIT = os.getenv("DB_GROUP_COMMIT", "0") == "1"
+DB_BATCH_SIZE = int(os.getenv("DB_BATCH_SIZE", 64))
+DB_BATCH_LATENCY_MS = float(os.getenv("DB_BATCH_LATENCY_MS", 5))
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", 10000))
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", 300))
+CART_STORE = os.getenv("CART_STORE", "0") == "1"
+CART_FLUSH_INTERVAL = float(os.getenv("CART_FLUSH_INTERVAL", 1))
+FSM_STORAGE = os.getenv("FSM_STORAGE", "sqlite")
+FSM_CACHE_SIZE = int(os.getenv("FSM_CACHE_SIZE", 10000))
+FSM_TTL = float(os.getenv("FSM_TTL", 86400))
+FSM_FLUSH_INTERVAL = float(os.getenv("FSM_FLUSH_INTERVAL", 1))
+SCHEDULER_BATCH_SIZE = int(os.getenv("SCHEDULER_BATCH_SIZE", 100))
+RATING_PROMPT_DELAY = float(os.getenv("RATING_PROMPT_DELAY", 3600))
+FLOOD_GLOBAL_RATE = float(os.getenv("FLOOD_GLOBAL_RATE", 30))
+FLOOD_PRIVATE_RATE = float(os.getenv("FLOOD_PRIVATE_RATE", 1))
+FLOOD_GROUP_PER_MINUTE = float(os.getenv("FLOOD_GROUP_PER_MINUTE", 20))
+FLOOD_BURST = int(os.getenv("FLOOD_BURST", 3))
+BROADCAST_CONCURRENCY = int(os.getenv("BROADCAST_CONCURRENCY", 30))
+BOT_MODE = os.getenv("BOT_MODE", "polling")
+WEBHOOK_URL = os.getenv("WEBHOOK_URL", "")
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/webhook")
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET")
+WEBHOOK_HOST = os.getenv("WEBHOOK_HOST", "0.0.0.0")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", 8080))
+WEBHOOK_QUEUE_SIZE = int(os.getenv("WEBHOOK_QUEUE_SIZE", 10000))
+WORKERS = int(os.getenv("WORKERS", 1))
+WORKER_QUEUE_SIZE = int(os.getenv("WORKER_QUEUE_SIZE", 10000))
+UPDATE_CONCURRENCY = int(os.getenv("UPDATE_CONCURRENCY", 1000))
+ADMISSION_LIMIT = int(os.getenv("ADMISSION_LIMIT", 50))
+ADMISSION_MAX_WAIT = float(os.getenv("ADMISSION_MAX_WAIT", 2))
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", 500))
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", 0))
+DB_PROFILE = os.getenv("DB_PROFILE", "0") == "1"
+DB_PROFILE_REPEAT = int(os.getenv("DB_PROFILE_REPEAT", 5))
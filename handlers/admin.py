@@ -1,18 +1,36 @@
 from aiogram import types, Router, F
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
-from aiogram.filters import Command
+from aiogram.filters import Command, and_f, or_f
 from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
 from aiogram.utils.keyboard import InlineKeyboardBuilder
+import asyncio
 from html import escape
-from keyboards.inline import admin_menu_keyboard, edit_keyboard
-from loader import db
-from data.config import ADMIN_IDS
+from keyboards.inline import admin_menu_keyboard, edit_keyboard, stats_keyboard
+from loader import db, flood_control, profiler
+from data.config import ADMIN_IDS, BROADCAST_CONCURRENCY
+from services.broadcast import broadcast
+from services.metrics import metrics
 from states import AdminActions
-from utils.helpers import is_admin
+from utils.helpers import format_metrics, is_admin
+from utils.pagination import (
+    NEXT,
+    Page,
+    page_callback,
+    pagination_row,
+    parse_page_callback,
+)
 
 router = Router()
 
+# Страница отзывов должна помещаться в одно сообщение (4096 символов)
+FEEDBACK_PAGE_SIZE = 5
+COMMENT_PREVIEW = 500
+# Периоды фильтра отзывов: дни (0 — все время) и подпись кнопки
+FEEDBACK_PERIODS = ((0, "Все время"), (1, "Сегодня"), (7, "7 дней"), (30, "30 дней"))
+# Ссылки на идущие рассылки, чтобы задачи не собрал сборщик мусора
+_broadcasts = set()
+
 
 class AdminActions(StatesGroup):
     AddDishName = State()
@@ -25,13 +43,12 @@ class AdminActions(StatesGroup):
     EditDishDescription = State()
     EditDishPrice = State()
     EditDishCategory = State()
+    BroadcastText = State()
 
 
 @router.message(Command("admin"))
-async def show_admin_menu(message: types.Message):
-    user = await db.get_user(message.from_user.id)
-
-    if user[0] in ADMIN_IDS:
+async def show_admin_menu(message: types.Message, user):
+    if user and user["user_id"] in ADMIN_IDS:
         await message.answer("👨‍💻 Админ-панель:", reply_markup=admin_menu_keyboard())
     else:
         await message.answer("Вы не админ")
@@ -43,16 +60,133 @@ async def show_admin_menu(message: types.Message):
 async def view_stats(call: types.CallbackQuery):
     stats = await db.get_admin_stats()
 
+    by_status = "".join(
+        f"• {escape(status or '-')}: {orders} ({revenue:.2f} руб.)\n"
+        for status, (orders, revenue) in stats["by_status"].items()
+    )
     text = (
         "📊 Статистика заказов:\n\n"
         f"• Всего заказов: {stats['total_orders']}\n"
         f"• Средний чек: {stats['avg_order']:.2f} руб.\n"
         f"• Общий доход: {stats['total_revenue']:.2f} руб.\n\n"
+        f"По статусам:\n{by_status}\n"
         "Последние заказы:\n"
         f"{stats['recent_orders']}"
     )
 
-    await call.message.edit_text(text, reply_markup=admin_menu_keyboard())
+    await call.message.edit_text(text, reply_markup=stats_keyboard())
+
+
+@router.callback_query(
+    F.from_user.func(lambda user: is_admin(user.id)),
+    F.data.regexp(r"^admin_stats_\d+$"),
+)
+async def view_period_stats(call: types.CallbackQuery):
+    days = int(call.data.split("_")[-1])
+    sales = await db.get_sales_summary(days)
+    categories = await db.get_category_sales(days)
+
+    title = "сегодня" if days == 1 else f"{days} дн."
+    rows = "".join(
+        f"• {row['bucket']}: {row['orders']} зак., {row['revenue']:.2f} руб.\n"
+        for row in sales["rows"]
+    )
+    by_category = "".join(
+        f"• {escape(row['name'])}: {row['quantity']} шт., {row['revenue']:.2f} руб.\n"
+        for row in categories
+    )
+    text = (
+        f"📈 Продажи за {title} (UTC):\n\n"
+        f"• Заказов: {sales['orders']}\n"
+        f"• Выручка: {sales['revenue']:.2f} руб.\n"
+        f"• Средний чек: {sales['avg_order']:.2f} руб.\n"
+        f"• Порций: {sales['quantity']}\n\n"
+        f"{rows or 'Нет продаж'}\n\n"
+        f"По категориям:\n{by_category or '-'}"
+    )
+    await call.message.edit_text(text, reply_markup=stats_keyboard())
+    await call.answer()
+
+
+@router.callback_query(
+    F.from_user.func(lambda user: is_admin(user.id)), F.data == "admin_stats_top"
+)
+async def view_top_dishes(call: types.CallbackQuery):
+    dishes = await db.get_top_dishes(30, 10)
+    top = "".join(
+        f"{i}. {escape(dish['name'])}: {dish['quantity']} шт., "
+        f"{dish['revenue']:.2f} руб.\n"
+        for i, dish in enumerate(dishes, 1)
+    )
+    await call.message.edit_text(
+        f"🏆 Топ блюд за 30 дней:\n\n{top or 'Нет продаж'}",
+        reply_markup=stats_keyboard(),
+    )
+    await call.answer()
+
+
+@router.message(
+    F.from_user.func(lambda user: is_admin(user.id)), Command("rebuild_stats")
+)
+async def rebuild_stats(message: types.Message):
+    if await db.rebuild_stats() and await db.backfill_rollups():
+        await message.answer("✅ Статистика заказов и срезы продаж пересчитаны")
+    else:
+        await message.answer("❌ Не удалось пересчитать статистику")
+
+
+@router.message(F.from_user.func(lambda user: is_admin(user.id)), Command("metrics"))
+async def show_metrics(message: types.Message):
+    await message.answer(format_metrics(metrics))
+
+
+@router.message(F.from_user.func(lambda user: is_admin(user.id)), Command("db_profile"))
+async def show_db_profile(message: types.Message):
+    if profiler is None:
+        await message.answer("Профилирование выключено, запустите бота с DB_PROFILE=1")
+        return
+    # Сообщение не длиннее 4096 символов: формы запросов обрезаем
+    report = profiler.report(n=5, width=150)[:3500]
+    await message.answer(f"<pre>{escape(report)}</pre>")
+
+
+@router.callback_query(
+    F.from_user.func(lambda user: is_admin(user.id)), F.data == "admin_broadcast"
+)
+async def broadcast_start(call: types.CallbackQuery, state: FSMContext):
+    keyboard = InlineKeyboardMarkup(
+        inline_keyboard=[
+            [InlineKeyboardButton(text="◀️ Назад", callback_data="admin_back")]
+        ]
+    )
+    await call.message.edit_text(
+        "Отправьте текст рассылки для всех пользователей:", reply_markup=keyboard
+    )
+    await state.set_state(AdminActions.BroadcastText)
+
+
+@router.message(
+    F.from_user.func(lambda user: is_admin(user.id)), AdminActions.BroadcastText
+)
+async def broadcast_text(message: types.Message, state: FSMContext):
+    await state.clear()
+    task = asyncio.create_task(_run_broadcast(message, message.html_text))
+    _broadcasts.add(task)
+    task.add_done_callback(_broadcasts.discard)
+    await message.answer("📣 Рассылка запущена, по завершении пришлю итоги")
+
+
+async def _run_broadcast(message: types.Message, text: str):
+    """Рассылка в фоне с отчетом админу"""
+    result = await broadcast(message.bot, db, text, concurrency=BROADCAST_CONCURRENCY)
+    bulk = flood_control.stats()["bulk"]
+    await message.answer(
+        "✅ Рассылка завершена\n\n"
+        f"• Доставлено: {result['sent']}\n"
+        f"• Заблокировали бота: {result['blocked']}\n"
+        f"• Ошибок: {result['failed']}\n"
+        f"• Среднее ожидание в очереди: {bulk['avg_wait_ms']:.0f} мс"
+    )
 
 
 @router.callback_query(
@@ -177,45 +311,63 @@ async def manage_menu(call: types.CallbackQuery):
     )
 
 
-@router.callback_query(F.data == "admin_manage_orders")
-async def manage_orders(call: types.CallbackQuery):
-    orders = await db.get_recent_orders(5)
+def _page_keyboard(prefix: str, page: Page, rows=()):
+    """Клавиатура страницы: строки, навигация и возврат в админку"""
+    buttons = [list(row) for row in rows]
+    navigation = pagination_row(prefix, page)
+    if navigation:
+        buttons.append(navigation)
+    buttons.append([InlineKeyboardButton(text="◀️ Назад", callback_data="admin_back")])
+    return InlineKeyboardMarkup(inline_keyboard=buttons)
 
-    builder = InlineKeyboardBuilder()
-    for order in orders:
-        builder.row(
-            InlineKeyboardButton(
-                text=f"Заказ #{order['id']} - {order['status']}",
-                callback_data=f"admin_order_{order['id']}",
-            )
-        )
-    builder.row(InlineKeyboardButton(text="◀️ Назад", callback_data="admin_back"))
 
-    text = "📦 Последние заказы:\n"
-    text += "\n".join(
-        [f"#{o['id']} - {o['status']} - {o['total']} руб." for o in orders]
+@router.callback_query(
+    F.from_user.func(lambda user: is_admin(user.id)),
+    or_f(F.data == "admin_manage_orders", F.data.startswith("admin_orders:")),
+)
+async def manage_orders(call: types.CallbackQuery):
+    direction, cursor = NEXT, None
+    if call.data.startswith("admin_orders:"):
+        direction, cursor = parse_page_callback(call.data)
+    page = await db.get_orders_page(cursor, direction)
+
+    text = "📦 Заказы:\n\n"
+    text += (
+        "\n".join(
+            f"#{o['order_id']} - {o['created_at']} - {escape(o['status'] or '-')} "
+            f"- {o['total_amount']} руб."
+            for o in page.rows
+        )
+        or "Пока нет заказов"
     )
 
-    await call.message.edit_text(text, reply_markup=builder.as_markup())
+    await call.message.edit_text(
+        text, reply_markup=_page_keyboard("admin_orders", page)
+    )
+    await call.answer()
 
 
-@router.callback_query(F.data == "admin_manage_users")
+@router.callback_query(
+    F.from_user.func(lambda user: is_admin(user.id)),
+    or_f(F.data == "admin_manage_users", F.data.startswith("admin_users:")),
+)
 async def manage_users(call: types.CallbackQuery):
-    users = await db.get_recent_users(5)
-
-    builder = InlineKeyboardBuilder()
-    for user in users:
-        builder.row(
-            InlineKeyboardButton(
-                text=f"👤 {user['full_name']}", callback_data=f"admin_user_{user['id']}"
-            )
+    direction, cursor = NEXT, None
+    if call.data.startswith("admin_users:"):
+        direction, cursor = parse_page_callback(call.data)
+    page = await db.get_users_page(cursor, direction)
+
+    text = "👥 Пользователи:\n\n"
+    text += (
+        "\n".join(
+            f"{escape(u['full_name'] or '-')} (ID {u['user_id']}) - {u['registration_date']}"
+            for u in page.rows
         )
-    builder.row(InlineKeyboardButton(text="◀️ Назад", callback_data="admin_back"))
-
-    text = "👥 Последние пользователи:\n"
-    text += "\n".join([f"{u['full_name']} - {u['registration_date']}" for u in users])
+        or "Пока нет пользователей"
+    )
 
-    await call.message.edit_text(text, reply_markup=builder.as_markup())
+    await call.message.edit_text(text, reply_markup=_page_keyboard("admin_users", page))
+    await call.answer()
 
 
 @router.callback_query(F.data == "admin_manage_categories")
@@ -420,35 +572,39 @@ async def do_delete_category(call: types.CallbackQuery):
         )
 
 
-@router.callback_query(F.data == "admin_edit_dish")
+@router.callback_query(
+    or_f(
+        F.data == "admin_edit_dish",
+        and_f(F.data.startswith("admin_dishes:"), AdminActions.EditDishSelect),
+    )
+)
 async def edit_dish_start(call: types.CallbackQuery, state: FSMContext):
     """Начало редактирования блюда - выбор блюда"""
     try:
-        dishes = await db.get_all_dishes()
+        direction, cursor = NEXT, None
+        if call.data.startswith("admin_dishes:"):
+            direction, cursor = parse_page_callback(call.data)
+        page = await db.get_dishes_page(cursor, direction)
 
-        if not dishes:
+        if not page.rows:
             await call.message.edit_text(
                 "Нет блюд для редактирования", reply_markup=admin_menu_keyboard()
             )
             return
 
-        if not isinstance(dishes, list) or not all(isinstance(d, dict) for d in dishes):
-            raise ValueError("Invalid dishes data format")
-
-        builder = InlineKeyboardBuilder()
-        for dish in dishes:
-            if not all(key in dish for key in ["dish_id", "name", "price"]):
-                continue
-
-            builder.button(
-                text=f"{dish['name']} ({dish['price']} руб.)",
-                callback_data=f"admin_edit_select_{dish['dish_id']}",
-            )
-        builder.button(text="◀️ Назад", callback_data="admin_back")
-        builder.adjust(1)
+        rows = [
+            [
+                InlineKeyboardButton(
+                    text=f"{dish['name']} ({dish['price']} руб.)",
+                    callback_data=f"admin_edit_select_{dish['dish_id']}",
+                )
+            ]
+            for dish in page.rows
+        ]
 
         await call.message.edit_text(
-            "Выберите блюдо для редактирования:", reply_markup=builder.as_markup()
+            "Выберите блюдо для редактирования:",
+            reply_markup=_page_keyboard("admin_dishes", page, rows),
         )
         await state.set_state(AdminActions.EditDishSelect)
 
@@ -590,39 +746,95 @@ async def edit_dish_category_select(call: types.CallbackQuery, state: FSMContext
     await state.set_state(AdminActions.EditDishSelect)
 
 
-@router.callback_query(F.data == "admin_view_feedback")
+def _feedback_prefix(rating: int, days: int) -> str:
+    """Префикс callback_data страниц отзывов с текущими фильтрами"""
+    return f"admin_fb_{rating}_{days}"
+
+
+def _feedback_filters_keyboard(rating: int, days: int):
+    """Кнопки фильтров по оценке и периоду, текущие отмечены точкой"""
+
+    def mark(text, selected):
+        return f"• {text}" if selected else text
+
+    ratings = [
+        InlineKeyboardButton(
+            text=mark("Все", rating == 0),
+            callback_data=page_callback(_feedback_prefix(0, days), NEXT, None),
+        )
+    ] + [
+        InlineKeyboardButton(
+            text=mark(f"{value}★", rating == value),
+            callback_data=page_callback(_feedback_prefix(value, days), NEXT, None),
+        )
+        for value in range(1, 6)
+    ]
+    periods = [
+        InlineKeyboardButton(
+            text=mark(title, days == value),
+            callback_data=page_callback(_feedback_prefix(rating, value), NEXT, None),
+        )
+        for value, title in FEEDBACK_PERIODS
+    ]
+    return [ratings, periods]
+
+
+@router.callback_query(
+    F.from_user.func(lambda user: is_admin(user.id)),
+    or_f(F.data == "admin_view_feedback", F.data.startswith("admin_fb_")),
+)
 async def view_feedback(call: types.CallbackQuery):
-    """Просмотр всех отзывов"""
+    """Просмотр отзывов по страницам с фильтрами по оценке и периоду"""
     try:
-        feedbacks = await db.get_all_feedback()
-
-        if not feedbacks:
-            await call.message.edit_text(
-                "Пока нет отзывов", reply_markup=admin_menu_keyboard()
-            )
-            return
+        rating, days, direction, cursor = 0, 0, NEXT, None
+        if call.data.startswith("admin_fb_"):
+            prefix, _ = call.data.split(":", 1)
+            rating, days = map(int, prefix.split("_")[2:4])
+            direction, cursor = parse_page_callback(call.data)
+
+        # Два запроса на экран при любом числе отзывов:
+        # страница с именами авторов и сводка по feedback_daily
+        page = await db.get_feedback_page(
+            cursor, direction, FEEDBACK_PAGE_SIZE, rating=rating, days=days
+        )
+        summary = await db.get_feedback_summary(days)
 
-        text = "📝 Все отзывы:\n\n"
-        for fb in feedbacks:
-            user = await db.get_user(fb["user_id"])
-            username = user[1] if user and len(user) > 1 else "Аноним"
+        peak = max(summary["histogram"].values()) or 1
+        text = (
+            f"📝 Отзывы: {summary['count']}, "
+            f"средняя оценка {summary['avg_rating']:.2f}\n"
+        )
+        for value in range(5, 0, -1):
+            reviews = summary["histogram"][value]
+            bar = "█" * round(reviews / peak * 10)
+            text += f"{value}★ {bar} {reviews}\n"
+        text += "\n"
+
+        if not page.rows:
+            text += "Нет отзывов по выбранным фильтрам"
+        for fb in page.rows:
+            username = fb["username"] or fb["full_name"] or "Аноним"
             text += (
                 f"⭐️ Оценка: {fb['rating']}/5\n"
-                f"👤 Пользователь: {username}\n"
+                f"👤 Пользователь: {escape(username)}\n"
                 f"📅 Дата: {fb['created_at']}\n"
             )
             if fb["comment"]:
-                text += f"📝 Комментарий: {fb['comment']}\n"
+                comment = fb["comment"]
+                if len(comment) > COMMENT_PREVIEW:
+                    comment = comment[:COMMENT_PREVIEW] + "…"
+                text += f"📝 Комментарий: {escape(comment)}\n"
             text += "――――――――――――――――――――\n"
 
-        keyboard = InlineKeyboardMarkup(
-            inline_keyboard=[
-                [InlineKeyboardButton(text="◀️ Назад", callback_data="admin_back")]
-            ]
+        await call.message.edit_text(
+            text,
+            reply_markup=_page_keyboard(
+                _feedback_prefix(rating, days),
+                page,
+                _feedback_filters_keyboard(rating, days),
+            ),
         )
 
-        await call.message.edit_text(text, reply_markup=keyboard)
-
     except Exception as e:
         await call.message.edit_text(
             "Ошибка при получении отзывов", reply_markup=admin_menu_keyboard()
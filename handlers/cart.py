@@ -3,12 +3,12 @@ from aiogram.filters import Command, StateFilter
 from aiogram.fsm.context import FSMContext
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 import loader
-from keyboards.inline import cart_keyboard, menu_categories_keyboard
+from keyboards.inline import cart_keyboard
 from loader import db
 from handlers.menu import show_menu_categories
 from states import CartActions
 from utils.helpers import format_cart
-from typing import Union
+from typing import Optional, Union
 import json
 
 router = Router()
@@ -18,8 +18,11 @@ async def _show_cart(
     user_id: int,
     message_or_callback: Union[types.Message, types.CallbackQuery],
     state: FSMContext,
+    cart_items: Optional[list] = None,
 ):
-    cart_items = await db.get_cart_items(user_id)
+    # Методы изменения корзины уже вернули ее строки, повторно не читаем
+    if cart_items is None:
+        cart_items = await db.get_cart_items(user_id)
 
     if not cart_items:
         if isinstance(message_or_callback, types.Message):
@@ -62,35 +65,37 @@ async def add_to_cart(callback: types.CallbackQuery, state: FSMContext):
         return
 
     # Добавляем блюдо в корзину
-    await db.create_cart_tables()
     await db.add_to_cart(user_id, dish_id, dish["name"], dish["price"])
 
     await callback.answer(f"{dish['name']} добавлено в корзину!")
 
     # Возвращаемся в меню
-    await callback.message.edit_text("🍽 Меню:", show_menu_categories())
+    await show_menu_categories(callback.message, state)
 
 
 @router.callback_query(F.data.startswith("remove_"), CartActions.ManageCart)
 async def remove_from_cart(callback: types.CallbackQuery, state: FSMContext):
-    item_id = int(callback.data.split("_")[1])
-    await db.remove_from_cart(callback.from_user.id, item_id)
+    dish_id = int(callback.data.split("_")[1])
+    cart = await db.remove_from_cart(callback.from_user.id, dish_id)
     await callback.answer("Товар удалён из корзины")
-    await _show_cart(callback.from_user.id, callback, state)
+    await _show_cart(callback.from_user.id, callback, state, cart["items"])
 
 
 @router.callback_query(F.data.startswith("change_qty_"), CartActions.ManageCart)
 async def change_quantity(callback: types.CallbackQuery, state: FSMContext):
     data = callback.data.split("_")
     action = data[2]
-    item_id = int(data[3])
+    dish_id = int(data[3])
 
+    cart = None
     if action == "inc":
-        await db.increase_quantity(callback.from_user.id, item_id)
+        cart = await db.increase_quantity(callback.from_user.id, dish_id)
     elif action == "dec":
-        await db.decrease_quantity(callback.from_user.id, item_id)
+        cart = await db.decrease_quantity(callback.from_user.id, dish_id)
 
-    await _show_cart(callback.from_user.id, callback, state)
+    await _show_cart(
+        callback.from_user.id, callback, state, cart["items"] if cart else None
+    )
 
 
 @router.callback_query(F.data == "clear_cart", CartActions.ManageCart)
@@ -100,10 +105,7 @@ async def clear_cart(callback: types.CallbackQuery, state: FSMContext):
     await state.clear()
 
     # Возвращаемся в меню
-    menu = await db.get_menu()
-    await callback.message.edit_text(
-        "🍽 Меню:", reply_markup=menu_categories_keyboard(menu)
-    )
+    await show_menu_categories(callback.message, state)
 
 
 @router.callback_query(F.data == "checkout", CartActions.ManageCart)
@@ -72,5 +72,25 @@ async def skip_comment(message: types.Message, state: FSMContext):
     await state.clear()
 
 
+@router.callback_query(F.data.startswith("rate_order_"))
+async def rate_order(callback: types.CallbackQuery):
+    """Оценка заказа из отложенного напоминания"""
+    try:
+        order_id, rating = map(int, callback.data.split("_")[2:4])
+    except ValueError:
+        await callback.answer()
+        return
+    # Данные кнопки присылает клиент: оценку проверяем, заказ — в базе
+    if not 1 <= rating <= 5:
+        await callback.answer()
+        return
+    saved = await db.add_order_rating(callback.from_user.id, order_id, rating)
+    if not saved:
+        await callback.answer("Этот заказ уже оценен или недоступен", show_alert=True)
+        return
+    await callback.message.edit_text(f"Спасибо за оценку заказа #{order_id}: {rating}★")
+    await callback.answer()
+
+
 def register_feedback_handlers(dp):
     dp.include_router(router)
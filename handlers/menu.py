@@ -5,9 +5,9 @@ from aiogram.filters import Command
 from aiogram.fsm.state import State, StatesGroup
 
 from keyboards.inline import (
-    menu_categories_keyboard,
-    dishes_keyboard,
-    back_to_menu_keyboard,
+    cached_menu_categories_keyboard,
+    cached_dishes_keyboard,
+    cached_back_to_menu_keyboard,
 )
 from loader import db
 
@@ -22,9 +22,12 @@ class MenuNavigation(StatesGroup):
 @router.message(Command("menu"))
 @router.message(F.text == "🍽 Меню")
 async def show_menu_categories(message: types.Message, state: FSMContext):
+    # Версию берем до чтения меню, чтобы не закэшировать старые данные под новой
+    version = db.menu_cache.version
     categories = await db.get_dish_categories()
     await message.answer(
-        "🍽 Выберите категорию:", reply_markup=menu_categories_keyboard(categories)
+        "🍽 Выберите категорию:",
+        reply_markup=cached_menu_categories_keyboard(version, categories),
     )
     await state.set_state(MenuNavigation.ChooseCategory)
 
@@ -33,6 +36,7 @@ async def show_menu_categories(message: types.Message, state: FSMContext):
 async def show_dishes_in_category(call: types.CallbackQuery, state: FSMContext):
     try:
         category_id = int(call.data.split("_")[1])
+        version = db.menu_cache.version
         dishes = await db.get_dishes_by_category(category_id)
 
         category = await db.get_category(category_id)
@@ -45,7 +49,7 @@ async def show_dishes_in_category(call: types.CallbackQuery, state: FSMContext):
 
         await call.message.edit_text(
             f"🍴 {category_name}:\nВыберите блюдо:",
-            reply_markup=dishes_keyboard(dishes, category_id),
+            reply_markup=cached_dishes_keyboard(version, dishes, category_id),
         )
         await state.set_state(MenuNavigation.ChooseDish)
     except Exception as e:
@@ -56,6 +60,7 @@ async def show_dishes_in_category(call: types.CallbackQuery, state: FSMContext):
 async def show_dish_details(call: types.CallbackQuery, state: FSMContext):
     try:
         dish_id = int(call.data.split("_")[1])
+        version = db.menu_cache.version
         dish = await db.get_dish_by_id(dish_id)
 
         if not dish:
@@ -77,7 +82,9 @@ async def show_dish_details(call: types.CallbackQuery, state: FSMContext):
         text += f"💰 Цена: {price} руб.\n\n"
         text += "Выберите действие:"
 
-        await call.message.edit_text(text, reply_markup=back_to_menu_keyboard(dish_id))
+        await call.message.edit_text(
+            text, reply_markup=cached_back_to_menu_keyboard(version, dish_id)
+        )
     except json.JSONDecodeError:
         await call.answer("⚠️ Неверный формат данных")
     except Exception as e:
@@ -1,4 +1,3 @@
-import asyncio
 from aiogram import types, Router, F
 from aiogram.fsm.context import FSMContext
 from aiogram.filters import Command
@@ -11,8 +10,10 @@ from keyboards.reply import (
     request_location_keyboard,
     main_menu_keyboard,
 )
-from loader import db
+from data.config import RATING_PROMPT_DELAY
+from loader import db, scheduler
 from utils.helpers import format_order
+from utils.pagination import pagination_row, parse_page_callback
 
 router = Router()
 
@@ -62,31 +63,54 @@ async def clear_cart(call: types.CallbackQuery):
 
 @router.message(F.text == "📦 Мои заказы")
 async def show_user_orders(message: types.Message):
-    orders = await db.get_user_orders(message.from_user.id)
+    page = await db.get_user_orders_page(message.from_user.id)
 
-    if not orders:
+    if not page.rows:
         await message.answer("У вас пока нет заказов")
         return
 
+    await message.answer(_orders_text(page), reply_markup=_orders_keyboard(page))
+
+
+@router.callback_query(F.data.startswith("my_orders:"))
+async def page_user_orders(call: types.CallbackQuery):
+    direction, cursor = parse_page_callback(call.data)
+    page = await db.get_user_orders_page(call.from_user.id, cursor, direction)
+
+    if not page.rows:
+        await call.answer("У вас пока нет заказов")
+        return
+
+    await call.message.edit_text(
+        _orders_text(page), reply_markup=_orders_keyboard(page)
+    )
+    await call.answer()
+
+
+def _orders_text(page):
     orders_text = "📦 Ваши заказы:\n\n"
 
-    for order in orders:
+    for order in page.rows:
         status_emoji = {
             "new": "🆕",
             "processing": "🔄",
             "completed": "✅",
             "cancelled": "❌",
-        }.get(order["status"].lower(), "❓")
+        }.get((order["status"] or "").lower(), "❓")
 
         orders_text += (
-            f"{status_emoji} Заказ #{order['id']}\n"
-            f"📅 {order['created_at'].strftime('%d.%m.%Y %H:%M')}\n"
-            f"💰 Сумма: {order['total']} руб.\n"
-            f"🚚 {order['delivery_type']}\n"
-            f"📦 {len(order['items'])} позиций\n\n"
+            f"{status_emoji} Заказ #{order['order_id']}\n"
+            f"📅 {order['created_at']}\n"
+            f"💰 Сумма: {order['total_amount']} руб.\n"
+            f"🚚 {order['delivery_type']}\n\n"
         )
 
-    await message.answer(orders_text)
+    return orders_text
+
+
+def _orders_keyboard(page):
+    navigation = pagination_row("my_orders", page)
+    return InlineKeyboardMarkup(inline_keyboard=[navigation]) if navigation else None
 
 
 @router.callback_query(F.data == "checkout")
@@ -116,13 +140,11 @@ async def start_checkout(call: types.CallbackQuery, state: FSMContext):
 
 
 @router.callback_query(F.data.startswith("delivery_"))
-async def process_delivery_choice(call: types.CallbackQuery, state: FSMContext):
+async def process_delivery_choice(call: types.CallbackQuery, state: FSMContext, user):
     delivery_type = call.data.split("_")[1]
     await state.update_data(delivery_type=delivery_type)
 
     if delivery_type == "delivery":
-        user_data = await db.get_user(call.from_user.id)
-
         location_keyboard = InlineKeyboardMarkup(
             inline_keyboard=[
                 [
@@ -134,7 +156,7 @@ async def process_delivery_choice(call: types.CallbackQuery, state: FSMContext):
             ]
         )
 
-        if user_data:
+        if user:
             await call.message.edit_text(
                 "Отправте адрес:",
                 reply_markup=location_keyboard,
@@ -144,6 +166,14 @@ async def process_delivery_choice(call: types.CallbackQuery, state: FSMContext):
         await call.message.edit_text(
             "Самовывоз по адресу: ул. Питонова, 42\n" "Время работы: 10:00 - 22:00"
         )
+        await ask_phone(call.message, state)
+
+
+async def ask_phone(message: types.Message, state: FSMContext):
+    await message.answer(
+        "Отправьте номер телефона для связи:", reply_markup=request_phone_keyboard()
+    )
+    await state.set_state(OrderProcess.EnterPhone)
 
 
 @router.callback_query(F.data == "send_location")
@@ -151,6 +181,16 @@ async def request_location(call: types.CallbackQuery):
     await call.message.answer("зов", reply_markup=request_location_keyboard())
 
 
+@router.message(OrderProcess.EnterAddress, F.text | F.location)
+async def process_address(message: types.Message, state: FSMContext):
+    if message.location:
+        address = f"{message.location.latitude}, {message.location.longitude}"
+    else:
+        address = message.text
+    await state.update_data(address=address)
+    await ask_phone(message, state)
+
+
 @router.message(F.content_type == "location")
 async def handle_location(message: types.Message):
     await message.answer(
@@ -164,26 +204,21 @@ async def process_phone(message: types.Message, state: FSMContext):
     await state.update_data(phone_number=phone_number)
 
     data = await state.get_data()
-    cart_items = await db.get_cart_items(message.from_user.id)
-
-    total = sum(item["price"] * item["quantity"] for item in cart_items)
-
-    if "promo_code" in data:
-        discount = data["promo_discount"]
-        total = total * (1 - discount)
+    promo_discount = data.get("promo_discount", 0) if "promo_code" in data else 0
 
-    order_id = await db.create_order(
+    order_details = await db.place_order(
         user_id=message.from_user.id,
-        total_amount=total,
         delivery_type=data["delivery_type"],
         address=data.get("address", "Самовывоз"),
-        phone_number=phone_number,
+        phone=phone_number,
+        promo_discount=promo_discount,
     )
+    if not order_details:
+        await message.answer("Ваша корзина пуста", reply_markup=main_menu_keyboard())
+        await state.clear()
+        return
 
-    await db.add_order_items(order_id, cart_items)
-    await db.clear_cart(message.from_user.id)
-
-    order_details = await db.get_order_details(order_id)
+    order_id = order_details["order"]["order_id"]
     order_text = format_order(order_details)
 
     await message.answer(
@@ -193,13 +228,23 @@ async def process_phone(message: types.Message, state: FSMContext):
         reply_markup=types.ReplyKeyboardRemove(),
     )
 
-    await asyncio.sleep(3600)
-    await message.answer(
-        "Пожалуйста, оцените ваш заказ:", reply_markup=rating_keyboard(order_id)
+    # Просьба оценить заказ придет через час, даже если бот перезапустится
+    await scheduler.schedule(
+        "rating_prompt",
+        RATING_PROMPT_DELAY,
+        {"chat_id": message.chat.id, "order_id": order_id},
     )
-
     await state.clear()
 
 
+@scheduler.job("rating_prompt")
+async def send_rating_prompt(bot, payload: dict):
+    await bot.send_message(
+        payload["chat_id"],
+        "Пожалуйста, оцените ваш заказ:",
+        reply_markup=rating_keyboard(payload["order_id"]),
+    )
+
+
 def register_order_handlers(dp):
     dp.include_router(router)
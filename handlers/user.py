@@ -12,9 +12,7 @@ router = Router()
 
 
 @router.message(Command("start"))
-async def cmd_start(message: types.Message, state: FSMContext):
-    user = await db.get_user(message.from_user.id)
-
+async def cmd_start(message: types.Message, state: FSMContext, user):
     if not user:
         await message.answer(
             "👋 Добро пожаловать в бот ресторана 'Вкус питона'!\n"
@@ -145,9 +143,7 @@ async def VP(message: types.Message):
 
 
 @router.message(Command("profile"))
-async def cmd_profile(message: types.Message):
-    user = await db.get_user(message.from_user.id)
-
+async def cmd_profile(message: types.Message, user):
     if user:
         text = f"<b>Ваш профиль:</b>\n\n"
         text += f"🆔 ID: {user[0]}\n"
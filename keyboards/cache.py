@@ -0,0 +1,77 @@
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from aiogram.types import InlineKeyboardMarkup
+
+
+class MarkupCache:
+    """Готовые клавиатуры меню для текущей версии меню"""
+
+    def __init__(self):
+        self.version: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+        self._markups: Dict[Hashable, InlineKeyboardMarkup] = {}
+        # id(markup) -> markup для быстрой проверки, что клавиатура наша
+        self._owned: Dict[int, InlineKeyboardMarkup] = {}
+        # id(markup) -> JSON клавиатуры для Bot API
+        self._serialized: Dict[int, str] = {}
+
+    def get(
+        self,
+        version: int,
+        key: Hashable,
+        build: Callable[..., InlineKeyboardMarkup],
+        *args: Any,
+    ) -> InlineKeyboardMarkup:
+        """Клавиатура из кэша или build(*args), если меню поменялось"""
+        if self.version is None or version > self.version:
+            self.clear()
+            self.version = version
+        elif version < self.version:
+            # Запрос со снимком меню старше кэша: строим, но не кэшируем,
+            # иначе он сбросил бы клавиатуры нового меню
+            self.misses += 1
+            return build(*args)
+
+        markup = self._markups.get(key)
+        if markup is not None:
+            self.hits += 1
+            return markup
+
+        self.misses += 1
+        markup = build(*args)
+        self._markups[key] = markup
+        self._owned[id(markup)] = markup
+        return markup
+
+    def is_cached(self, markup: Any) -> bool:
+        """Клавиатура выдана этим кэшем и еще не сброшена"""
+        return self._owned.get(id(markup)) is markup
+
+    def serialized(self, markup: Any) -> Optional[str]:
+        """Сохраненный JSON клавиатуры, если она уже отправлялась"""
+        if not self.is_cached(markup):
+            return None
+        return self._serialized.get(id(markup))
+
+    def remember(self, markup: InlineKeyboardMarkup, serialized: str):
+        if self.is_cached(markup):
+            self._serialized[id(markup)] = serialized
+
+    def clear(self):
+        self._markups.clear()
+        self._owned.clear()
+        self._serialized.clear()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "version": self.version,
+            "size": len(self._markups),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0,
+        }
+
+
+markup_cache = MarkupCache()
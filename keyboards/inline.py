@@ -1,5 +1,6 @@
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 import json
+from keyboards.cache import markup_cache
 
 
 def menu_categories_keyboard(categories):
@@ -94,35 +95,50 @@ def dishes_keyboard(dishes, category_id):
     return keyboard
 
 
+def cached_menu_categories_keyboard(version, categories):
+    return markup_cache.get(version, "categories", menu_categories_keyboard, categories)
+
+
+def cached_dishes_keyboard(version, dishes, category_id):
+    return markup_cache.get(
+        version, ("dishes", category_id), dishes_keyboard, dishes, category_id
+    )
+
+
+def cached_back_to_menu_keyboard(version, dish_id):
+    return markup_cache.get(version, ("dish", dish_id), back_to_menu_keyboard, dish_id)
+
+
 def cart_keyboard(cart_items):
-    keyboard = InlineKeyboardMarkup
+    keyboard = InlineKeyboardMarkup(inline_keyboard=[])
 
     for item in cart_items:
-        keyboard.row(
-            InlineKeyboardButton(
-                text=f"❌ {item['name']} ({item['quantity']})",
-                callback_data=json.dumps(
-                    {
-                        "type": "cart",
-                        "action": "remove",
-                        "cart_item_id": item["cart_id"],
-                    }
+        dish_id = item["dish_id"]
+        keyboard.inline_keyboard.append(
+            [
+                InlineKeyboardButton(
+                    text="➖", callback_data=f"change_qty_dec_{dish_id}"
                 ),
-            )
+                InlineKeyboardButton(
+                    text=f"{item['name']} ({item['quantity']})",
+                    callback_data=f"remove_{dish_id}",
+                ),
+                InlineKeyboardButton(
+                    text="➕", callback_data=f"change_qty_inc_{dish_id}"
+                ),
+            ]
         )
 
-    keyboard.row(
-        InlineKeyboardButton(
-            text="✅ Оформить заказ",
-            callback_data=json.dumps({"type": "order", "action": "checkout"}),
-        )
+    keyboard.inline_keyboard.append(
+        [InlineKeyboardButton(text="✅ Оформить заказ", callback_data="checkout")]
     )
-
-    keyboard.row(
-        InlineKeyboardButton(
-            text="◀️ Вернуться в меню",
-            callback_data=json.dumps({"type": "menu", "action": "view_categories"}),
-        )
+    keyboard.inline_keyboard.append(
+        [
+            InlineKeyboardButton(text="🗑 Очистить", callback_data="clear_cart"),
+            InlineKeyboardButton(
+                text="◀️ Вернуться в меню", callback_data="back_to_menu"
+            ),
+        ]
     )
     return keyboard
 
@@ -152,19 +168,16 @@ def delivery_method_keyboard():
 
 
 def rating_keyboard(order_id):
-    keyboard = InlineKeyboardMarkup(row_width=5)
-    keyboard.add(
-        *[
-            InlineKeyboardButton(
-                text=f"{i}★",
-                callback_data=json.dumps(
-                    {"type": "feedback", "rating": i, "order_id": order_id}
-                ),
-            )
-            for i in range(1, 6)
+    return InlineKeyboardMarkup(
+        inline_keyboard=[
+            [
+                InlineKeyboardButton(
+                    text=f"{i}★", callback_data=f"rate_order_{order_id}_{i}"
+                )
+                for i in range(1, 6)
+            ]
         ]
     )
-    return keyboard
 
 
 def confirm_order_keyboard(order_id):
@@ -210,5 +223,30 @@ def admin_menu_keyboard():
                 text="📝 Просмотр отзывов", callback_data="admin_view_feedback"
             ),
         ],
+        [
+            InlineKeyboardButton(
+                text="👥 Пользователи", callback_data="admin_manage_users"
+            ),
+            InlineKeyboardButton(text="📣 Рассылка", callback_data="admin_broadcast"),
+        ],
     ]
     return InlineKeyboardMarkup(inline_keyboard=buttons)
+
+
+def stats_keyboard():
+    buttons = [
+        [
+            InlineKeyboardButton(text="Сегодня", callback_data="admin_stats_1"),
+            InlineKeyboardButton(text="7 дней", callback_data="admin_stats_7"),
+            InlineKeyboardButton(text="30 дней", callback_data="admin_stats_30"),
+        ],
+        [
+            InlineKeyboardButton(text="🏆 Топ блюд", callback_data="admin_stats_top"),
+            InlineKeyboardButton(
+                text="📊 За все время", callback_data="admin_view_stats"
+            ),
+        ],
+    ]
+    return InlineKeyboardMarkup(
+        inline_keyboard=buttons + admin_menu_keyboard().inline_keyboard
+    )
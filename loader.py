@@ -1,18 +1,129 @@
 from aiogram import Bot
 from aiogram.client.default import DefaultBotProperties
-from aiogram.dispatcher.dispatcher import Dispatcher
+from aiogram.client.telegram import PRODUCTION, TelegramAPIServer
 from aiogram.fsm.storage.memory import MemoryStorage
-from data.config import BOT_TOKEN
+from data.config import (
+    BOT_TOKEN,
+    TELEGRAM_API_URL,
+    ADMIN_IDS,
+    DATABASE_URL,
+    DB_READERS,
+    DB_BUSY_TIMEOUT,
+    DB_GROUP_COMMIT,
+    DB_BATCH_SIZE,
+    DB_BATCH_LATENCY_MS,
+    USER_CACHE_SIZE,
+    USER_CACHE_TTL,
+    CART_STORE,
+    CART_FLUSH_INTERVAL,
+    FSM_STORAGE,
+    FSM_CACHE_SIZE,
+    FSM_TTL,
+    FSM_FLUSH_INTERVAL,
+    SCHEDULER_BATCH_SIZE,
+    FLOOD_GLOBAL_RATE,
+    FLOOD_PRIVATE_RATE,
+    FLOOD_GROUP_PER_MINUTE,
+    FLOOD_BURST,
+    UPDATE_CONCURRENCY,
+    ADMISSION_LIMIT,
+    ADMISSION_MAX_WAIT,
+    ADMISSION_MAX_QUEUE,
+    METRICS_HOST,
+    METRICS_PORT,
+    DB_PROFILE,
+    DB_PROFILE_REPEAT,
+)
+from middlewares.admission import CLASSES, AdmissionMiddleware
+from services.chat_executor import SequentialDispatcher
 from services.database import Database
+from services.flood_control import FloodControl
+from services.fsm_storage import SQLiteStorage
+from services.metrics import ApiMetrics, MetricsServer, metrics
+from services.profiler import QueryProfiler
+from services.scheduler import Scheduler
+from services.session import BotSession
 
-bot = Bot(token=BOT_TOKEN, default=DefaultBotProperties(parse_mode="HTML"))
-storage = MemoryStorage()
-dp = Dispatcher(storage=storage)
-db = Database()
+# Свой адрес Bot API: локальный сервер telegram-bot-api или фейк из бенчмарков
+api = TelegramAPIServer.from_base(TELEGRAM_API_URL) if TELEGRAM_API_URL else PRODUCTION
+bot = Bot(
+    token=BOT_TOKEN,
+    session=BotSession(api=api),
+    default=DefaultBotProperties(parse_mode="HTML"),
+)
+# Время запросов к Bot API меряем снаружи лимитов: столько ждет обработчик
+bot.session.middleware(ApiMetrics())
+# Все исходящие запросы проходят через лимиты Telegram
+flood_control = FloodControl(
+    global_rate=FLOOD_GLOBAL_RATE,
+    private_rate=FLOOD_PRIVATE_RATE,
+    group_per_minute=FLOOD_GROUP_PER_MINUTE,
+    burst=FLOOD_BURST,
+)
+bot.session.middleware(flood_control)
+# Профиль SQL по апдейтам: только для отладки, каждый запрос идет через обертку
+profiler = QueryProfiler(DB_PROFILE_REPEAT) if DB_PROFILE else None
+db = Database(
+    DATABASE_URL,
+    readers=DB_READERS,
+    busy_timeout=DB_BUSY_TIMEOUT,
+    group_commit=DB_GROUP_COMMIT,
+    max_batch=DB_BATCH_SIZE,
+    max_latency=DB_BATCH_LATENCY_MS / 1000,
+    user_cache_size=USER_CACHE_SIZE,
+    user_cache_ttl=USER_CACHE_TTL,
+    cart_store=CART_STORE,
+    cart_flush_interval=CART_FLUSH_INTERVAL,
+    profiler=profiler,
+)
+# Состояния FSM переживают перезапуск, если хранятся в базе
+if FSM_STORAGE == "memory":
+    storage = MemoryStorage()
+else:
+    storage = SQLiteStorage(db, FSM_CACHE_SIZE, FSM_TTL, FSM_FLUSH_INTERVAL)
+# Апдейты одного чата идут по очереди, разных чатов — параллельно
+dp = SequentialDispatcher(storage=storage, concurrency=UPDATE_CONCURRENCY)
+# Обработчики под нагрузкой: сначала админы, потом заказы, потом меню.
+# Ожидающие допуска занимают место в очереди чатов, поэтому ее предел выше
+admission = AdmissionMiddleware(
+    ADMIN_IDS,
+    limit=ADMISSION_LIMIT,
+    max_wait=ADMISSION_MAX_WAIT,
+    max_queue=ADMISSION_MAX_QUEUE,
+)
+scheduler = Scheduler(db, batch_size=SCHEDULER_BATCH_SIZE)
+# Задачи запускаются вместе с поллингом, когда обработчики уже зарегистрированы
+dp.startup.register(scheduler.start)
+dp.shutdown.register(scheduler.close)
+
+# Счетчики компонентов попадают в /metrics вместе с временем обработчиков
+metrics.gauges("flood", flood_control.stats)
+metrics.gauges("admission", admission.stats)
+metrics.histograms(
+    "admission_queue_seconds",
+    "class",
+    lambda: {CLASSES[priority]: h for priority, h in admission.queue_time.items()},
+)
+metrics.gauges("executor", dp.chat_executor.stats)
+metrics.gauges("scheduler", scheduler.stats)
+metrics.gauges("user_cache", db.user_cache.stats)
+metrics.gauges("menu_cache", db.menu_cache.stats)
+if db.write_queue:
+    metrics.gauges("write_queue", db.write_queue.stats)
+if db.cart_store:
+    metrics.gauges("cart_store", db.cart_store.stats)
+if isinstance(storage, SQLiteStorage):
+    metrics.gauges("fsm", storage.stats)
+metrics_server = MetricsServer(METRICS_HOST, METRICS_PORT) if METRICS_PORT else None
+if metrics_server:
+    dp.startup.register(metrics_server.start)
+    dp.shutdown.register(metrics_server.stop)
 
 
 async def setup():
     """Инициализация всех компонентов"""
     await db.connect()
+    if isinstance(storage, SQLiteStorage):
+        await storage.start()
     dp["db"] = db
     return bot, dp, db
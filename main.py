@@ -1,8 +1,21 @@
 import asyncio
 import logging
+from data.config import (
+    BOT_MODE,
+    WEBHOOK_URL,
+    WEBHOOK_PATH,
+    WEBHOOK_SECRET,
+    WEBHOOK_HOST,
+    WEBHOOK_PORT,
+    WEBHOOK_QUEUE_SIZE,
+    WORKERS,
+    WORKER_QUEUE_SIZE,
+)
 from loader import setup
 from handlers import register_all_handlers
 from middlewares import register_all_middlewares
+from services.webhook import WebhookServer, run_webhook
+from services.workers import IngressWebhook, WorkerPool, run_ingress
 from utils.set_bot_commands import set_default_commands
 
 logging.basicConfig(
@@ -45,12 +58,57 @@ async def main():
 
         await on_startup(bot, db)
 
-        await dp.start_polling(bot)
+        if BOT_MODE == "webhook":
+            if not WEBHOOK_URL:
+                raise RuntimeError("Для BOT_MODE=webhook нужен WEBHOOK_URL")
+            server = WebhookServer(
+                bot,
+                dp,
+                WEBHOOK_URL,
+                WEBHOOK_PATH,
+                WEBHOOK_SECRET,
+                WEBHOOK_QUEUE_SIZE,
+            )
+            await run_webhook(server, WEBHOOK_HOST, WEBHOOK_PORT)
+        else:
+            await dp.start_polling(bot)
     except Exception as e:
         logger.critical(f"Фатальная ошибка: {e}")
     finally:
         await on_shutdown(bot, db)
 
 
+async def main_workers():
+    """Входной процесс: апдейты раздаются WORKERS процессам по chat_id"""
+    from loader import bot, dp, db
+
+    try:
+        # Схему обновляем до запуска воркеров, чтобы миграции не шли параллельно
+        await db.connect()
+        await db.close()
+
+        # Обработчики нужны только чтобы знать, какие апдейты запрашивать
+        register_all_handlers(dp)
+        allowed_updates = dp.resolve_used_update_types()
+
+        await on_startup(bot, None)
+
+        pool = WorkerPool(WORKERS, queue_size=WORKER_QUEUE_SIZE)
+        webhook = None
+        if BOT_MODE == "webhook":
+            if not WEBHOOK_URL:
+                raise RuntimeError("Для BOT_MODE=webhook нужен WEBHOOK_URL")
+            webhook = IngressWebhook(
+                bot, pool, WEBHOOK_URL, WEBHOOK_SECRET, allowed_updates, WEBHOOK_PATH
+            )
+        await run_ingress(
+            bot, pool, allowed_updates, webhook, WEBHOOK_HOST, WEBHOOK_PORT
+        )
+    except Exception as e:
+        logger.critical(f"Фатальная ошибка: {e}")
+    finally:
+        await on_shutdown(bot, None)
+
+
 if __name__ == "__main__":
-    asyncio.run(main())
+    asyncio.run(main_workers() if WORKERS > 1 else main())
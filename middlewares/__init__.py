@@ -1,7 +1,22 @@
 from aiogram import Dispatcher
+from .metrics import MetricsMiddleware
+from .profiler import QueryProfileMiddleware
 from .user_middleware import UserMiddleware
 
 
 def register_all_middlewares(dp: Dispatcher):
-    # Регистрируем все middleware
-    dp.update.outer_middleware(UserMiddleware())
+    from loader import admission, profiler
+
+    # Регистрируем все middleware; допуск первым, чтобы отброшенные
+    # апдейты не ходили в базу
+    dp.message.outer_middleware(admission)
+    dp.callback_query.outer_middleware(admission)
+    user_middleware = UserMiddleware()
+    dp.message.outer_middleware(user_middleware)
+    dp.callback_query.outer_middleware(user_middleware)
+    # Время каждого обработчика всех роутеров
+    metrics_middleware = MetricsMiddleware()
+    dp.message.middleware(metrics_middleware)
+    dp.callback_query.middleware(metrics_middleware)
+    if profiler:
+        dp.update.outer_middleware(QueryProfileMiddleware(profiler))
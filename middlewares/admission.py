@@ -0,0 +1,160 @@
+import asyncio
+import heapq
+import itertools
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional
+
+from aiogram import BaseMiddleware
+from aiogram.types import CallbackQuery, Message
+
+from services.metrics import Histogram
+from states import FeedbackProcess, OrderProcess, UserRegistration
+
+# Классы приоритета: меньше значение — раньше получает место
+ADMIN = 0
+ORDER = 1
+BROWSE = 2
+CLASSES = {ADMIN: "admin", ORDER: "order", BROWSE: "browse"}
+
+# Кнопки корзины и оформления заказа
+ORDER_CALLBACKS = (
+    "checkout",
+    "delivery_",
+    "send_location",
+    "add_to_cart_",
+    "change_qty_",
+    "remove_",
+    "clear_cart",
+    "view_cart",
+    "rate_order_",
+)
+ORDER_TEXTS = {"/cart", "🛒 Корзина", "✅ Оформить заказ", "🔄 Очистить корзину"}
+# Сценарии оформления заказа, регистрации и отзыва. raw_state имеет вид
+# "Группа:Состояние"; группы в handlers/order.py и handlers/feedback.py
+# объявлены с теми же именами, поэтому сравниваем по имени группы
+ORDER_STATE_GROUPS = frozenset(
+    group.__full_group_name__
+    for group in (OrderProcess, UserRegistration, FeedbackProcess)
+)
+
+BUSY_TEXT = "⏳ Сейчас много запросов, попробуйте еще раз"
+
+
+class AdmissionMiddleware(BaseMiddleware):
+    """Ограничивает число обработчиков, выполняемых одновременно.
+
+    Когда все limit мест заняты, апдейты ждут в очереди по приоритету:
+    админы, затем корзина и заказ, затем просмотр меню. Просмотр меню ждет
+    не дольше max_wait и не встает в очередь длиннее max_queue — такой
+    апдейт получает короткий ответ «попробуйте еще раз».
+    """
+
+    def __init__(
+        self,
+        admins: Iterable[int],
+        limit: int = 50,
+        max_wait: float = 2.0,
+        max_queue: int = 500,
+    ):
+        self.admins = frozenset(admins)
+        self.limit = limit
+        self.max_wait = max_wait
+        self.max_queue = max_queue
+        self.running = 0
+        self.waiting = {priority: 0 for priority in CLASSES}
+        self.admitted = {priority: 0 for priority in CLASSES}
+        self.shed = {priority: 0 for priority in CLASSES}
+        self.queue_time = {priority: Histogram() for priority in CLASSES}
+        # (приоритет, номер, future): номер сохраняет порядок внутри класса
+        self._waiters = []
+        self._order = itertools.count()
+
+    def classify(self, event: Message | CallbackQuery, data: Dict[str, Any]) -> int:
+        if event.from_user and event.from_user.id in self.admins:
+            return ADMIN
+        if isinstance(event, CallbackQuery):
+            if event.data and event.data.startswith(ORDER_CALLBACKS):
+                return ORDER
+            return BROWSE
+        # Сообщение посреди сценария (телефон, адрес, отзыв) продолжает заказ,
+        # а навигация по меню тоже хранится в состоянии, но это просмотр
+        state = data.get("raw_state")
+        if state and state.partition(":")[0] in ORDER_STATE_GROUPS:
+            return ORDER
+        if event.contact or event.location:
+            return ORDER
+        if event.text in ORDER_TEXTS:
+            return ORDER
+        return BROWSE
+
+    async def __call__(
+        self,
+        handler: Callable[[Message | CallbackQuery, Dict[str, Any]], Awaitable[Any]],
+        event: Message | CallbackQuery,
+        data: Dict[str, Any],
+    ) -> Any:
+        priority = self.classify(event, data)
+        waited = await self._acquire(priority)
+        if waited is None:
+            self.shed[priority] += 1
+            await event.answer(BUSY_TEXT)
+            return None
+
+        self.admitted[priority] += 1
+        self.queue_time[priority].observe(waited)
+        try:
+            return await handler(event, data)
+        finally:
+            self._release()
+
+    async def _acquire(self, priority: int) -> Optional[float]:
+        """Ждем места; время в очереди или None, если апдейт отброшен"""
+        if self.running < self.limit and not sum(self.waiting.values()):
+            self.running += 1
+            return 0.0
+        if priority == BROWSE and sum(self.waiting.values()) >= self.max_queue:
+            return None
+
+        started = time.perf_counter()
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._order), future))
+        self.waiting[priority] += 1
+        try:
+            await asyncio.wait_for(
+                future, self.max_wait if priority == BROWSE else None
+            )
+        except asyncio.TimeoutError:
+            # Отмененный future остается в куче, _release его пропустит
+            return None
+        except asyncio.CancelledError:
+            # Место уже передали нам: отдаем его следующему
+            if future.done() and not future.cancelled():
+                self._release()
+            raise
+        finally:
+            self.waiting[priority] -= 1
+        return time.perf_counter() - started
+
+    def _release(self):
+        """Передаем место первому ожидающему или освобождаем его"""
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(None)
+                return
+        self.running -= 1
+
+    def stats(self) -> dict:
+        return {
+            "limit": self.limit,
+            "running": self.running,
+            **{
+                name: {
+                    "admitted": self.admitted[priority],
+                    "shed": self.shed[priority],
+                    "waiting": self.waiting[priority],
+                    "queue_time": self.queue_time[priority].as_dict(),
+                }
+                for priority, name in CLASSES.items()
+            },
+        }
@@ -0,0 +1,41 @@
+import time
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import CallbackQuery, Message
+
+from services.metrics import Metrics, UpdateTiming, current_timing, metrics
+
+
+class MetricsMiddleware(BaseMiddleware):
+    """Число вызовов, ошибки и время каждого обработчика.
+
+    Inner middleware: вызывается уже для найденного обработчика, поэтому
+    апдейты без обработчика и отброшенные фильтрами не считаются. Время в
+    базе и в Bot API обработчик набирает в UpdateTiming через contextvar.
+    """
+
+    def __init__(self, registry: Metrics = metrics):
+        self.registry = registry
+
+    async def __call__(
+        self,
+        handler: Callable[[Message | CallbackQuery, Dict[str, Any]], Awaitable[Any]],
+        event: Message | CallbackQuery,
+        data: Dict[str, Any],
+    ) -> Any:
+        stats = self.registry.handler(data["handler"].callback)
+        timing = UpdateTiming()
+        token = current_timing.set(timing)
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception:
+            stats.errors += 1
+            raise
+        finally:
+            stats.count += 1
+            stats.latency.observe(time.perf_counter() - started)
+            stats.db += timing.db
+            stats.api += timing.api
+            current_timing.reset(token)
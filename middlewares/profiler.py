@@ -0,0 +1,43 @@
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import Update
+
+from services.profiler import QueryProfiler, UpdateProfile, current_profile
+
+
+def update_label(update: Update) -> str:
+    """Короткая подпись апдейта для отчета: тип и команда или callback_data"""
+    if update.callback_query:
+        return f"{update.update_id} callback {update.callback_query.data}"
+    if update.message:
+        text = update.message.text or ""
+        command = text.split()[0] if text.startswith("/") else ""
+        return f"{update.update_id} message {command or update.message.content_type}"
+    return f"{update.update_id} {update.event_type}"
+
+
+class QueryProfileMiddleware(BaseMiddleware):
+    """Собирает SQL-запросы одного апдейта и отдает их профайлеру"""
+
+    def __init__(self, profiler: QueryProfiler):
+        self.profiler = profiler
+
+    async def __call__(
+        self,
+        handler: Callable[[Update, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any],
+    ) -> Any:
+        outer = current_profile.get()
+        profile = UpdateProfile(update_label(event))
+        token = current_profile.set(profile)
+        try:
+            return await handler(event, data)
+        finally:
+            current_profile.reset(token)
+            self.profiler.finish(profile)
+            # Внешний профиль (например, сценарий нагрузочного теста) видит
+            # запросы всех своих апдейтов
+            if outer is not None:
+                outer.statements.extend(profile.statements)
@@ -4,16 +4,16 @@ from typing import Callable, Dict, Any, Awaitable
 
 
 class UserMiddleware(BaseMiddleware):
+    """Кладет строку пользователя в data["user"], чтобы хендлеры не ходили в БД"""
+
     async def __call__(
         self,
         handler: Callable[[Message | CallbackQuery, Dict[str, Any]], Awaitable[Any]],
         event: Message | CallbackQuery,
         data: Dict[str, Any],
     ) -> Any:
-        if isinstance(event, Message):
+        if isinstance(event, (Message, CallbackQuery)) and event.from_user:
             user_id = event.from_user.id
-        elif isinstance(event, CallbackQuery):
-            user_id = event.message.from_user.id
         else:
             return await handler(event, data)
 
@@ -21,5 +21,6 @@ class UserMiddleware(BaseMiddleware):
         if not db:
             raise ValueError("Database connection not found")
 
+        # get_user отвечает из кэша Database, для активного пользователя без запроса
         data["user"] = await db.get_user(user_id)
         return await handler(event, data)
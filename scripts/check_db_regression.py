@@ -0,0 +1,69 @@
+"""Сравнение двух прогонов benchmarks/bench_database.py по p95 методов.
+
+Падает с кодом 1, если p95 какого-то метода выросло больше чем на
+--max-growth процентов. Рост меньше --min-delta-ms не считается: на
+методах из кэша доли миллисекунды — это шум, а не регрессия.
+
+Запуск из корня репозитория:
+    python -m scripts.check_db_regression base.json new.json --max-growth 20
+"""
+
+import argparse
+import json
+import sys
+
+
+def compare(base: dict, new: dict, max_growth: float, min_delta: float):
+    """Возвращаем (число сравненных методов, регрессии, методы без пары)"""
+    regressions, unmatched = [], []
+    compared = 0
+    for size, run in new["sizes"].items():
+        before = base["sizes"].get(size)
+        if before is None:
+            unmatched.append(f"{size}: нет в базовом прогоне")
+            continue
+        for method, stats in run["methods"].items():
+            old = before["methods"].get(method)
+            if old is None:
+                unmatched.append(f"{size}/{method}: новый метод")
+                continue
+            compared += 1
+            delta = stats["p95"] - old["p95"]
+            growth = delta / old["p95"] * 100 if old["p95"] else float("inf")
+            if delta > min_delta and growth > max_growth:
+                regressions.append((size, method, old["p95"], stats["p95"], growth))
+        for method in before["methods"].keys() - run["methods"].keys():
+            unmatched.append(f"{size}/{method}: нет в новом прогоне")
+    return compared, regressions, unmatched
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("base", help="JSON базового прогона")
+    parser.add_argument("new", help="JSON нового прогона")
+    parser.add_argument("--max-growth", type=float, default=20, help="процентов")
+    parser.add_argument("--min-delta-ms", type=float, default=0.5)
+    args = parser.parse_args()
+
+    with open(args.base, encoding="utf-8") as file:
+        base = json.load(file)
+    with open(args.new, encoding="utf-8") as file:
+        new = json.load(file)
+
+    compared, regressions, unmatched = compare(
+        base, new, args.max_growth, args.min_delta_ms
+    )
+    for entry in unmatched:
+        print(f"? {entry}")
+    for size, method, before, after, growth in regressions:
+        print(f"✗ {size}/{method}: p95 {before:.2f} -> {after:.2f} мс (+{growth:.0f}%)")
+
+    print(
+        f"{base['commit']} -> {new['commit']}: сравнено методов: {compared}, "
+        f"медленнее на {args.max_growth:g}%+: {len(regressions)}"
+    )
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
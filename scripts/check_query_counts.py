@@ -0,0 +1,193 @@
+"""Проверка числа SQL-запросов на экран бота.
+
+Прогоняет экраны через Dispatcher.feed_update с сессией, которая не ходит
+в Telegram, на маленькой и на большой базе. Падает с кодом 1, если число
+запросов экрана растет вместе с данными (N+1) или превышает его бюджет.
+
+Запуск из корня репозитория:
+    python -m scripts.check_query_counts
+"""
+
+import asyncio
+import datetime
+import os
+import sqlite3
+import sys
+import tempfile
+
+ADMIN_ID = 1
+SKIP_STATEMENTS = ("BEGIN", "COMMIT", "ROLLBACK", "SAVEPOINT", "RELEASE")
+
+# Объемы данных, на которых число запросов должно совпадать
+SIZES = (20, 500)
+
+
+def seed(db_path: str, start: int, end: int):
+    """Пользователи, заказы и отзывы с номерами от start до end"""
+    conn = sqlite3.connect(db_path)
+    conn.executemany(
+        "INSERT INTO users (user_id, username, full_name) VALUES (?, ?, ?)",
+        ((i, f"user{i}", f"User {i}") for i in range(start, end)),
+    )
+    conn.executemany(
+        "INSERT INTO orders (order_id, user_id, total_amount, delivery_type, phone) "
+        "VALUES (?, ?, ?, 'pickup', '+70000000000')",
+        ((i, ADMIN_ID if i % 2 else i, 100 + i) for i in range(start, end)),
+    )
+    conn.executemany(
+        "INSERT INTO feedback (user_id, order_id, rating, comment) "
+        "VALUES (?, ?, ?, 'Отзыв')",
+        ((i, i, i % 5 + 1) for i in range(start, end)),
+    )
+    conn.commit()
+    conn.close()
+
+
+async def run() -> int:
+    # loader берет токен и админов из окружения, а базу по относительному пути
+    os.environ.setdefault("BOT_TOKEN", "42:TEST")
+    os.environ["ADMIN_IDS"] = str(ADMIN_ID)
+    # Фоновая запись FSM не должна попадать в подсчет запросов экранов
+    os.environ.setdefault("FSM_STORAGE", "memory")
+
+    from aiogram.client.session.base import BaseSession
+    from aiogram.methods import EditMessageText, SendMessage
+    from aiogram.types import CallbackQuery, Chat, Message, Update, User
+
+    import loader
+    from handlers import register_all_handlers
+    from middlewares import register_all_middlewares
+    from utils.pagination import NEXT, page_callback
+
+    class OfflineSession(BaseSession):
+        """Сессия без сети: на отправку и редактирование отвечает сообщением"""
+
+        async def make_request(self, bot, method, timeout=None):
+            if isinstance(method, (SendMessage, EditMessageText)):
+                return Message(
+                    message_id=1,
+                    date=datetime.datetime.now(),
+                    chat=Chat(id=ADMIN_ID, type="private"),
+                    text=method.text,
+                )
+            return True
+
+        async def stream_content(self, *args, **kwargs):
+            yield b""
+
+        async def close(self):
+            pass
+
+    user = User(id=ADMIN_ID, is_bot=False, first_name="Admin")
+    chat = Chat(id=ADMIN_ID, type="private")
+    update_ids = iter(range(1, 1_000_000))
+
+    def message(text: str) -> Update:
+        update_id = next(update_ids)
+        return Update(
+            update_id=update_id,
+            message=Message(
+                message_id=update_id,
+                date=datetime.datetime.now(),
+                chat=chat,
+                from_user=user,
+                text=text,
+            ),
+        )
+
+    def callback(data: str) -> Update:
+        update_id = next(update_ids)
+        return Update(
+            update_id=update_id,
+            callback_query=CallbackQuery(
+                id=str(update_id),
+                chat_instance="check",
+                from_user=user,
+                message=Message(
+                    message_id=update_id,
+                    date=datetime.datetime.now(),
+                    chat=chat,
+                    text="check",
+                ),
+                data=data,
+            ),
+        )
+
+    far_cursor = ("2100-01-01 00:00:00", 10**9)
+    # Экран, обновление и максимум запросов на него
+    screens = [
+        ("отзывы", lambda: callback("admin_view_feedback"), 2),
+        (
+            "отзывы 5★ за 7 дней",
+            lambda: callback(page_callback("admin_fb_5_7", NEXT, None)),
+            2,
+        ),
+        (
+            "отзывы, следующая страница",
+            lambda: callback(page_callback("admin_fb_0_0", NEXT, far_cursor)),
+            2,
+        ),
+        ("пользователи", lambda: callback("admin_manage_users"), 1),
+        ("заказы", lambda: callback("admin_manage_orders"), 1),
+        ("статистика", lambda: callback("admin_view_stats"), 2),
+        ("мои заказы", lambda: message("📦 Мои заказы"), 1),
+        ("корзина", lambda: message("/cart"), 1),
+        ("меню", lambda: message("/menu"), 0),
+    ]
+
+    bot, dp, db = await loader.setup()
+    bot.session = OfflineSession()
+    register_all_middlewares(dp)
+    register_all_handlers(dp)
+
+    statements = []
+
+    def trace(sql: str):
+        if not sql.lstrip().upper().startswith(SKIP_STATEMENTS):
+            statements.append(sql)
+
+    await db.pool.writer.set_trace_callback(trace)
+    for conn in db.pool._readers:
+        await conn.set_trace_callback(trace)
+
+    counts = {}
+    seeded = 1
+    try:
+        for size in SIZES:
+            seed(str(db.db_path), seeded, size + 1)
+            seeded = size + 1
+            for name, update, _ in screens:
+                # Первый прогон прогревает кэши пользователя и меню
+                await dp.feed_update(bot, update())
+                statements.clear()
+                await dp.feed_update(bot, update())
+                counts.setdefault(name, []).append(len(statements))
+    finally:
+        await db.close()
+
+    failures = 0
+    for name, _, budget in screens:
+        per_size = counts[name]
+        ok = len(set(per_size)) == 1 and per_size[0] <= budget
+        failures += not ok
+        sizes = ", ".join(f"{size}: {count}" for size, count in zip(SIZES, per_size))
+        print(f"{'✓' if ok else '✗'} {name}: {sizes} (бюджет {budget})")
+
+    print(f"Экранов: {len(screens)}, с лишними запросами: {failures}")
+    return 1 if failures else 0
+
+
+def main() -> int:
+    root = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        # DATABASE_URL относительный: база создается во временной папке
+        os.chdir(tmp)
+        sys.path.insert(0, root)
+        try:
+            return asyncio.run(run())
+        finally:
+            os.chdir(root)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,218 @@
+"""Проверка EXPLAIN QUERY PLAN для всех запросов Database.
+
+Вызывает каждый публичный метод Database на временной базе, перехватывает
+выполненные SQL-запросы и падает с кодом 1, если какой-то из них читает
+таблицу целиком.
+
+Запуск из корня репозитория:
+    python -m scripts.check_query_plans
+"""
+
+import asyncio
+import inspect
+import re
+import sqlite3
+import sys
+import tempfile
+from pathlib import Path
+
+from services.database import Database
+
+# Методы, которым полный проход по таблице разрешен осознанно
+ALLOWED_SCANS = {
+    "_load_menu": "меню целиком загружается в кэш",
+    "get_all_dishes": "полный список меню для админки",
+    "get_all_users": "полная выгрузка пользователей",
+    "get_all_feedback": "полная выгрузка отзывов",
+    "get_admin_stats": "order_stats: по строке на статус заказа",
+    "rebuild_stats": "пересчет агрегатов по всем заказам",
+    "backfill_rollups": "пересчет срезов продаж и отзывов целиком",
+    "get_feedback_summary": "feedback_daily: по строке на день и оценку",
+}
+
+# Значения для обязательных параметров методов, подбираются по имени
+SAMPLE_ARGS = {
+    "user_id": 1,
+    "dish_id": 1,
+    "order_id": 1,
+    "category_id": 1,
+    "cart_item_id": 1,
+    "name": "Проверка",
+    "username": "check",
+    "full_name": "Check User",
+    "description": "",
+    "price": 100.0,
+    "total_amount": 100.0,
+    "delivery_type": "pickup",
+    "address": "",
+    "phone": "+70000000000",
+    "rating": 5,
+    "quantity": 1,
+    "status": "new",
+}
+
+# Курсор страницы, чтобы проверить и запрос со сравнением по ключу
+SAMPLE_CURSOR = ("2100-01-01 00:00:00", 1_000_000)
+
+SAMPLE_KWARGS = {
+    "update_dish": {"name": "Проверка"},
+    "get_orders_page": {"cursor": SAMPLE_CURSOR},
+    "get_user_orders_page": {"cursor": SAMPLE_CURSOR},
+    "get_users_page": {"cursor": SAMPLE_CURSOR},
+    "get_feedback_page": {"cursor": SAMPLE_CURSOR, "rating": 5, "days": 7},
+}
+
+SKIP_METHODS = {"connect", "close"}
+SKIP_STATEMENTS = ("PRAGMA", "BEGIN", "COMMIT", "ROLLBACK", "SAVEPOINT", "RELEASE")
+SCAN_RE = re.compile(r"^SCAN (?!CONSTANT ROW)(\S+)(.*)$")
+
+
+def find_scans(conn: sqlite3.Connection, sql: str):
+    """Возвращаем строки плана с полным проходом по таблице или индексу"""
+    plan = conn.execute(f"EXPLAIN QUERY PLAN {sql}").fetchall()
+    has_limit = re.search(r"\bLIMIT\b", sql, re.IGNORECASE) is not None
+    scans = []
+    for row in plan:
+        detail = row[-1]
+        match = SCAN_RE.match(detail)
+        if not match:
+            continue
+        # Проход по индексу с LIMIT останавливается после первых строк
+        if "USING" in match.group(2) and "INDEX" in match.group(2) and has_limit:
+            continue
+        scans.append(detail)
+    return scans
+
+
+def seed(db_path: Path):
+    conn = sqlite3.connect(db_path)
+    conn.executescript(
+        """
+        INSERT INTO categories (category_id, name) VALUES (1, 'Супы'), (2, 'Пусто');
+        INSERT INTO dishes (dish_id, name, description, price, category_id)
+            VALUES (1, 'Борщ', '', 150, 1), (2, 'Чай', '', 50, 1);
+        INSERT INTO users (user_id, username, full_name, phone)
+            VALUES (1, 'user', 'User', '+70000000000');
+        INSERT INTO orders (order_id, user_id, total_amount, delivery_type, phone)
+            VALUES (1, 1, 150, 'pickup', '+70000000000');
+        INSERT INTO order_items (order_id, dish_id, quantity, price)
+            VALUES (1, 1, 1, 150);
+        INSERT INTO feedback (user_id, order_id, rating) VALUES (1, 1, 5);
+        INSERT INTO cart (user_id, dish_id, name, price, quantity)
+            VALUES (1, 1, 'Борщ', 150, 2);
+        """
+    )
+    conn.commit()
+    conn.close()
+
+
+def public_methods() -> list:
+    """Публичные async-методы Database: сначала чтения, затем записи.
+
+    Записи идут последними, чтобы удаления не опустошили данные.
+    """
+    methods = [
+        (name, method)
+        for name, method in inspect.getmembers(Database, inspect.iscoroutinefunction)
+        if not name.startswith("_") and name not in SKIP_METHODS
+    ]
+    methods.sort(key=lambda item: (not item[0].startswith("get_"), item[0]))
+    return methods
+
+
+async def collect_statements(db_path: Path):
+    """Вызываем методы Database и собираем SQL каждого из них"""
+    db = Database(db_path, readers=1)
+    await db.connect()
+
+    statements = []
+    current = {"method": None}
+
+    def trace(sql: str):
+        statements.append((current["method"], sql))
+
+    await db.pool.writer.set_trace_callback(trace)
+    for conn in db.pool._readers:
+        await conn.set_trace_callback(trace)
+
+    methods = public_methods()
+
+    # Меню читается в кэш одним проходом, дальше методы меню идут в память
+    current["method"] = "_load_menu"
+    await db._load_menu()
+
+    missing = []
+    for name, method in methods:
+        params = list(inspect.signature(method).parameters.values())[1:]
+        args = {}
+        for param in params:
+            if param.kind is param.VAR_KEYWORD:
+                continue
+            if param.name in SAMPLE_ARGS:
+                args[param.name] = SAMPLE_ARGS[param.name]
+            elif param.default is param.empty:
+                missing.append(f"{name}({param.name})")
+                break
+        else:
+            args.update(SAMPLE_KWARGS.get(name, {}))
+            current["method"] = name
+            try:
+                await method(db, **args)
+            except Exception as e:
+                print(f"! {name}: {e}")
+            current["method"] = None
+
+    await db.close()
+    return statements, missing
+
+
+async def create_schema(db_path: Path):
+    db = Database(db_path, readers=0)
+    await db.connect()
+    await db.close()
+
+
+def main() -> int:
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "plans.sqlite3"
+        asyncio.run(create_schema(db_path))
+        seed(db_path)
+        statements, missing = asyncio.run(collect_statements(db_path))
+
+        conn = sqlite3.connect(db_path)
+        failures = []
+        checked = set()
+        for method, sql in statements:
+            sql = sql.strip()
+            if (
+                not method
+                or sql.startswith("--")
+                or sql.upper().startswith(SKIP_STATEMENTS)
+            ):
+                continue
+            if (method, sql) in checked:
+                continue
+            checked.add((method, sql))
+            scans = find_scans(conn, sql)
+            if not scans:
+                continue
+            if method in ALLOWED_SCANS:
+                print(f"~ {method}: {'; '.join(scans)} ({ALLOWED_SCANS[method]})")
+                continue
+            failures.append((method, sql, scans))
+        conn.close()
+
+    for entry in missing:
+        print(f"? нет тестовых аргументов для {entry}, добавьте их в SAMPLE_ARGS")
+    for method, sql, scans in failures:
+        print(f"✗ {method}: {'; '.join(scans)}\n    {' '.join(sql.split())}")
+
+    print(
+        f"Проверено запросов: {len(checked)}, полных проходов: {len(failures)}, "
+        f"методов без аргументов: {len(missing)}"
+    )
+    return 1 if failures or missing else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,40 @@
+import asyncio
+import logging
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramAPIError, TelegramForbiddenError
+
+from services.flood_control import bulk_priority
+
+logger = logging.getLogger(__name__)
+
+
+async def broadcast(
+    bot: Bot, db, text: str, batch_size: int = 500, concurrency: int = 30
+) -> dict:
+    """Отправляем text всем пользователям в фоновой полосе флуд-контроля"""
+    result = {"sent": 0, "blocked": 0, "failed": 0}
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def send(user_id: int):
+        async with semaphore:
+            try:
+                await bot.send_message(user_id, text)
+                result["sent"] += 1
+            except TelegramForbiddenError:
+                # Пользователь заблокировал бота
+                result["blocked"] += 1
+            except TelegramAPIError as e:
+                result["failed"] += 1
+                logger.error(f"Ошибка рассылки пользователю {user_id}: {e}")
+
+    # Задачи gather копируют контекст, поэтому приоритет действует и в них
+    with bulk_priority():
+        after = 0
+        while True:
+            user_ids = await db.get_user_ids(after, batch_size)
+            if not user_ids:
+                break
+            await asyncio.gather(*(send(user_id) for user_id in user_ids))
+            after = user_ids[-1]
+    return result
@@ -0,0 +1,162 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+
+class MenuSnapshot:
+    """Снимок меню: категории, блюда по категориям и блюда по ID"""
+
+    def __init__(self, version: int, categories: List[dict], dishes: list):
+        self.version = version
+        self.categories = categories
+        self.categories_by_id: Dict[int, dict] = {
+            category["category_id"]: category for category in categories
+        }
+        self.dishes_by_category: Dict[int, list] = {}
+        self.dishes: Dict[int, dict] = {}
+        for dish in dishes:
+            self.dishes_by_category.setdefault(dish["category_id"], []).append(dish)
+            self.dishes[dish["dish_id"]] = dict(dish)
+        self._admin_dishes: Optional[List[dict]] = None
+        self._admin_positions: Dict[int, int] = {}
+
+    def admin_dishes(self) -> List[dict]:
+        """Блюда в порядке админки: по категории, затем по названию"""
+        if self._admin_dishes is None:
+            rows = [
+                {
+                    "dish_id": dish["dish_id"],
+                    "name": dish["name"],
+                    "price": dish["price"],
+                    "category_name": (
+                        self.categories_by_id.get(dish["category_id"]) or {}
+                    ).get("name"),
+                }
+                for dish in self.dishes.values()
+            ]
+            rows.sort(
+                key=lambda row: (
+                    row["category_name"] is not None,
+                    row["category_name"] or "",
+                    row["name"],
+                    row["dish_id"],
+                )
+            )
+            self._admin_positions = {
+                row["dish_id"]: position for position, row in enumerate(rows)
+            }
+            self._admin_dishes = rows
+        return self._admin_dishes
+
+    def admin_position(self, dish_id: int) -> Optional[int]:
+        self.admin_dishes()
+        return self._admin_positions.get(dish_id)
+
+
+class MenuCache:
+    """Кэш меню в памяти процесса с инвалидацией по версии"""
+
+    def __init__(self):
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        self.load_lock = asyncio.Lock()
+        # Вызывается при локальном изменении меню, например чтобы оповестить
+        # другие процессы-обработчики
+        self.on_invalidate: Optional[Callable[[], None]] = None
+        self._snapshot: Optional[MenuSnapshot] = None
+
+    def current(self) -> Optional[MenuSnapshot]:
+        """Актуальный снимок без учета в счетчиках"""
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.version == self.version:
+            return snapshot
+        return None
+
+    def get(self) -> Optional[MenuSnapshot]:
+        """Актуальный снимок меню или None, если его нужно перечитать"""
+        snapshot = self.current()
+        if snapshot is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return snapshot
+
+    def store(self, version: int, categories: List[dict], dishes: list):
+        """Сохраняем снимок, прочитанный при версии version"""
+        snapshot = MenuSnapshot(version, categories, dishes)
+        # Меню поменяли, пока мы читали: такой снимок уже устарел
+        if version == self.version:
+            self._snapshot = snapshot
+        return snapshot
+
+    def invalidate(self, notify: bool = True):
+        """Сбрасываем кэш после изменения меню"""
+        self.version += 1
+        self._snapshot = None
+        if notify and self.on_invalidate is not None:
+            self.on_invalidate()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "version": self.version,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0,
+        }
+
+
+class UserCache:
+    """LRU-кэш строк пользователей с ограничением по времени жизни"""
+
+    MISSING = object()
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # Растет при каждой инвалидации: строка, прочитанная до нее, не кэшируется
+        self.generation = 0
+        self._entries: "OrderedDict[int, tuple]" = OrderedDict()
+
+    def get(self, user_id: int) -> Any:
+        """Строка пользователя, None для незарегистрированного или MISSING"""
+        entry = self._entries.get(user_id)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self._entries[user_id]
+            self.misses += 1
+            return self.MISSING
+        self._entries.move_to_end(user_id)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, user_id: int, row: Any, generation: Optional[int] = None):
+        if generation is not None and generation != self.generation:
+            return
+        self._entries[user_id] = (time.monotonic() + self.ttl, row)
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, user_id: int):
+        self.generation += 1
+        self._entries.pop(user_id, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / total, 4) if total else 0,
+        }
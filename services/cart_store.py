@@ -0,0 +1,223 @@
+import asyncio
+import logging
+import time
+from typing import Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class CartState:
+    """Корзина пользователя в памяти: dish_id -> количество"""
+
+    __slots__ = ("lines", "touched")
+
+    def __init__(self, lines: Optional[Dict[int, int]] = None):
+        self.lines: Dict[int, int] = lines or {}
+        self.touched = time.monotonic()
+
+
+class CartStore:
+    """Корзины в памяти с отложенной пакетной записью в таблицу cart.
+
+    Изменения корзины не ходят в БД: измененные корзины помечаются грязными
+    и раз в flush_interval секунд записываются одной транзакцией.
+    Названия и цены берутся из снимка меню, поэтому в памяти только количества.
+    """
+
+    def __init__(self, db, flush_interval: float = 1.0, max_idle: float = 600):
+        self.db = db
+        self.flush_interval = flush_interval
+        self.max_idle = max_idle
+        self.loads = 0
+        self.flushes = 0
+        self.flushed_carts = 0
+        self.evictions = 0
+        self._carts: Dict[int, CartState] = {}
+        self._dirty: set = set()
+        self._loading: Dict[int, asyncio.Task] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Останавливаем фоновую запись и сбрасываем все грязные корзины"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Ошибка фоновой записи корзин: {e}")
+            self._evict()
+
+    async def _load(self, user_id: int) -> CartState:
+        async with self.db.pool.reader() as conn:
+            async with conn.execute(
+                "SELECT dish_id, quantity FROM cart WHERE user_id = ? ORDER BY cart_id",
+                (user_id,),
+            ) as cursor:
+                rows = await cursor.fetchall()
+        self.loads += 1
+        # Пока читали, корзину мог создать другой запрос
+        return self._carts.setdefault(
+            user_id, CartState({row[0]: row[1] for row in rows})
+        )
+
+    async def _cart(self, user_id: int) -> CartState:
+        cart = self._carts.get(user_id)
+        if cart is None:
+            task = self._loading.get(user_id)
+            if task is None:
+                task = asyncio.ensure_future(self._load(user_id))
+                self._loading[user_id] = task
+                task.add_done_callback(lambda _: self._loading.pop(user_id, None))
+            cart = await task
+        cart.touched = time.monotonic()
+        return cart
+
+    def _changed(self, user_id: int):
+        self._dirty.add(user_id)
+
+    async def add(self, user_id: int, dish_id: int):
+        cart = await self._cart(user_id)
+        cart.lines[dish_id] = cart.lines.get(dish_id, 0) + 1
+        self._changed(user_id)
+
+    async def increase(self, user_id: int, dish_id: int):
+        cart = await self._cart(user_id)
+        if dish_id in cart.lines:
+            cart.lines[dish_id] += 1
+            self._changed(user_id)
+
+    async def decrease(self, user_id: int, dish_id: int):
+        cart = await self._cart(user_id)
+        quantity = cart.lines.get(dish_id)
+        if quantity is None:
+            return
+        if quantity > 1:
+            cart.lines[dish_id] = quantity - 1
+        else:
+            del cart.lines[dish_id]
+        self._changed(user_id)
+
+    async def remove(self, user_id: int, dish_id: int):
+        cart = await self._cart(user_id)
+        if cart.lines.pop(dish_id, None) is not None:
+            self._changed(user_id)
+
+    async def clear(self, user_id: int):
+        cart = await self._cart(user_id)
+        if cart.lines:
+            cart.lines.clear()
+            self._changed(user_id)
+
+    async def items(self, user_id: int, menu) -> List[dict]:
+        """Строки корзины в формате get_cart_items"""
+        cart = await self._cart(user_id)
+        items = []
+        for dish_id, quantity in cart.lines.items():
+            dish = menu.dishes.get(dish_id)
+            # Блюдо удалили из меню: как и JOIN с dishes, строку не показываем
+            if dish is None:
+                continue
+            items.append(
+                {
+                    "dish_id": dish_id,
+                    "name": dish["name"],
+                    "quantity": quantity,
+                    "price": dish["price"],
+                    "line_total": quantity * dish["price"],
+                }
+            )
+        return items
+
+    async def write(self, conn, user_id: int, menu):
+        """Записываем корзину пользователя в cart на соединении писателя"""
+        cart = self._carts.get(user_id)
+        # Корзину выгрузили или уже оформили: в БД актуальное состояние
+        if cart is None:
+            return
+        self._dirty.discard(user_id)
+        await conn.execute("DELETE FROM cart WHERE user_id = ?", (user_id,))
+        rows = [
+            (user_id, dish_id, dish["name"], dish["price"], quantity)
+            for dish_id, quantity in cart.lines.items()
+            if (dish := menu.dishes.get(dish_id)) is not None
+        ]
+        if rows:
+            await conn.executemany(
+                "INSERT INTO cart (user_id, dish_id, name, price, quantity) "
+                "VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    def reset(self, user_id: int) -> Optional[CartState]:
+        """Корзина оформлена в заказ: в памяти она пустая и чистая"""
+        self._dirty.discard(user_id)
+        previous = self._carts.get(user_id)
+        self._carts[user_id] = CartState()
+        return previous
+
+    def restore(self, user_id: int, previous: Optional[CartState]):
+        """Транзакция заказа откатилась: возвращаем корзину и пишем ее заново"""
+        if previous is not None:
+            self._carts[user_id] = previous
+        if user_id in self._carts:
+            self._dirty.add(user_id)
+
+    async def flush(self, user_ids: Optional[Iterable[int]] = None) -> int:
+        """Записываем грязные корзины одной транзакцией"""
+        users = list(
+            self._dirty if user_ids is None else self._dirty.intersection(user_ids)
+        )
+        if not users:
+            return 0
+        menu = await self.db._menu()
+
+        async def op(conn):
+            # Состояние читаем в момент записи: правки после снимка списка
+            # снова пометят корзину грязной и уйдут следующим сбросом
+            for user_id in users:
+                await self.write(conn, user_id, menu)
+
+        try:
+            await self.db._write(op)
+        except Exception:
+            self._dirty.update(user for user in users if user in self._carts)
+            raise
+        self.flushes += 1
+        self.flushed_carts += len(users)
+        return len(users)
+
+    def _evict(self):
+        """Выгружаем чистые корзины, к которым давно не обращались"""
+        deadline = time.monotonic() - self.max_idle
+        idle = [
+            user_id
+            for user_id, cart in self._carts.items()
+            if cart.touched < deadline and user_id not in self._dirty
+        ]
+        for user_id in idle:
+            del self._carts[user_id]
+        self.evictions += len(idle)
+
+    def stats(self) -> dict:
+        return {
+            "carts": len(self._carts),
+            "dirty": len(self._dirty),
+            "loads": self.loads,
+            "flushes": self.flushes,
+            "flushed_carts": self.flushed_carts,
+            "evictions": self.evictions,
+        }
@@ -0,0 +1,100 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from aiogram import Bot, Dispatcher
+from aiogram.dispatcher.middlewares.user_context import UserContextMiddleware
+from aiogram.types import Update
+
+
+def chat_key(update: Update) -> Optional[int]:
+    """Чат апдейта, для событий без чата — пользователь"""
+    context = UserContextMiddleware.resolve_event_context(update)
+    if context.chat is not None:
+        return context.chat.id
+    if context.user is not None:
+        return context.user.id
+    return None
+
+
+class ChatQueue:
+    """Очередь одного чата: замок и число задач, которые его ждут или держат"""
+
+    __slots__ = ("lock", "users")
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.users = 0
+
+
+class ChatExecutor:
+    """Задачи одного чата выполняются по очереди, разных чатов — параллельно.
+
+    Очередь чата живет, пока в ней есть задачи, поэтому простаивающие чаты
+    памяти не занимают. Одновременно выполняется не больше concurrency задач;
+    задача, ждущая свой чат, места не занимает.
+    """
+
+    def __init__(self, concurrency: int = 100):
+        self.concurrency = concurrency
+        self.running = 0
+        self.peak = 0
+        self.completed = 0
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._chats: Dict[Any, ChatQueue] = {}
+
+    async def run(self, key: Optional[Any], func: Callable[..., Awaitable], *args):
+        """Выполняем func(*args) в очереди чата key (None — без очереди)"""
+        if key is None:
+            return await self._run(func, *args)
+
+        chat = self._chats.get(key)
+        if chat is None:
+            chat = self._chats[key] = ChatQueue()
+        chat.users += 1
+        try:
+            # asyncio.Lock пускает ожидающих по порядку прихода
+            async with chat.lock:
+                return await self._run(func, *args)
+        finally:
+            chat.users -= 1
+            if not chat.users:
+                del self._chats[key]
+
+    async def _run(self, func: Callable[..., Awaitable], *args):
+        async with self._semaphore:
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+            try:
+                return await func(*args)
+            finally:
+                self.running -= 1
+                self.completed += 1
+
+    def stats(self) -> dict:
+        return {
+            "chats": len(self._chats),
+            "running": self.running,
+            "peak": self.peak,
+            "completed": self.completed,
+        }
+
+
+class SequentialDispatcher(Dispatcher):
+    """Dispatcher, который пропускает апдейты одного чата строго по очереди.
+
+    Очередь стоит до всех middleware: FSMContextMiddleware читает состояние
+    еще до outer middleware роутеров, и второе нажатие «Оформить заказ»
+    иначе увидело бы состояние, которое первое еще не успело сменить.
+    """
+
+    def __init__(self, *args: Any, concurrency: int = 100, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.chat_executor = ChatExecutor(concurrency)
+
+    async def feed_update(self, bot: Bot, update: Update, **kwargs: Any) -> Any:
+        return await self.chat_executor.run(
+            chat_key(update), self._feed_update, bot, update, kwargs
+        )
+
+    async def _feed_update(self, bot: Bot, update: Update, kwargs: dict) -> Any:
+        return await super().feed_update(bot, update, **kwargs)
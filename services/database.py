@@ -1,15 +1,57 @@
-import aiosqlite
 from pathlib import Path
 import os
 import logging
-from typing import Optional, Dict, Union
+import time
+from typing import Optional, Dict, List, Union
+from services.cache import MenuCache, UserCache
+from services.cart_store import CartStore
+from services.metrics import metrics
+from services.migrations import (
+    REBUILD_FEEDBACK_DAILY,
+    REBUILD_ORDER_STATS,
+    REBUILD_SALES_ROLLUPS,
+    SALES_ROLLUP_TABLES,
+    migrate,
+)
+from services.pool import ConnectionPool
+from services.profiler import QueryProfiler
+from services.write_queue import WriteQueue
+from utils.pagination import NEXT, PREV, Page
 
 logger = logging.getLogger(__name__)
 
 
 class Database:
-    def __init__(self):
-        self.db_path = Path("data/restaurant.sqlite3")
+    def __init__(
+        self,
+        db_path: Union[str, Path] = Path("data/restaurant.sqlite3"),
+        readers: int = 4,
+        busy_timeout: int = 5000,
+        group_commit: bool = False,
+        max_batch: int = 64,
+        max_latency: float = 0.005,
+        user_cache_size: int = 10000,
+        user_cache_ttl: float = 300,
+        cart_store: bool = False,
+        cart_flush_interval: float = 1.0,
+        profiler: Optional[QueryProfiler] = None,
+    ):
+        self.db_path = Path(db_path)
+        # При групповом коммите fsync на каждую транзакцию уже дешев
+        self.pool = ConnectionPool(
+            self.db_path,
+            readers,
+            busy_timeout,
+            synchronous="FULL" if group_commit else "NORMAL",
+            profiler=profiler,
+        )
+        self.write_queue = (
+            WriteQueue(self.pool, max_batch, max_latency) if group_commit else None
+        )
+        self.menu_cache = MenuCache()
+        self.user_cache = UserCache(user_cache_size, user_cache_ttl)
+        # Корзины в памяти с отложенной записью, см. services/cart_store.py
+        self.cart_store = CartStore(self, cart_flush_interval) if cart_store else None
         self.conn = None
 
     async def connect(self):
@@ -18,89 +60,67 @@ class Database:
             # Создаем папку если не существует
             os.makedirs(self.db_path.parent, exist_ok=True)
 
-            # Подключаемся к БД (файл создастся автоматически)
-            self.conn = await aiosqlite.connect(self.db_path)
+            # Открываем пул соединений (файл создастся автоматически)
+            await self.pool.open()
+            self.conn = self.pool.writer
             logger.info(f"Подключено к БД: {self.db_path}")
 
-            # Включаем поддержку внешних ключей
-            await self.conn.execute("PRAGMA foreign_keys = ON")
+            # Создаем или обновляем схему
+            version = await migrate(self.pool)
+            logger.info(f"Версия схемы БД: {version}")
 
-            # Создаем таблицы
-            await self._create_tables()
+            if self.write_queue:
+                await self.write_queue.start()
+            if self.cart_store:
+                await self.cart_store.start()
             return self
         except Exception as e:
             logger.error(f"Ошибка подключения к БД: {e}")
             raise ConnectionError(f"Не удалось подключиться к БД: {e}")
 
-    async def _create_tables(self):
-        """Создаем таблицы в базе данных"""
+    async def _write(self, op):
+        """Выполняем op(conn) в транзакции писателя или через очередь записи"""
+        started = time.perf_counter()
         try:
-            await self.conn.executescript(
-                """
-                CREATE TABLE IF NOT EXISTS categories (
-                category_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL UNIQUE
-            );
-
-            CREATE TABLE IF NOT EXISTS dishes (
-                dish_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                description TEXT,
-                price REAL NOT NULL,
-                category_id INTEGER,
-                FOREIGN KEY (category_id) REFERENCES categories(category_id)
-            );
-                
-                CREATE TABLE IF NOT EXISTS users (
-                    user_id INTEGER PRIMARY KEY,
-                    username TEXT,
-                    full_name TEXT,
-                    phone TEXT,
-                    registration_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    profile_photo TEXT
-                );
-
-
-                CREATE TABLE IF NOT EXISTS orders (
-                    order_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER NOT NULL,
-                    total_amount REAL NOT NULL,
-                    delivery_type TEXT NOT NULL,
-                    address TEXT,
-                    phone TEXT NOT NULL,
-                    status TEXT DEFAULT 'new',
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (user_id) REFERENCES users(user_id)
-                );
-
-                CREATE TABLE IF NOT EXISTS order_items (
-                    item_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    order_id INTEGER NOT NULL,
-                    dish_id INTEGER NOT NULL,
-                    quantity INTEGER NOT NULL,
-                    price REAL NOT NULL,
-                    FOREIGN KEY (order_id) REFERENCES orders(order_id),
-                    FOREIGN KEY (dish_id) REFERENCES dishes(dish_id)
-                );
-                
-                CREATE TABLE IF NOT EXISTS feedback (
-                feedback_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL,
-                order_id INTEGER,
-                rating INTEGER NOT NULL,
-                comment TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users(user_id),
-                FOREIGN KEY (order_id) REFERENCES orders(order_id)
-            );
-            
-            """
-            )
-            await self.conn.commit()
-            logger.info("Таблицы успешно созданы")
-        except Exception as e:
-            logger.error(f"Ошибка создания таблиц: {e}")
-            raise
+            if self.write_queue:
+                return await self.write_queue.submit(op)
+            async with self.pool.transaction() as conn:
+                return await op(conn)
+        finally:
+            metrics.observe_db("write", time.perf_counter() - started)
+
+    async def _execute(self, query: str, params=()):
+        """Одиночный запрос на запись, возвращает строки RETURNING"""
+
+        async def op(conn):
+            async with conn.execute(query, params) as cursor:
+                return await cursor.fetchall()
+
+        return await self._write(op)
+
+    async def _menu(self):
+        """Снимок меню из кэша, при промахе читаем меню целиком"""
+        menu = self.menu_cache.get()
+        if menu:
+            return menu
+        async with self.menu_cache.load_lock:
+            # Пока ждали блокировку, меню мог загрузить другой запрос
+            return self.menu_cache.current() or await self._load_menu()
+
+    async def _load_menu(self):
+        """Читаем категории и блюда двумя запросами и кладем в кэш"""
+        version = self.menu_cache.version
+        async with self.pool.reader() as conn:
+            async with conn.execute(
+                "SELECT category_id, name FROM categories ORDER BY name"
+            ) as cursor:
+                categories = [dict(row) for row in await cursor.fetchall()]
+            async with conn.execute(
+                "SELECT dish_id, name, description, price, category_id "
+                "FROM dishes ORDER BY dish_id"
+            ) as cursor:
+                dishes = await cursor.fetchall()
+        return self.menu_cache.store(version, categories, dishes)
 
     async def add_user(
         self,
@@ -112,11 +132,11 @@ class Database:
     ) -> bool:
         """Добавляем нового пользователя"""
         try:
-            await self.conn.execute(
+            await self._execute(
                 "INSERT OR REPLACE INTO users (user_id, username, full_name, phone, profile_photo) VALUES (?, ?, ?, ?, ?)",
                 (user_id, username, full_name, phone, profile_photo),
             )
-            await self.conn.commit()
+            self.user_cache.invalidate(user_id)
             return True
         except Exception as e:
             logger.error(f"Ошибка добавления пользователя {user_id}: {e}")
@@ -125,14 +145,8 @@ class Database:
     async def get_dish_categories(self):
         """Получаем все категории блюд"""
         try:
-            async with self.conn.execute(
-                "SELECT category_id, name FROM categories ORDER BY name"
-            ) as cursor:
-                rows = await cursor.fetchall()
-                return [
-                    dict(zip([column[0] for column in cursor.description], row))
-                    for row in rows
-                ]
+            menu = await self._menu()
+            return list(menu.categories)
         except Exception as e:
             logger.error(f"Ошибка получения категорий блюд: {e}")
             return []
@@ -140,11 +154,8 @@ class Database:
     async def get_dishes_by_category(self, category_id: int):  # Изменили тип параметра
         """Получаем блюда по категории"""
         try:
-            async with self.conn.execute(
-                "SELECT dish_id, name, description, price FROM dishes WHERE category_id = ?",  # Стало
-                (category_id,),
-            ) as cursor:
-                return await cursor.fetchall()
+            menu = await self._menu()
+            return list(menu.dishes_by_category.get(category_id, []))
         except Exception as e:
             logger.error(f"Ошибка получения блюд категории: {e}")
             return []
@@ -152,14 +163,9 @@ class Database:
     async def get_dish_by_id(self, dish_id: int):
         """Получаем блюдо по ID"""
         try:
-            async with self.conn.execute(
-                "SELECT dish_id, name, description, price, category_id FROM dishes WHERE dish_id = ?",
-                (dish_id,),
-            ) as cursor:
-                row = await cursor.fetchone()
-                if row:
-                    return dict(zip([column[0] for column in cursor.description], row))
-                return None
+            menu = await self._menu()
+            dish = menu.dishes.get(dish_id)
+            return dict(dish) if dish else None
         except Exception as e:
             logger.error(f"Ошибка получения блюда {dish_id}: {e}")
             return None
@@ -169,11 +175,11 @@ class Database:
     ):
         """Добавляем новое блюдо в меню"""
         try:
-            await self.conn.execute(
+            await self._execute(
                 "INSERT INTO dishes (name, description, price, category_id) VALUES (?, ?, ?, ?)",
                 (name, description, price, category_id),
             )
-            await self.conn.commit()
+            self.menu_cache.invalidate()
             return True
         except Exception as e:
             logger.error(f"Ошибка добавления блюда: {e}")
@@ -186,11 +192,20 @@ class Database:
                 "Соединение с БД не установлено. Вызовите connect() перед использованием."
             )
 
+        cached = self.user_cache.get(user_id)
+        if cached is not UserCache.MISSING:
+            return cached
+
         try:
-            async with self.conn.execute(
-                "SELECT * FROM users WHERE user_id = ?", (user_id,)
-            ) as cursor:
-                return await cursor.fetchone()
+            generation = self.user_cache.generation
+            async with self.pool.reader() as conn:
+                async with conn.execute(
+                    "SELECT * FROM users WHERE user_id = ?", (user_id,)
+                ) as cursor:
+                    user = await cursor.fetchone()
+            # Кэшируем и отсутствие пользователя: add_user все равно сбросит запись
+            self.user_cache.put(user_id, user, generation)
+            return user
         except Exception as e:
             logger.error(f"Ошибка при получении пользователя {user_id}: {e}")
             return None
@@ -205,14 +220,12 @@ class Database:
     ) -> int:
         """Создаем новый заказ и возвращаем его ID"""
         try:
-            cursor = await self.conn.execute(
+            rows = await self._execute(
                 "INSERT INTO orders (user_id, total_amount, delivery_type, address, phone) "
                 "VALUES (?, ?, ?, ?, ?) RETURNING order_id",
                 (user_id, total_amount, delivery_type, address, phone),
             )
-            order_id = (await cursor.fetchone())[0]
-            await self.conn.commit()
-            return order_id
+            return rows[0][0]
         except Exception as e:
             logger.error(f"Ошибка создания заказа: {e}")
             raise
@@ -222,46 +235,312 @@ class Database:
     ):
         """Добавляем позицию в заказ"""
         try:
-            await self.conn.execute(
+            await self._execute(
                 "INSERT INTO order_items (order_id, dish_id, quantity, price) "
                 "VALUES (?, ?, ?, ?)",
                 (order_id, dish_id, quantity, price),
             )
-            await self.conn.commit()
         except Exception as e:
             logger.error(f"Ошибка добавления позиции в заказ: {e}")
             raise
 
-    async def get_user_orders(self, user_id: int):
-        """Получаем список заказов пользователя"""
-        try:
-            async with self.conn.execute(
-                "SELECT order_id, total_amount, delivery_type, status, created_at "
-                "FROM orders WHERE user_id = ? ORDER BY created_at DESC",
-                (user_id,),
-            ) as cursor:
-                return await cursor.fetchall()
-        except Exception as e:
-            logger.error(f"Ошибка получения заказов пользователя {user_id}: {e}")
-            return []
+    async def place_order(
+        self,
+        user_id: int,
+        delivery_type: str,
+        address: str,
+        phone: str,
+        promo_discount: float = 0,
+    ):
+        """Оформляем заказ из корзины одной транзакцией.
 
-    async def get_order_details(self, order_id: int):
-        """Получаем детали заказа"""
-        try:
-            async with self.conn.execute(
-                "SELECT * FROM orders WHERE order_id = ?", (order_id,)
+        Возвращает детали заказа как get_order_details или None, если корзина пуста.
+        """
+
+        menu = await self._menu() if self.cart_store else None
+        taken = {}
+
+        async def op(conn):
+            if self.cart_store:
+                # Корзина из памяти попадает в cart в той же транзакции
+                await self.cart_store.write(conn, user_id, menu)
+            async with conn.execute(
+                "INSERT INTO orders (user_id, total_amount, delivery_type, address, phone) "
+                "SELECT ?, ROUND(SUM(c.quantity * d.price) * (1 - ?), 2), ?, ?, ? "
+                "FROM cart c JOIN dishes d ON c.dish_id = d.dish_id "
+                "WHERE c.user_id = ? GROUP BY c.user_id "
+                "RETURNING *",
+                (user_id, promo_discount, delivery_type, address, phone, user_id),
             ) as cursor:
                 order = await cursor.fetchone()
+            if not order:
+                return None
+
+            await conn.execute(
+                "INSERT INTO order_items (order_id, dish_id, quantity, price) "
+                "SELECT ?, c.dish_id, c.quantity, d.price "
+                "FROM cart c JOIN dishes d ON c.dish_id = d.dish_id "
+                "WHERE c.user_id = ?",
+                (order["order_id"], user_id),
+            )
+            await conn.execute("DELETE FROM cart WHERE user_id = ?", (user_id,))
 
-            async with self.conn.execute(
+            async with conn.execute(
                 "SELECT d.name, oi.quantity, oi.price "
                 "FROM order_items oi "
                 "JOIN dishes d ON oi.dish_id = d.dish_id "
                 "WHERE oi.order_id = ?",
-                (order_id,),
+                (order["order_id"],),
             ) as cursor:
                 items = await cursor.fetchall()
 
+            if self.cart_store:
+                taken["cart"] = self.cart_store.reset(user_id)
+            return {"order": order, "items": items}
+
+        try:
+            return await self._write(op)
+        except Exception as e:
+            if self.cart_store:
+                self.cart_store.restore(user_id, taken.get("cart"))
+            logger.error(f"Ошибка оформления заказа пользователя {user_id}: {e}")
+            raise
+
+    async def _keyset_page(
+        self,
+        select: str,
+        keys: tuple,
+        cursor: Optional[tuple] = None,
+        direction: str = NEXT,
+        limit: int = 10,
+        where: tuple = (),
+        params: tuple = (),
+    ) -> Page:
+        """Страница по ключу keys (от новых к старым) без OFFSET.
+
+        keys: пары (выражение SQL, имя колонки в строке), последним идет
+        уникальный ID, чтобы ключ однозначно задавал позицию.
+        """
+        conditions = list(where)
+        args = list(params)
+        columns = ", ".join(expression for expression, _ in keys)
+        if cursor:
+            sign = "<" if direction == NEXT else ">"
+            conditions.append(f"({columns}) {sign} ({', '.join('?' * len(keys))})")
+            args.extend(cursor)
+        order = "DESC" if direction == NEXT else "ASC"
+        query = select
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY " + ", ".join(
+            f"{expression} {order}" for expression, _ in keys
+        )
+        query += " LIMIT ?"
+        args.append(limit + 1)
+
+        async with self.pool.reader() as conn:
+            async with conn.execute(query, args) as cursor_:
+                rows = [dict(row) for row in await cursor_.fetchall()]
+
+        more = len(rows) > limit
+        rows = rows[:limit]
+        if direction == PREV:
+            rows.reverse()
+        if not rows:
+            # Назад уходить некуда: строки удалили, показываем первую страницу
+            if direction == PREV and cursor:
+                return await self._keyset_page(
+                    select, keys, None, NEXT, limit, where, params
+                )
+            return Page([])
+
+        def key(row):
+            return tuple(row[name] for _, name in keys)
+
+        if direction == NEXT:
+            return Page(
+                rows, key(rows[-1]) if more else None, key(rows[0]) if cursor else None
+            )
+        return Page(rows, key(rows[-1]), key(rows[0]) if more else None)
+
+    async def get_user_orders_page(
+        self,
+        user_id: int,
+        cursor: Optional[tuple] = None,
+        direction: str = NEXT,
+        limit: int = 10,
+    ) -> Page:
+        """Страница заказов пользователя, от новых к старым"""
+        try:
+            return await self._keyset_page(
+                "SELECT order_id, total_amount, delivery_type, status, created_at "
+                "FROM orders",
+                (("created_at", "created_at"), ("order_id", "order_id")),
+                cursor,
+                direction,
+                limit,
+                where=("user_id = ?",),
+                params=(user_id,),
+            )
+        except Exception as e:
+            logger.error(f"Ошибка получения заказов пользователя {user_id}: {e}")
+            return Page([])
+
+    async def get_orders_page(
+        self, cursor: Optional[tuple] = None, direction: str = NEXT, limit: int = 10
+    ) -> Page:
+        """Страница всех заказов, от новых к старым"""
+        try:
+            return await self._keyset_page(
+                "SELECT order_id, user_id, total_amount, delivery_type, status, "
+                "created_at FROM orders",
+                (("created_at", "created_at"), ("order_id", "order_id")),
+                cursor,
+                direction,
+                limit,
+            )
+        except Exception as e:
+            logger.error(f"Ошибка получения страницы заказов: {e}")
+            return Page([])
+
+    async def get_users_page(
+        self, cursor: Optional[tuple] = None, direction: str = NEXT, limit: int = 10
+    ) -> Page:
+        """Страница пользователей, от новых к старым"""
+        try:
+            return await self._keyset_page(
+                "SELECT user_id, username, full_name, phone, registration_date "
+                "FROM users",
+                (("registration_date", "registration_date"), ("user_id", "user_id")),
+                cursor,
+                direction,
+                limit,
+            )
+        except Exception as e:
+            logger.error(f"Ошибка получения страницы пользователей: {e}")
+            return Page([])
+
+    @staticmethod
+    def _since(days: Optional[int]) -> Optional[str]:
+        """Модификатор date('now', ...) для последних days дней, включая сегодня"""
+        return f"-{days - 1} days" if days else None
+
+    async def get_feedback_page(
+        self,
+        cursor: Optional[tuple] = None,
+        direction: str = NEXT,
+        limit: int = 10,
+        rating: Optional[int] = None,
+        days: Optional[int] = None,
+    ) -> Page:
+        """Страница отзывов с именами авторов, от новых к старым.
+
+        rating оставляет отзывы с одной оценкой, days — за последние дни.
+        """
+        where, params = [], []
+        if rating:
+            where.append("f.rating = ?")
+            params.append(rating)
+        if days:
+            where.append("f.created_at >= date('now', ?)")
+            params.append(self._since(days))
+        try:
+            return await self._keyset_page(
+                "SELECT f.feedback_id, f.user_id, f.order_id, f.rating, f.comment, "
+                "f.created_at, u.username, u.full_name "
+                "FROM feedback f LEFT JOIN users u ON f.user_id = u.user_id",
+                (("f.created_at", "created_at"), ("f.feedback_id", "feedback_id")),
+                cursor,
+                direction,
+                limit,
+                where=tuple(where),
+                params=tuple(params),
+            )
+        except Exception as e:
+            logger.error(f"Ошибка получения страницы отзывов: {e}")
+            return Page([])
+
+    async def get_feedback_summary(self, days: Optional[int] = None):
+        """Число отзывов, средняя оценка и гистограмма оценок по feedback_daily"""
+        histogram = {rating: 0 for rating in range(1, 6)}
+        query = "SELECT rating, SUM(reviews) AS reviews FROM feedback_daily"
+        params = ()
+        if days:
+            query += " WHERE day >= date('now', ?)"
+            params = (self._since(days),)
+        query += " GROUP BY rating"
+        try:
+            async with self.pool.reader() as conn:
+                async with conn.execute(query, params) as cursor:
+                    for row in await cursor.fetchall():
+                        histogram[row["rating"]] = row["reviews"]
+        except Exception as e:
+            logger.error(f"Ошибка получения сводки отзывов: {e}")
+        count = sum(histogram.values())
+        total = sum(rating * reviews for rating, reviews in histogram.items())
+        return {
+            "count": count,
+            "avg_rating": round(total / count, 2) if count else 0,
+            "histogram": histogram,
+        }
+
+    async def get_dishes_page(
+        self, cursor: Optional[tuple] = None, direction: str = NEXT, limit: int = 10
+    ) -> Page:
+        """Страница блюд для админки из снимка меню, курсор — ID блюда"""
+        try:
+            menu = await self._menu()
+            dishes = menu.admin_dishes()
+            position = menu.admin_position(cursor[0]) if cursor else None
+            if position is None:
+                start = 0
+            elif direction == NEXT:
+                start = position + 1
+            else:
+                start = max(position - limit, 0)
+            rows = dishes[start : start + limit]
+            if not rows:
+                return Page([])
+            return Page(
+                rows,
+                (rows[-1]["dish_id"],) if start + limit < len(dishes) else None,
+                (rows[0]["dish_id"],) if start > 0 else None,
+            )
+        except Exception as e:
+            logger.error(f"Ошибка получения страницы блюд: {e}")
+            return Page([])
+
+    async def get_user_orders(self, user_id: int):
+        """Получаем список заказов пользователя"""
+        try:
+            async with self.pool.reader() as conn:
+                async with conn.execute(
+                    "SELECT order_id, total_amount, delivery_type, status, created_at "
+                    "FROM orders WHERE user_id = ? ORDER BY created_at DESC",
+                    (user_id,),
+                ) as cursor:
+                    return await cursor.fetchall()
+        except Exception as e:
+            logger.error(f"Ошибка получения заказов пользователя {user_id}: {e}")
+            return []
+
+    async def get_order_details(self, order_id: int):
+        """Получаем детали заказа"""
+        try:
+            async with self.pool.reader() as conn:
+                async with conn.execute(
+                    "SELECT * FROM orders WHERE order_id = ?", (order_id,)
+                ) as cursor:
+                    order = await cursor.fetchone()
+                async with conn.execute(
+                    "SELECT d.name, oi.quantity, oi.price "
+                    "FROM order_items oi "
+                    "JOIN dishes d ON oi.dish_id = d.dish_id "
+                    "WHERE oi.order_id = ?",
+                    (order_id,),
+                ) as cursor:
+                    items = await cursor.fetchall()
+
             return {"order": order, "items": items}
         except Exception as e:
             logger.error(f"Ошибка получения деталей заказа {order_id}: {e}")
@@ -272,23 +551,39 @@ class Database:
     ) -> bool:
         """Добавляем отзыв к заказу"""
         try:
-            await self.conn.execute(
+            await self._execute(
                 "INSERT INTO feedback (user_id, order_id, rating, comment) VALUES (?, ?, ?, ?)",
                 (user_id, order_id, rating, comment),
             )
-            await self.conn.commit()
             return True
         except Exception as e:
             logger.error(f"Ошибка добавления отзыва: {e}")
             return False
 
+    async def add_order_rating(self, user_id: int, order_id: int, rating: int) -> bool:
+        """Оценка своего заказа; False, если заказ чужой или уже оценен"""
+        try:
+            rows = await self._execute(
+                "INSERT INTO feedback (user_id, order_id, rating) "
+                "SELECT user_id, order_id, ? FROM orders "
+                "WHERE order_id = ? AND user_id = ? "
+                "AND NOT EXISTS (SELECT 1 FROM feedback WHERE order_id = ?) "
+                "RETURNING feedback_id",
+                (rating, order_id, user_id, order_id),
+            )
+            return bool(rows)
+        except Exception as e:
+            logger.error(f"Ошибка оценки заказа {order_id}: {e}")
+            return False
+
     async def get_feedback(self, order_id: int):
         """Получаем отзыв по ID заказа"""
         try:
-            async with self.conn.execute(
-                "SELECT * FROM feedback WHERE order_id = ?", (order_id,)
-            ) as cursor:
-                return await cursor.fetchone()
+            async with self.pool.reader() as conn:
+                async with conn.execute(
+                    "SELECT * FROM feedback WHERE order_id = ?", (order_id,)
+                ) as cursor:
+                    return await cursor.fetchone()
         except Exception as e:
             logger.error(f"Ошибка получения отзыва для заказа {order_id}: {e}")
             return None
@@ -296,11 +591,12 @@ class Database:
     async def get_user_feedback(self, user_id: int):
         """Получаем все отзывы пользователя"""
         try:
-            async with self.conn.execute(
-                "SELECT * FROM feedback WHERE user_id = ? ORDER BY created_at DESC",
-                (user_id,),
-            ) as cursor:
-                return await cursor.fetchall()
+            async with self.pool.reader() as conn:
+                async with conn.execute(
+                    "SELECT * FROM feedback WHERE user_id = ? ORDER BY created_at DESC",
+                    (user_id,),
+                ) as cursor:
+                    return await cursor.fetchall()
         except Exception as e:
             logger.error(f"Ошибка получения отзывов пользователя {user_id}: {e}")
             return []
@@ -308,21 +604,19 @@ class Database:
     async def get_admin_stats(self):
         """Получение статистики для админ-панели"""
         try:
-            # Общее количество заказов
-            async with self.conn.execute("SELECT COUNT(*) FROM orders") as cursor:
-                total_orders = (await cursor.fetchone())[0] or 0
+            # Агрегаты ведут триггеры, здесь по строке на статус заказа
+            async with self.pool.reader() as conn:
+                async with conn.execute(
+                    "SELECT status, orders, revenue FROM order_stats WHERE orders > 0"
+                ) as cursor:
+                    by_status = {
+                        row["status"]: (row["orders"], round(row["revenue"], 2))
+                        for row in await cursor.fetchall()
+                    }
 
-            # Средний чек
-            async with self.conn.execute(
-                "SELECT AVG(total_amount) FROM orders"
-            ) as cursor:
-                avg_order = (await cursor.fetchone())[0] or 0
-
-            # Общий доход
-            async with self.conn.execute(
-                "SELECT SUM(total_amount) FROM orders"
-            ) as cursor:
-                total_revenue = (await cursor.fetchone())[0] or 0
+            total_orders = sum(orders for orders, _ in by_status.values())
+            total_revenue = sum(revenue for _, revenue in by_status.values())
+            avg_order = total_revenue / total_orders if total_orders else 0
 
             # Последние 5 заказов
             recent_orders = await self.get_recent_orders(5)
@@ -331,6 +625,7 @@ class Database:
                 "total_orders": total_orders,
                 "avg_order": round(avg_order, 2),
                 "total_revenue": round(total_revenue, 2),
+                "by_status": by_status,
                 "recent_orders": "\n".join(
                     f"#{o['order_id']} - {o['total_amount']} руб. - {o['status']}"
                     for o in recent_orders
@@ -342,17 +637,136 @@ class Database:
                 "total_orders": 0,
                 "avg_order": 0,
                 "total_revenue": 0,
+                "by_status": {},
                 "recent_orders": "Нет данных",
             }
 
+    async def rebuild_stats(self) -> bool:
+        """Пересчитываем order_stats по таблице заказов с нуля"""
+
+        async def op(conn):
+            await conn.execute("DELETE FROM order_stats")
+            await conn.execute(REBUILD_ORDER_STATS)
+
+        try:
+            await self._write(op)
+            logger.info("Статистика заказов пересчитана")
+            return True
+        except Exception as e:
+            logger.error(f"Ошибка пересчета статистики: {e}")
+            return False
+
+    async def backfill_rollups(self) -> bool:
+        """Пересчитываем срезы продаж и отзывов по дням с нуля"""
+
+        async def op(conn):
+            for table in SALES_ROLLUP_TABLES:
+                await conn.execute(f"DELETE FROM {table}")
+            for query in REBUILD_SALES_ROLLUPS:
+                await conn.execute(query)
+            await conn.execute("DELETE FROM feedback_daily")
+            await conn.execute(REBUILD_FEEDBACK_DAILY)
+
+        try:
+            await self._write(op)
+            logger.info("Срезы продаж пересчитаны")
+            return True
+        except Exception as e:
+            logger.error(f"Ошибка пересчета срезов продаж: {e}")
+            return False
+
+    async def get_sales_summary(self, days: int = 1):
+        """Продажи за последние days дней (сегодня при days=1) по срезам.
+
+        Для одного дня строки по часам, иначе по дням.
+        """
+        if days == 1:
+            query = (
+                "SELECT hour AS bucket, orders, revenue, quantity FROM sales_hourly "
+                "WHERE hour >= strftime('%Y-%m-%d 00:00', 'now') ORDER BY hour"
+            )
+            params = ()
+        else:
+            query = (
+                "SELECT day AS bucket, orders, revenue, quantity FROM sales_daily "
+                "WHERE day >= date('now', ?) ORDER BY day"
+            )
+            params = (self._since(days),)
+        try:
+            async with self.pool.reader() as conn:
+                async with conn.execute(query, params) as cursor:
+                    rows = [dict(row) for row in await cursor.fetchall()]
+            orders = sum(row["orders"] for row in rows)
+            revenue = sum(row["revenue"] for row in rows)
+            return {
+                "days": days,
+                "orders": orders,
+                "revenue": round(revenue, 2),
+                "quantity": sum(row["quantity"] for row in rows),
+                "avg_order": round(revenue / orders, 2) if orders else 0,
+                "rows": rows,
+            }
+        except Exception as e:
+            logger.error(f"Ошибка получения продаж за {days} дн.: {e}")
+            return {
+                "days": days,
+                "orders": 0,
+                "revenue": 0,
+                "quantity": 0,
+                "avg_order": 0,
+                "rows": [],
+            }
+
+    async def get_top_dishes(self, days: int = 30, limit: int = 5):
+        """Самые продаваемые блюда за последние days дней"""
+        try:
+            async with self.pool.reader() as conn:
+                async with conn.execute(
+                    "SELECT dish_id, SUM(quantity) AS quantity, SUM(revenue) AS revenue "
+                    "FROM dish_sales_daily WHERE day >= date('now', ?) "
+                    "GROUP BY dish_id ORDER BY quantity DESC LIMIT ?",
+                    (self._since(days), limit),
+                ) as cursor:
+                    rows = [dict(row) for row in await cursor.fetchall()]
+            # Названия берем из меню, удаленные блюда показываем по ID
+            menu = await self._menu()
+            for row in rows:
+                dish = menu.dishes.get(row["dish_id"])
+                row["name"] = dish["name"] if dish else f"#{row['dish_id']}"
+            return rows
+        except Exception as e:
+            logger.error(f"Ошибка получения популярных блюд: {e}")
+            return []
+
+    async def get_category_sales(self, days: int = 30):
+        """Продажи по категориям за последние days дней"""
+        try:
+            async with self.pool.reader() as conn:
+                async with conn.execute(
+                    "SELECT category_id, SUM(quantity) AS quantity, SUM(revenue) AS revenue "
+                    "FROM dish_sales_daily WHERE day >= date('now', ?) "
+                    "GROUP BY category_id ORDER BY revenue DESC",
+                    (self._since(days),),
+                ) as cursor:
+                    rows = [dict(row) for row in await cursor.fetchall()]
+            menu = await self._menu()
+            for row in rows:
+                category = menu.categories_by_id.get(row["category_id"])
+                row["name"] = category["name"] if category else "Без категории"
+            return rows
+        except Exception as e:
+            logger.error(f"Ошибка получения продаж по категориям: {e}")
+            return []
+
     async def get_recent_orders(self, limit: int = 5):
         """Получение последних заказов"""
         try:
-            async with self.conn.execute(
-                "SELECT order_id, total_amount, status FROM orders ORDER BY created_at DESC LIMIT ?",
-                (limit,),
-            ) as cursor:
-                return [dict(row) for row in await cursor.fetchall()]
+            async with self.pool.reader() as conn:
+                async with conn.execute(
+                    "SELECT order_id, total_amount, status FROM orders ORDER BY created_at DESC LIMIT ?",
+                    (limit,),
+                ) as cursor:
+                    return [dict(row) for row in await cursor.fetchall()]
         except Exception as e:
             logger.error(f"Ошибка получения последних заказов: {e}")
             return []
@@ -360,15 +774,16 @@ class Database:
     async def get_all_dishes(self):
         """Получение всех блюд для управления меню"""
         try:
-            async with self.conn.execute(
-                "SELECT d.dish_id, d.name, d.price, c.name as category_name "
-                "FROM dishes d "
-                "LEFT JOIN categories c ON d.category_id = c.category_id "
-                "ORDER BY c.name, d.name"
-            ) as cursor:
-                rows = await cursor.fetchall()
-                columns = [column[0] for column in cursor.description]
-                return [dict(zip(columns, row)) for row in rows]
+            async with self.pool.reader() as conn:
+                async with conn.execute(
+                    "SELECT d.dish_id, d.name, d.price, c.name as category_name "
+                    "FROM dishes d "
+                    "LEFT JOIN categories c ON d.category_id = c.category_id "
+                    "ORDER BY c.name, d.name"
+                ) as cursor:
+                    rows = await cursor.fetchall()
+                    columns = [column[0] for column in cursor.description]
+                    return [dict(zip(columns, row)) for row in rows]
         except Exception as e:
             logger.error(f"Ошибка получения списка блюд: {e}")
             return []
@@ -385,8 +800,8 @@ class Database:
 
             query = f"UPDATE dishes SET {set_clause} WHERE dish_id = ?"
 
-            await self.conn.execute(query, values)
-            await self.conn.commit()
+            await self._execute(query, values)
+            self.menu_cache.invalidate()
             return True
         except Exception as e:
             logger.error(f"Ошибка обновления блюда {dish_id}: {e}")
@@ -395,8 +810,8 @@ class Database:
     async def delete_dish(self, dish_id: int) -> bool:
         """Удаление блюда из меню"""
         try:
-            await self.conn.execute("DELETE FROM dishes WHERE dish_id = ?", (dish_id,))
-            await self.conn.commit()
+            await self._execute("DELETE FROM dishes WHERE dish_id = ?", (dish_id,))
+            self.menu_cache.invalidate()
             return True
         except Exception as e:
             logger.error(f"Ошибка удаления блюда {dish_id}: {e}")
@@ -405,152 +820,163 @@ class Database:
     async def get_all_users(self):
         """Получение списка всех пользователей"""
         try:
-            async with self.conn.execute(
-                "SELECT user_id, username, full_name, phone, registration_date FROM users ORDER BY registration_date DESC"
-            ) as cursor:
-                return [dict(row) for row in await cursor.fetchall()]
+            async with self.pool.reader() as conn:
+                async with conn.execute(
+                    "SELECT user_id, username, full_name, phone, registration_date FROM users ORDER BY registration_date DESC"
+                ) as cursor:
+                    return [dict(row) for row in await cursor.fetchall()]
         except Exception as e:
             logger.error(f"Ошибка получения списка пользователей: {e}")
             return []
 
+    async def get_user_ids(self, after: int = 0, limit: int = 500) -> List[int]:
+        """Идентификаторы пользователей по возрастанию, начиная после after"""
+        try:
+            async with self.pool.reader() as conn:
+                async with conn.execute(
+                    "SELECT user_id FROM users WHERE user_id > ? ORDER BY user_id LIMIT ?",
+                    (after, limit),
+                ) as cursor:
+                    return [row[0] for row in await cursor.fetchall()]
+        except Exception as e:
+            logger.error(f"Ошибка получения пользователей для рассылки: {e}")
+            return []
+
     async def update_order_status(self, order_id: int, status: str) -> bool:
         """Обновление статуса заказа"""
         try:
-            await self.conn.execute(
-                "UPDATE orders SET status = ? WHERE order_id = ?", (status, order_id)
+            await self._execute(
+                "UPDATE orders SET status = ? WHERE order_id = ?",
+                (status, order_id),
             )
-            await self.conn.commit()
             return True
         except Exception as e:
             logger.error(f"Ошибка обновления статуса заказа {order_id}: {e}")
             return False
 
-    async def create_cart_tables(self):
-        """Создаем таблицы для корзины"""
-        try:
-            await self.conn.executescript(
-                """
-                CREATE TABLE IF NOT EXISTS cart (
-                    cart_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER NOT NULL,
-                    dish_id INTEGER NOT NULL,
-                    name TEXT NOT NULL,     
-                    price REAL NOT NULL, 
-                    quantity INTEGER DEFAULT 1,
-                    added_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (user_id) REFERENCES users(user_id),
-                    FOREIGN KEY (dish_id) REFERENCES dishes(dish_id)
-                );
-
-                CREATE TABLE IF NOT EXISTS cart_items (
-                    item_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    cart_id INTEGER NOT NULL,
-                    dish_id INTEGER NOT NULL,
-                    
-                    quantity INTEGER DEFAULT 1,
-                    FOREIGN KEY (cart_id) REFERENCES cart(cart_id),
-                    FOREIGN KEY (dish_id) REFERENCES dishes(dish_id)
-                );
-            """
-            )
-            await self.conn.commit()
-            logger.info("Таблицы корзины созданы")
-        except Exception as e:
-            logger.error(f"Ошибка создания таблиц корзины: {e}")
-            raise
+    @staticmethod
+    async def _cart_lines(conn, user_id: int):
+        """Строки корзины с суммой по позиции на переданном соединении"""
+        async with conn.execute(
+            "SELECT c.dish_id, d.name, c.quantity, d.price, "
+            "c.quantity * d.price AS line_total "
+            "FROM cart c JOIN dishes d ON c.dish_id = d.dish_id "
+            "WHERE c.user_id = ? ORDER BY c.cart_id",
+            (user_id,),
+        ) as cursor:
+            return [dict(row) for row in await cursor.fetchall()]
+
+    @staticmethod
+    def _cart(items: list) -> dict:
+        """Обновленная корзина, которую возвращают методы изменения корзины"""
+        return {
+            "items": items,
+            "total": round(sum(item["line_total"] for item in items), 2),
+        }
+
+    async def _change_cart(self, user_id: int, *statements):
+        """Выполняем запросы к корзине и в той же транзакции читаем ее заново"""
+        # Корзину в памяти вызывающий метод уже изменил, в БД не идем
+        if self.cart_store:
+            return self._cart(await self.cart_store.items(user_id, await self._menu()))
+
+        async def op(conn):
+            for query, params in statements:
+                await conn.execute(query, params)
+            return await self._cart_lines(conn, user_id)
+
+        return self._cart(await self._write(op))
 
     async def get_cart_items(self, user_id: int):
         """Получаем содержимое корзины пользователя"""
         try:
-            async with self.conn.execute(
-                """
-                    SELECT c.cart_id, d.name, c.quantity, d.price 
-                    FROM cart c
-                    JOIN dishes d ON c.dish_id = d.dish_id
-                    WHERE c.user_id = ?
-                    """,
-                (user_id,),
-            ) as cursor:
-                rows = await cursor.fetchall()
-                columns = [column[0] for column in cursor.description]
-                return [dict(zip(columns, row)) for row in rows]
+            if self.cart_store:
+                return await self.cart_store.items(user_id, await self._menu())
+            async with self.pool.reader() as conn:
+                return await self._cart_lines(conn, user_id)
         except Exception as e:
             logger.error(f"Ошибка получения корзины для пользователя {user_id}: {e}")
             return []
 
     async def add_to_cart(self, user_id: int, dish_id: int, name: str, price: float):
-        """Добавляет блюдо в корзину"""
+        """Добавляет блюдо в корзину и возвращает обновленную корзину"""
         try:
-            await self.conn.execute(
-                """
-                INSERT OR REPLACE INTO cart (user_id, dish_id, name, price, quantity)
-                VALUES (?, ?, ?, ?, COALESCE((SELECT quantity FROM cart WHERE user_id = ? AND dish_id = ?), 0) + 1)
-                """,
-                (user_id, dish_id, name, price, user_id, dish_id),
+            if self.cart_store:
+                await self.cart_store.add(user_id, dish_id)
+            return await self._change_cart(
+                user_id,
+                (
+                    "INSERT INTO cart (user_id, dish_id, name, price) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT (user_id, dish_id) DO UPDATE SET quantity = quantity + 1",
+                    (user_id, dish_id, name, price),
+                ),
             )
-            await self.conn.commit()
         except Exception as e:
             logger.error(f"Ошибка добавления в корзину: {e}")
             raise
 
     async def remove_from_cart(self, user_id: int, dish_id: int):
-        """Удаляет блюдо из корзины"""
+        """Удаляет блюдо из корзины и возвращает обновленную корзину"""
         try:
-            await self.conn.execute(
-                "DELETE FROM cart WHERE user_id = ? AND dish_id = ?", (user_id, dish_id)
+            if self.cart_store:
+                await self.cart_store.remove(user_id, dish_id)
+            return await self._change_cart(
+                user_id,
+                (
+                    "DELETE FROM cart WHERE user_id = ? AND dish_id = ?",
+                    (user_id, dish_id),
+                ),
             )
-            await self.conn.commit()
         except Exception as e:
             logger.error(f"Ошибка удаления из корзины: {e}")
             raise
 
     async def increase_quantity(self, user_id: int, dish_id: int):
-        """Увеличивает количество на 1"""
+        """Увеличивает количество на 1 и возвращает обновленную корзину"""
         try:
-            await self.conn.execute(
-                "UPDATE cart SET quantity = quantity + 1 WHERE user_id = ? AND dish_id = ?",
-                (user_id, dish_id),
+            if self.cart_store:
+                await self.cart_store.increase(user_id, dish_id)
+            return await self._change_cart(
+                user_id,
+                (
+                    "UPDATE cart SET quantity = quantity + 1 WHERE user_id = ? AND dish_id = ?",
+                    (user_id, dish_id),
+                ),
             )
-            await self.conn.commit()
         except Exception as e:
             logger.error(f"Ошибка увеличения количества: {e}")
             raise
 
     async def decrease_quantity(self, user_id: int, dish_id: int):
-        """Уменьшает количество на 1 или удаляет если 0"""
+        """Уменьшает количество на 1 или удаляет если 0, возвращает корзину"""
         try:
-            await self.conn.execute(
-                "UPDATE cart SET quantity = quantity - 1 WHERE user_id = ? AND dish_id = ? AND quantity > 1",
-                (user_id, dish_id),
-            )
-            await self.conn.execute(
-                "DELETE FROM cart WHERE user_id = ? AND dish_id = ? AND quantity <= 1",
-                (user_id, dish_id),
+            if self.cart_store:
+                await self.cart_store.decrease(user_id, dish_id)
+            # Сначала удаляем последнюю порцию, иначе после UPDATE 2 -> 1
+            # строка попала бы и под DELETE
+            return await self._change_cart(
+                user_id,
+                (
+                    "DELETE FROM cart WHERE user_id = ? AND dish_id = ? AND quantity <= 1",
+                    (user_id, dish_id),
+                ),
+                (
+                    "UPDATE cart SET quantity = quantity - 1 WHERE user_id = ? AND dish_id = ?",
+                    (user_id, dish_id),
+                ),
             )
-            await self.conn.commit()
         except Exception as e:
             logger.error(f"Ошибка уменьшения количества: {e}")
             raise
 
-    async def remove_from_cart(self, user_id: int, cart_item_id: int) -> bool:
-        """Удаляем позицию из корзины"""
+    async def clear_cart(self, user_id: int):
+        """Очищаем корзину пользователя, при ошибке возвращаем False"""
         try:
-            await self.conn.execute(
-                "DELETE FROM cart WHERE cart_id = ? AND user_id = ?",
-                (cart_item_id, user_id),
+            if self.cart_store:
+                await self.cart_store.clear(user_id)
+            return await self._change_cart(
+                user_id, ("DELETE FROM cart WHERE user_id = ?", (user_id,))
             )
-            await self.conn.commit()
-            return True
-        except Exception as e:
-            logger.error(f"Ошибка удаления из корзины: {e}")
-            return False
-
-    async def clear_cart(self, user_id: int) -> bool:
-        """Очищаем корзину пользователя"""
-        try:
-            await self.conn.execute("DELETE FROM cart WHERE user_id = ?", (user_id,))
-            await self.conn.commit()
-            return True
         except Exception as e:
             logger.error(f"Ошибка очистки корзины: {e}")
             return False
@@ -558,17 +984,22 @@ class Database:
     async def close(self):
         """Закрываем соединение с базой данных"""
         if self.conn:
-            await self.conn.close()
+            # Корзины пишутся через очередь записи, поэтому сбрасываем их первыми
+            if self.cart_store:
+                await self.cart_store.stop()
+            if self.write_queue:
+                await self.write_queue.stop()
+            await self.pool.close()
             self.conn = None
             logger.info("Соединение с БД закрыто")
 
     async def add_category(self, name: str) -> bool:
         """Добавляем новую категорию"""
         try:
-            await self.conn.execute(
+            await self._execute(
                 "INSERT OR IGNORE INTO categories (name) VALUES (?)", (name,)
             )
-            await self.conn.commit()
+            self.menu_cache.invalidate()
             return True
         except Exception as e:
             logger.error(f"Ошибка добавления категории: {e}")
@@ -577,14 +1008,8 @@ class Database:
     async def get_all_categories(self):
         """Получаем все категории"""
         try:
-            async with self.conn.execute(
-                "SELECT * FROM categories ORDER BY name"
-            ) as cursor:
-                rows = await cursor.fetchall()
-                return [
-                    dict(zip([column[0] for column in cursor.description], row))
-                    for row in rows
-                ]
+            menu = await self._menu()
+            return list(menu.categories)
         except Exception as e:
             logger.error(f"Ошибка получения категорий: {e}")
             return []
@@ -592,10 +1017,10 @@ class Database:
     async def delete_category(self, category_id: int) -> bool:
         """Удаляем категорию"""
         try:
-            await self.conn.execute(
+            await self._execute(
                 "DELETE FROM categories WHERE category_id = ?", (category_id,)
             )
-            await self.conn.commit()
+            self.menu_cache.invalidate()
             return True
         except Exception as e:
             logger.error(f"Ошибка удаления категории: {e}")
@@ -604,13 +1029,9 @@ class Database:
     async def get_category(self, category_id: int):
         """Получаем категорию по ID"""
         try:
-            async with self.conn.execute(
-                "SELECT * FROM categories WHERE category_id = ?", (category_id,)
-            ) as cursor:
-                row = await cursor.fetchone()
-                if row:
-                    return dict(zip([column[0] for column in cursor.description], row))
-                return None
+            menu = await self._menu()
+            category = menu.categories_by_id.get(category_id)
+            return dict(category) if category else None
         except Exception as e:
             logger.error(f"Ошибка получения категории {category_id}: {e}")
             return None
@@ -618,19 +1039,20 @@ class Database:
     async def get_all_feedback(self):
         """Получение всех отзывов"""
         try:
-            async with self.conn.execute(
+            async with self.pool.reader() as conn:
+                async with conn.execute(
+                    """
+                    SELECT f.*, u.username, u.full_name 
+                    FROM feedback f
+                    LEFT JOIN users u ON f.user_id = u.user_id
+                    ORDER BY f.created_at DESC
                 """
-                SELECT f.*, u.username, u.full_name 
-                FROM feedback f
-                LEFT JOIN users u ON f.user_id = u.user_id
-                ORDER BY f.created_at DESC
-            """
-            ) as cursor:
-                rows = await cursor.fetchall()
-                return [
-                    dict(zip([column[0] for column in cursor.description], row))
-                    for row in rows
-                ]
+                ) as cursor:
+                    rows = await cursor.fetchall()
+                    return [
+                        dict(zip([column[0] for column in cursor.description], row))
+                        for row in rows
+                    ]
         except Exception as e:
             logger.error(f"Ошибка получения отзывов: {e}")
             return []
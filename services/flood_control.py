@@ -0,0 +1,203 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import (
+    BaseRequestMiddleware,
+    NextRequestMiddlewareType,
+)
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import TelegramMethod
+from aiogram.methods.base import Response, TelegramType
+
+logger = logging.getLogger(__name__)
+
+# Полосы приоритета: меньше значение — раньше получает токен
+INTERACTIVE = 0
+BULK = 1
+LANES = {INTERACTIVE: "interactive", BULK: "bulk"}
+
+send_priority: ContextVar[int] = ContextVar("send_priority", default=INTERACTIVE)
+
+
+@contextmanager
+def bulk_priority():
+    """Запросы внутри блока идут в фоновой полосе, например рассылка"""
+    token = send_priority.set(BULK)
+    try:
+        yield
+    finally:
+        send_priority.reset(token)
+
+
+class LaneStats:
+    """Счетчики ожидания одной полосы"""
+
+    __slots__ = ("sent", "delayed", "wait_total", "wait_max")
+
+    def __init__(self):
+        self.sent = 0
+        self.delayed = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def add(self, wait: float):
+        self.sent += 1
+        if wait > 0.001:
+            self.delayed += 1
+        self.wait_total += wait
+        self.wait_max = max(self.wait_max, wait)
+
+    def as_dict(self) -> dict:
+        return {
+            "sent": self.sent,
+            "delayed": self.delayed,
+            "avg_wait_ms": (
+                round(self.wait_total / self.sent * 1000, 2) if self.sent else 0
+            ),
+            "max_wait_ms": round(self.wait_max * 1000, 2),
+        }
+
+
+class FloodControl(BaseRequestMiddleware):
+    """Ограничение исходящих сообщений по лимитам Telegram.
+
+    Общий токен-бакет на global_rate запросов в секунду и отдельный бакет на
+    каждый чат: private_rate в секунду для личных чатов и group_per_minute в
+    минуту для групп. Свободный общий токен достается сначала интерактивным
+    ответам, потом рассылке. На TelegramRetryAfter чат ставится на паузу, и
+    запрос повторяется до max_retries раз.
+    """
+
+    def __init__(
+        self,
+        global_rate: float = 30,
+        private_rate: float = 1,
+        group_per_minute: float = 20,
+        burst: int = 3,
+        max_retries: int = 3,
+        max_chats: int = 100000,
+    ):
+        self.global_rate = global_rate
+        self.private_interval = 1 / private_rate
+        self.group_interval = 60 / group_per_minute
+        self.burst = burst
+        self.max_retries = max_retries
+        self.max_chats = max_chats
+        self.retry_after = 0
+        self.waiting = 0
+        self.lanes = {lane: LaneStats() for lane in LANES}
+        self._tokens = float(global_rate)
+        self._refilled = time.monotonic()
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._order = itertools.count()
+        self._pump: Optional[asyncio.Task] = None
+        # Для каждого чата время, с которого бакет снова полон (GCRA)
+        self._chats: Dict[object, float] = {}
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        chat_id = getattr(method, "chat_id", None)
+        # Ответы на колбэки, inline-запросы и служебные методы не лимитируем
+        if chat_id is None:
+            return await make_request(bot, method)
+
+        lane = send_priority.get()
+        for attempt in range(self.max_retries + 1):
+            await self.acquire(chat_id, lane)
+            try:
+                return await make_request(bot, method)
+            except TelegramRetryAfter as e:
+                if attempt == self.max_retries:
+                    raise
+                self.retry_after += 1
+                logger.warning(
+                    f"Флуд-контроль Telegram для чата {chat_id}: "
+                    f"пауза {e.retry_after} с, попытка {attempt + 1}"
+                )
+                self._pause(chat_id, e.retry_after)
+
+    def _interval(self, chat_id) -> float:
+        # У групп и каналов отрицательный id или @username
+        if isinstance(chat_id, int) and chat_id > 0:
+            return self.private_interval
+        return self.group_interval
+
+    def _reserve(self, chat_id) -> float:
+        """Занимаем место в бакете чата, возвращаем сколько ждать"""
+        now = time.monotonic()
+        interval = self._interval(chat_id)
+        tat = max(self._chats.get(chat_id, now), now)
+        start = max(now, tat - (self.burst - 1) * interval)
+        self._chats[chat_id] = tat + interval
+        if len(self._chats) > self.max_chats:
+            self._chats = {key: t for key, t in self._chats.items() if t > now}
+        return start - now
+
+    def _pause(self, chat_id, seconds: float):
+        interval = self._interval(chat_id)
+        self._chats[chat_id] = time.monotonic() + seconds + (self.burst - 1) * interval
+
+    async def acquire(self, chat_id, lane: int = INTERACTIVE):
+        """Ждем места в бакете чата, затем общий токен в порядке приоритета"""
+        started = time.monotonic()
+        self.waiting += 1
+        try:
+            wait = self._reserve(chat_id)
+            if wait > 0:
+                await asyncio.sleep(wait)
+            if self._waiters or not self._take():
+                future = asyncio.get_running_loop().create_future()
+                heapq.heappush(self._waiters, (lane, next(self._order), future))
+                if self._pump is None or self._pump.done():
+                    self._pump = asyncio.create_task(self._run_pump())
+                await future
+        finally:
+            self.waiting -= 1
+        self.lanes[lane].add(time.monotonic() - started)
+
+    def _take(self) -> bool:
+        now = time.monotonic()
+        self._tokens = min(
+            float(self.global_rate),
+            self._tokens + (now - self._refilled) * self.global_rate,
+        )
+        self._refilled = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return True
+        return False
+
+    async def _run_pump(self):
+        """Раздаем общие токены ожидающим по мере пополнения бакета"""
+        while self._waiters:
+            if not self._take():
+                await asyncio.sleep((1 - self._tokens) / self.global_rate)
+                continue
+            while self._waiters:
+                _, _, future = heapq.heappop(self._waiters)
+                # Отмененный запрос токен не тратит
+                if not future.done():
+                    future.set_result(None)
+                    break
+            else:
+                self._tokens += 1
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": self.waiting,
+            "global_waiters": len(self._waiters),
+            "tracked_chats": len(self._chats),
+            "retry_after": self.retry_after,
+            **{name: self.lanes[lane].as_dict() for lane, name in LANES.items()},
+        }
@@ -0,0 +1,229 @@
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+
+logger = logging.getLogger(__name__)
+
+
+class FSMRecord:
+    """Состояние и данные FSM одного ключа"""
+
+    __slots__ = ("state", "data", "updated")
+
+    def __init__(
+        self,
+        state: Optional[str] = None,
+        data: Optional[Dict[str, Any]] = None,
+        updated: float = 0,
+    ):
+        self.state = state
+        self.data = data or {}
+        self.updated = updated
+
+    def is_empty(self) -> bool:
+        return self.state is None and not self.data
+
+
+class SQLiteStorage(BaseStorage):
+    """Хранилище FSM в таблице fsm_states нашей базы.
+
+    Перед базой стоит LRU на cache_size ключей, изменения копятся в буфере
+    и пишутся одной транзакцией раз в flush_interval секунд. Состояния, не
+    менявшиеся дольше ttl секунд, считаются брошенными и удаляются.
+    """
+
+    def __init__(
+        self,
+        db,
+        cache_size: int = 10000,
+        ttl: float = 86400,
+        flush_interval: float = 1.0,
+        sweep_interval: float = 600,
+    ):
+        self.db = db
+        self.cache_size = cache_size
+        self.ttl = ttl
+        self.flush_interval = flush_interval
+        self.sweep_interval = sweep_interval
+        self.hits = 0
+        self.misses = 0
+        self.flushes = 0
+        self.flushed_keys = 0
+        self.expired = 0
+        self._cache: "OrderedDict[str, FSMRecord]" = OrderedDict()
+        # Измененные, но еще не записанные ключи; из LRU они могут уйти раньше
+        self._pending: Dict[str, FSMRecord] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._last_sweep = 0.0
+
+    @staticmethod
+    def _key(key: StorageKey) -> str:
+        return ":".join(
+            str(part) if part is not None else ""
+            for part in (
+                key.bot_id,
+                key.chat_id,
+                key.user_id,
+                key.thread_id,
+                key.business_connection_id,
+                key.destiny,
+            )
+        )
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        """Останавливаем фоновую запись и сбрасываем буфер"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+                if time.time() - self._last_sweep >= self.sweep_interval:
+                    await self.sweep()
+            except Exception as e:
+                logger.error(f"Ошибка записи состояний FSM: {e}")
+
+    def _expired(self, record: FSMRecord) -> bool:
+        return not record.is_empty() and record.updated < time.time() - self.ttl
+
+    def _remember(self, key: str, record: FSMRecord):
+        self._cache[key] = record
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    async def _record(self, key: str) -> FSMRecord:
+        record = self._cache.get(key)
+        if record is not None:
+            self.hits += 1
+            self._cache.move_to_end(key)
+        else:
+            self.misses += 1
+            record = self._pending.get(key) or await self._load(key)
+            # Пока читали, ключ мог записать другой апдейт
+            record = self._cache.get(key) or record
+            self._remember(key, record)
+
+        if self._expired(record):
+            self.expired += 1
+            record.state, record.data = None, {}
+            self._pending[key] = record
+        return record
+
+    async def _load(self, key: str) -> FSMRecord:
+        async with self.db.pool.reader() as conn:
+            async with conn.execute(
+                "SELECT state, data, updated_at FROM fsm_states WHERE key = ?", (key,)
+            ) as cursor:
+                row = await cursor.fetchone()
+        if row is None:
+            return FSMRecord()
+        return FSMRecord(row["state"], json.loads(row["data"]), row["updated_at"])
+
+    def _changed(self, key: str, record: FSMRecord):
+        record.updated = time.time()
+        self._pending[key] = record
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        storage_key = self._key(key)
+        record = await self._record(storage_key)
+        record.state = state.state if isinstance(state, State) else state
+        self._changed(storage_key, record)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        return (await self._record(self._key(key))).state
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        storage_key = self._key(key)
+        record = await self._record(storage_key)
+        record.data = data.copy()
+        self._changed(storage_key, record)
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        return (await self._record(self._key(key))).data.copy()
+
+    async def flush(self) -> int:
+        """Пишем накопленные изменения одной транзакцией"""
+        if not self._pending:
+            return 0
+        pending, self._pending = self._pending, {}
+
+        rows, empty = [], []
+        for key, record in pending.items():
+            if record.is_empty():
+                empty.append((key,))
+                continue
+            try:
+                data = json.dumps(record.data, ensure_ascii=False)
+            except (TypeError, ValueError) as e:
+                logger.error(f"Данные FSM {key} не сериализуются в JSON: {e}")
+                continue
+            rows.append((key, record.state, data, record.updated))
+
+        async def op(conn):
+            if empty:
+                await conn.executemany("DELETE FROM fsm_states WHERE key = ?", empty)
+            if rows:
+                await conn.executemany(
+                    "INSERT INTO fsm_states (key, state, data, updated_at) "
+                    "VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT (key) DO UPDATE SET state = excluded.state, "
+                    "data = excluded.data, updated_at = excluded.updated_at",
+                    rows,
+                )
+
+        try:
+            await self.db._write(op)
+        except Exception:
+            # Более свежие изменения, пришедшие во время записи, не затираем
+            for key, record in pending.items():
+                self._pending.setdefault(key, record)
+            raise
+        self.flushes += 1
+        self.flushed_keys += len(pending)
+        return len(pending)
+
+    async def sweep(self) -> int:
+        """Удаляем из базы состояния, брошенные дольше ttl секунд"""
+        self._last_sweep = time.time()
+        rows = await self.db._execute(
+            "DELETE FROM fsm_states WHERE updated_at < ? RETURNING key",
+            (self._last_sweep - self.ttl,),
+        )
+        for (key,) in rows:
+            record = self._cache.get(key)
+            if record is not None and self._expired(record):
+                del self._cache[key]
+        self.expired += len(rows)
+        return len(rows)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._cache),
+            "pending": len(self._pending),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0,
+            "flushes": self.flushes,
+            "flushed_keys": self.flushed_keys,
+            "expired": self.expired,
+        }
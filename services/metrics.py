@@ -0,0 +1,313 @@
+import bisect
+import time
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import (
+    BaseRequestMiddleware,
+    NextRequestMiddlewareType,
+)
+from aiogram.methods import TelegramMethod
+from aiogram.methods.base import Response, TelegramType
+from aiohttp import web
+
+PREFIX = "vpbot"
+
+# Границы корзин задержек в секундах, как у клиентов Prometheus по умолчанию
+LATENCY_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+
+class Histogram:
+    """Гистограмма с фиксированными корзинами: observe — O(log корзин), без списков"""
+
+    __slots__ = ("buckets", "counts", "count", "sum")
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        # Последняя корзина — все, что больше верхней границы
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def merge(self, other: "Histogram"):
+        for index, count in enumerate(other.counts):
+            self.counts[index] += count
+        self.count += other.count
+        self.sum += other.sum
+
+    def percentile(self, q: float) -> float:
+        """Верхняя граница корзины, в которую попал перцентиль q (от 0 до 100)"""
+        if not self.count:
+            return 0.0
+        rank = q / 100 * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                if index < len(self.buckets):
+                    return self.buckets[index]
+                return float("inf")
+        return float("inf")
+
+    def as_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "avg": self.sum / self.count if self.count else 0.0,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+        }
+
+
+class UpdateTiming:
+    """Время в базе и в Bot API, набранное одним обработчиком"""
+
+    __slots__ = ("db", "api")
+
+    def __init__(self):
+        self.db = 0.0
+        self.api = 0.0
+
+
+current_timing: ContextVar[Optional[UpdateTiming]] = ContextVar(
+    "current_timing", default=None
+)
+
+
+class HandlerStats:
+    """Счетчики одного обработчика"""
+
+    __slots__ = ("router", "name", "count", "errors", "latency", "db", "api")
+
+    def __init__(self, router: str, name: str):
+        self.router = router
+        self.name = name
+        self.count = 0
+        self.errors = 0
+        self.latency = Histogram()
+        self.db = 0.0
+        self.api = 0.0
+
+    def labels(self) -> dict:
+        if not self.name:
+            return {"router": self.router}
+        return {"router": self.router, "handler": self.name}
+
+
+class Metrics:
+    """Метрики процесса и их выдача в текстовом формате Prometheus"""
+
+    def __init__(self):
+        self.handlers: Dict[Callable, HandlerStats] = {}
+        self.db = {"read": Histogram(), "write": Histogram()}
+        self.api: Dict[str, Histogram] = {}
+        self.api_errors: Dict[str, int] = {}
+        self._gauges: List[Tuple[str, Callable[[], dict]]] = []
+        self._histograms: List[Tuple[str, str, Callable[[], Dict[str, Histogram]]]] = []
+
+    def handler(self, callback: Callable) -> HandlerStats:
+        stats = self.handlers.get(callback)
+        if stats is None:
+            # handlers.cart.change_quantity: роутер — модуль обработчика
+            router = callback.__module__.rpartition(".")[2]
+            stats = self.handlers[callback] = HandlerStats(router, callback.__name__)
+        return stats
+
+    def observe_db(self, kind: str, seconds: float):
+        self.db[kind].observe(seconds)
+        timing = current_timing.get()
+        if timing is not None:
+            timing.db += seconds
+
+    def observe_api(self, method: str, seconds: float, error: bool):
+        histogram = self.api.get(method)
+        if histogram is None:
+            histogram = self.api[method] = Histogram()
+        histogram.observe(seconds)
+        if error:
+            self.api_errors[method] = self.api_errors.get(method, 0) + 1
+        timing = current_timing.get()
+        if timing is not None:
+            timing.api += seconds
+
+    def gauges(self, name: str, stats: Callable[[], dict]):
+        """Числа из stats() компонента выдаем как gauge с префиксом name"""
+        self._gauges.append((name, stats))
+
+    def histograms(self, name: str, label: str, source: Callable[[], dict]):
+        """Гистограммы компонента: source() — {значение метки: Histogram}"""
+        self._histograms.append((name, label, source))
+
+    def routers(self) -> Dict[str, HandlerStats]:
+        """Счетчики обработчиков, сложенные по роутерам"""
+        routers: Dict[str, HandlerStats] = {}
+        for stats in self.handlers.values():
+            total = routers.get(stats.router)
+            if total is None:
+                total = routers[stats.router] = HandlerStats(stats.router, "")
+            total.count += stats.count
+            total.errors += stats.errors
+            total.db += stats.db
+            total.api += stats.api
+            total.latency.merge(stats.latency)
+        return routers
+
+    def render(self) -> str:
+        lines: List[str] = []
+        handlers = sorted(
+            self.handlers.values(), key=lambda stats: (stats.router, stats.name)
+        )
+        routers = sorted(self.routers().values(), key=lambda stats: stats.router)
+
+        for kind, rows in (("handler", handlers), ("router", routers)):
+            _histogram(
+                lines,
+                f"{PREFIX}_{kind}_seconds",
+                [(stats.labels(), stats.latency) for stats in rows],
+            )
+            for suffix, field in (
+                ("errors_total", "errors"),
+                ("db_seconds_total", "db"),
+                ("api_seconds_total", "api"),
+            ):
+                name = f"{PREFIX}_{kind}_{suffix}"
+                lines.append(f"# TYPE {name} counter")
+                for stats in rows:
+                    lines.append(_sample(name, stats.labels(), getattr(stats, field)))
+
+        _histogram(
+            lines,
+            f"{PREFIX}_db_seconds",
+            [({"kind": kind}, histogram) for kind, histogram in self.db.items()],
+        )
+        _histogram(
+            lines,
+            f"{PREFIX}_api_seconds",
+            [({"method": method}, h) for method, h in sorted(self.api.items())],
+        )
+        name = f"{PREFIX}_api_errors_total"
+        lines.append(f"# TYPE {name} counter")
+        for method, errors in sorted(self.api_errors.items()):
+            lines.append(_sample(name, {"method": method}, errors))
+
+        for name, label, source in self._histograms:
+            _histogram(
+                lines,
+                f"{PREFIX}_{name}",
+                [({label: key}, h) for key, h in source().items()],
+            )
+        for name, stats in self._gauges:
+            for key, value in _flatten(stats()):
+                metric = f"{PREFIX}_{name}_{key}"
+                lines.append(f"# TYPE {metric} gauge")
+                lines.append(_sample(metric, {}, value))
+        return "\n".join(lines) + "\n"
+
+
+def _sample(name: str, labels: Dict[str, Any], value: float) -> str:
+    if labels:
+        # Метки — имена модулей, функций и методов API, экранировать нечего
+        pairs = ",".join(f'{key}="{label}"' for key, label in labels.items())
+        return f"{name}{{{pairs}}} {value}"
+    return f"{name} {value}"
+
+
+def _histogram(lines: List[str], name: str, series: list):
+    lines.append(f"# TYPE {name} histogram")
+    for labels, histogram in series:
+        seen = 0
+        for bound, count in zip(histogram.buckets, histogram.counts):
+            seen += count
+            lines.append(_sample(f"{name}_bucket", {**labels, "le": bound}, seen))
+        lines.append(
+            _sample(f"{name}_bucket", {**labels, "le": "+Inf"}, histogram.count)
+        )
+        lines.append(_sample(f"{name}_sum", labels, histogram.sum))
+        lines.append(_sample(f"{name}_count", labels, histogram.count))
+
+
+def _flatten(stats: dict, prefix: str = ""):
+    """Числовые значения вложенного словаря: (ключ_через_подчеркивание, число)"""
+    for key, value in stats.items():
+        key = f"{prefix}{key}"
+        if isinstance(value, dict):
+            yield from _flatten(value, f"{key}_")
+        elif isinstance(value, bool):
+            yield key, int(value)
+        elif isinstance(value, (int, float)):
+            yield key, value
+
+
+metrics = Metrics()
+
+
+class ApiMetrics(BaseRequestMiddleware):
+    """Время запросов к Bot API по методам, с ожиданием лимитов"""
+
+    def __init__(self, registry: Metrics = metrics):
+        self.registry = registry
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        started = time.perf_counter()
+        # Ошибки Bot API сессия поднимает исключениями
+        error = True
+        try:
+            result = await make_request(bot, method)
+            error = False
+            return result
+        finally:
+            self.registry.observe_api(
+                type(method).__name__, time.perf_counter() - started, error
+            )
+
+
+class MetricsServer:
+    """Локальный HTTP-сервер с /metrics для Prometheus"""
+
+    def __init__(self, host: str, port: int, registry: Metrics = metrics):
+        self.host = host
+        self.port = port
+        self.registry = registry
+        self._runner: Optional[web.AppRunner] = None
+
+    async def handle(self, request: web.Request) -> web.Response:
+        return web.Response(
+            text=self.registry.render(), content_type="text/plain", charset="utf-8"
+        )
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get("/metrics", self.handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
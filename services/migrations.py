@@ -0,0 +1,408 @@
+import logging
+
+from services.pool import ConnectionPool
+
+logger = logging.getLogger(__name__)
+
+# Ключ order_stats: статус заказа, NULL сводим к пустой строке
+ORDER_STATUS = "COALESCE({row}.status, '')"
+
+# Полный пересчет order_stats, используется миграцией и Database.rebuild_stats
+REBUILD_ORDER_STATS = """
+INSERT INTO order_stats (status, orders, revenue)
+SELECT COALESCE(status, ''), COUNT(*), COALESCE(SUM(total_amount), 0)
+FROM orders
+GROUP BY COALESCE(status, '');
+"""
+
+# Полный пересчет срезов продаж (время в UTC, как created_at). Отдельными
+# запросами: executescript в транзакции писателя сделал бы COMMIT
+REBUILD_SALES_ROLLUPS = (
+    """
+    INSERT INTO sales_hourly (hour, orders, revenue, quantity)
+    SELECT strftime('%Y-%m-%d %H:00', o.created_at), COUNT(*), SUM(o.total_amount),
+           COALESCE(SUM((SELECT SUM(quantity) FROM order_items WHERE order_id = o.order_id)), 0)
+    FROM orders o
+    GROUP BY 1
+    """,
+    """
+    INSERT INTO sales_daily (day, orders, revenue, quantity)
+    SELECT substr(hour, 1, 10), SUM(orders), SUM(revenue), SUM(quantity)
+    FROM sales_hourly
+    GROUP BY 1
+    """,
+    """
+    INSERT INTO dish_sales_daily (day, dish_id, category_id, orders, quantity, revenue)
+    SELECT date(o.created_at), oi.dish_id, d.category_id,
+           COUNT(*), SUM(oi.quantity), SUM(oi.quantity * oi.price)
+    FROM order_items oi
+    JOIN orders o ON o.order_id = oi.order_id
+    LEFT JOIN dishes d ON d.dish_id = oi.dish_id
+    GROUP BY 1, 2
+    """,
+)
+SALES_ROLLUP_TABLES = ("sales_hourly", "sales_daily", "dish_sales_daily")
+_SALES_ROLLUPS_SCRIPT = ";\n".join(REBUILD_SALES_ROLLUPS) + ";"
+
+# Полный пересчет числа отзывов по дням и оценкам
+REBUILD_FEEDBACK_DAILY = """
+INSERT INTO feedback_daily (day, rating, reviews)
+SELECT date(created_at), rating, COUNT(*)
+FROM feedback
+GROUP BY 1, 2
+"""
+
+# Миграции применяются по порядку, номер версии хранится в PRAGMA user_version.
+# Уже выпущенные миграции не меняем: новые изменения схемы только дописываем.
+MIGRATIONS = [
+    (
+        1,
+        "Базовая схема",
+        """
+        CREATE TABLE IF NOT EXISTS categories (
+            category_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL UNIQUE
+        );
+
+        CREATE TABLE IF NOT EXISTS dishes (
+            dish_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            description TEXT,
+            price REAL NOT NULL,
+            category_id INTEGER,
+            FOREIGN KEY (category_id) REFERENCES categories(category_id)
+        );
+
+        CREATE TABLE IF NOT EXISTS users (
+            user_id INTEGER PRIMARY KEY,
+            username TEXT,
+            full_name TEXT,
+            phone TEXT,
+            registration_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            profile_photo TEXT
+        );
+
+        CREATE TABLE IF NOT EXISTS orders (
+            order_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            total_amount REAL NOT NULL,
+            delivery_type TEXT NOT NULL,
+            address TEXT,
+            phone TEXT NOT NULL,
+            status TEXT DEFAULT 'new',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users(user_id)
+        );
+
+        CREATE TABLE IF NOT EXISTS order_items (
+            item_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            order_id INTEGER NOT NULL,
+            dish_id INTEGER NOT NULL,
+            quantity INTEGER NOT NULL,
+            price REAL NOT NULL,
+            FOREIGN KEY (order_id) REFERENCES orders(order_id),
+            FOREIGN KEY (dish_id) REFERENCES dishes(dish_id)
+        );
+
+        CREATE TABLE IF NOT EXISTS feedback (
+            feedback_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            order_id INTEGER,
+            rating INTEGER NOT NULL,
+            comment TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users(user_id),
+            FOREIGN KEY (order_id) REFERENCES orders(order_id)
+        );
+
+        CREATE TABLE IF NOT EXISTS cart (
+            cart_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            dish_id INTEGER NOT NULL,
+            name TEXT NOT NULL,
+            price REAL NOT NULL,
+            quantity INTEGER DEFAULT 1,
+            added_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users(user_id),
+            FOREIGN KEY (dish_id) REFERENCES dishes(dish_id)
+        );
+        """,
+    ),
+    (
+        2,
+        "UNIQUE(user_id, dish_id) для корзины",
+        """
+        -- cart_items никогда не заполнялась и ссылается на cart
+        DROP TABLE IF EXISTS cart_items;
+
+        CREATE TABLE cart_new (
+            cart_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            dish_id INTEGER NOT NULL,
+            name TEXT NOT NULL,
+            price REAL NOT NULL,
+            quantity INTEGER DEFAULT 1,
+            added_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE (user_id, dish_id),
+            FOREIGN KEY (user_id) REFERENCES users(user_id),
+            FOREIGN KEY (dish_id) REFERENCES dishes(dish_id)
+        );
+
+        -- Дубликаты, накопленные INSERT OR REPLACE без ограничения, сливаем
+        INSERT INTO cart_new (cart_id, user_id, dish_id, name, price, quantity, added_at)
+        SELECT MIN(cart_id), user_id, dish_id, MAX(name), MAX(price),
+               SUM(quantity), MIN(added_at)
+        FROM cart
+        GROUP BY user_id, dish_id;
+
+        DROP TABLE cart;
+        ALTER TABLE cart_new RENAME TO cart;
+        """,
+    ),
+    (
+        3,
+        "Индексы для частых запросов",
+        """
+        CREATE INDEX IF NOT EXISTS idx_orders_user_created
+            ON orders (user_id, created_at);
+        CREATE INDEX IF NOT EXISTS idx_orders_created ON orders (created_at);
+        CREATE INDEX IF NOT EXISTS idx_order_items_order ON order_items (order_id);
+        CREATE INDEX IF NOT EXISTS idx_feedback_user_created
+            ON feedback (user_id, created_at);
+        CREATE INDEX IF NOT EXISTS idx_feedback_order ON feedback (order_id);
+        CREATE INDEX IF NOT EXISTS idx_dishes_category ON dishes (category_id);
+        """,
+    ),
+    (
+        4,
+        "Агрегаты заказов по статусам, поддерживаемые триггерами",
+        f"""
+        CREATE TABLE IF NOT EXISTS order_stats (
+            status TEXT PRIMARY KEY,
+            orders INTEGER NOT NULL DEFAULT 0,
+            revenue REAL NOT NULL DEFAULT 0
+        );
+
+        -- Триггеры срабатывают в транзакции изменения заказа, поэтому
+        -- агрегаты не расходятся с orders ни при каком пути записи
+        CREATE TRIGGER IF NOT EXISTS trg_order_stats_insert
+        AFTER INSERT ON orders
+        BEGIN
+            INSERT INTO order_stats (status, orders, revenue)
+            VALUES ({ORDER_STATUS.format(row="NEW")}, 1, NEW.total_amount)
+            ON CONFLICT (status) DO UPDATE SET
+                orders = orders + 1,
+                revenue = revenue + excluded.revenue;
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_order_stats_delete
+        AFTER DELETE ON orders
+        BEGIN
+            UPDATE order_stats
+            SET orders = orders - 1, revenue = revenue - OLD.total_amount
+            WHERE status = {ORDER_STATUS.format(row="OLD")};
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_order_stats_update
+        AFTER UPDATE OF status, total_amount ON orders
+        BEGIN
+            UPDATE order_stats
+            SET orders = orders - 1, revenue = revenue - OLD.total_amount
+            WHERE status = {ORDER_STATUS.format(row="OLD")};
+            INSERT INTO order_stats (status, orders, revenue)
+            VALUES ({ORDER_STATUS.format(row="NEW")}, 1, NEW.total_amount)
+            ON CONFLICT (status) DO UPDATE SET
+                orders = orders + 1,
+                revenue = revenue + excluded.revenue;
+        END;
+
+        DELETE FROM order_stats;
+        {REBUILD_ORDER_STATS}
+        """,
+    ),
+    (
+        5,
+        "Срезы продаж по часам, дням и блюдам",
+        f"""
+        CREATE TABLE IF NOT EXISTS sales_hourly (
+            hour TEXT PRIMARY KEY,
+            orders INTEGER NOT NULL DEFAULT 0,
+            revenue REAL NOT NULL DEFAULT 0,
+            quantity INTEGER NOT NULL DEFAULT 0
+        );
+
+        CREATE TABLE IF NOT EXISTS sales_daily (
+            day TEXT PRIMARY KEY,
+            orders INTEGER NOT NULL DEFAULT 0,
+            revenue REAL NOT NULL DEFAULT 0,
+            quantity INTEGER NOT NULL DEFAULT 0
+        );
+
+        -- Категория запоминается на момент продажи
+        CREATE TABLE IF NOT EXISTS dish_sales_daily (
+            day TEXT NOT NULL,
+            dish_id INTEGER NOT NULL,
+            category_id INTEGER,
+            orders INTEGER NOT NULL DEFAULT 0,
+            quantity INTEGER NOT NULL DEFAULT 0,
+            revenue REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, dish_id)
+        );
+
+        CREATE TRIGGER IF NOT EXISTS trg_sales_order_insert
+        AFTER INSERT ON orders
+        BEGIN
+            INSERT INTO sales_hourly (hour, orders, revenue)
+            VALUES (strftime('%Y-%m-%d %H:00', NEW.created_at), 1, NEW.total_amount)
+            ON CONFLICT (hour) DO UPDATE SET
+                orders = orders + 1,
+                revenue = revenue + excluded.revenue;
+            INSERT INTO sales_daily (day, orders, revenue)
+            VALUES (date(NEW.created_at), 1, NEW.total_amount)
+            ON CONFLICT (day) DO UPDATE SET
+                orders = orders + 1,
+                revenue = revenue + excluded.revenue;
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_sales_item_insert
+        AFTER INSERT ON order_items
+        BEGIN
+            UPDATE sales_hourly SET quantity = quantity + NEW.quantity
+            WHERE hour = (
+                SELECT strftime('%Y-%m-%d %H:00', created_at)
+                FROM orders WHERE order_id = NEW.order_id
+            );
+            UPDATE sales_daily SET quantity = quantity + NEW.quantity
+            WHERE day = (SELECT date(created_at) FROM orders WHERE order_id = NEW.order_id);
+            INSERT INTO dish_sales_daily
+                (day, dish_id, category_id, orders, quantity, revenue)
+            VALUES (
+                (SELECT date(created_at) FROM orders WHERE order_id = NEW.order_id),
+                NEW.dish_id,
+                (SELECT category_id FROM dishes WHERE dish_id = NEW.dish_id),
+                1,
+                NEW.quantity,
+                NEW.quantity * NEW.price
+            )
+            ON CONFLICT (day, dish_id) DO UPDATE SET
+                orders = orders + 1,
+                quantity = quantity + excluded.quantity,
+                revenue = revenue + excluded.revenue;
+        END;
+
+        {_SALES_ROLLUPS_SCRIPT}
+        """,
+    ),
+    (
+        6,
+        "Индексы для постраничного просмотра",
+        """
+        CREATE INDEX IF NOT EXISTS idx_users_registration
+            ON users (registration_date);
+        CREATE INDEX IF NOT EXISTS idx_feedback_created ON feedback (created_at);
+        """,
+    ),
+    (
+        7,
+        "Отзывы по дням и оценкам, индекс для фильтра по оценке",
+        f"""
+        CREATE INDEX IF NOT EXISTS idx_feedback_rating_created
+            ON feedback (rating, created_at);
+
+        CREATE TABLE IF NOT EXISTS feedback_daily (
+            day TEXT NOT NULL,
+            rating INTEGER NOT NULL,
+            reviews INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, rating)
+        );
+
+        CREATE TRIGGER IF NOT EXISTS trg_feedback_daily_insert
+        AFTER INSERT ON feedback
+        BEGIN
+            INSERT INTO feedback_daily (day, rating, reviews)
+            VALUES (date(NEW.created_at), NEW.rating, 1)
+            ON CONFLICT (day, rating) DO UPDATE SET reviews = reviews + 1;
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_feedback_daily_delete
+        AFTER DELETE ON feedback
+        BEGIN
+            UPDATE feedback_daily SET reviews = reviews - 1
+            WHERE day = date(OLD.created_at) AND rating = OLD.rating;
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_feedback_daily_update
+        AFTER UPDATE OF rating, created_at ON feedback
+        BEGIN
+            UPDATE feedback_daily SET reviews = reviews - 1
+            WHERE day = date(OLD.created_at) AND rating = OLD.rating;
+            INSERT INTO feedback_daily (day, rating, reviews)
+            VALUES (date(NEW.created_at), NEW.rating, 1)
+            ON CONFLICT (day, rating) DO UPDATE SET reviews = reviews + 1;
+        END;
+
+        {REBUILD_FEEDBACK_DAILY};
+        """,
+    ),
+    (
+        8,
+        "Хранилище состояний FSM",
+        """
+        CREATE TABLE IF NOT EXISTS fsm_states (
+            key TEXT PRIMARY KEY,
+            state TEXT,
+            data TEXT NOT NULL DEFAULT '{}',
+            updated_at REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_fsm_states_updated ON fsm_states (updated_at);
+        """,
+    ),
+    (
+        9,
+        "Отложенные задачи планировщика",
+        """
+        CREATE TABLE IF NOT EXISTS jobs (
+            job_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind TEXT NOT NULL,
+            run_at REAL NOT NULL,
+            payload TEXT NOT NULL DEFAULT '{}',
+            attempts INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE INDEX IF NOT EXISTS idx_jobs_run_at ON jobs (run_at);
+        """,
+    ),
+    (
+        10,
+        "Аренда задач планировщика",
+        """
+        ALTER TABLE jobs ADD COLUMN locked_until REAL;
+        """,
+    ),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+async def migrate(pool: ConnectionPool) -> int:
+    """Применяем недостающие миграции и возвращаем итоговую версию схемы"""
+    conn = pool.writer
+    async with conn.execute("PRAGMA user_version") as cursor:
+        current = (await cursor.fetchone())[0]
+
+    for version, description, script in MIGRATIONS:
+        if version <= current:
+            continue
+        try:
+            # Каждая миграция вместе с номером версии применяется атомарно
+            await pool.executescript(
+                f"BEGIN IMMEDIATE;\n{script}\nPRAGMA user_version = {version};\nCOMMIT;"
+            )
+        except Exception as e:
+            if conn.in_transaction:
+                await conn.execute("ROLLBACK")
+            logger.error(f"Ошибка миграции {version} ({description}): {e}")
+            raise
+        logger.info(f"Применена миграция {version}: {description}")
+        current = version
+
+    return current
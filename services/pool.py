@@ -0,0 +1,118 @@
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import List, Optional, Union
+
+import aiosqlite
+
+from services.metrics import metrics
+from services.profiler import ProfiledConnection, QueryProfiler
+
+logger = logging.getLogger(__name__)
+
+
+class ConnectionPool:
+    """Пул соединений SQLite: один писатель и N читателей в режиме WAL"""
+
+    def __init__(
+        self,
+        db_path: Union[str, Path],
+        readers: int = 4,
+        busy_timeout: int = 5000,
+        synchronous: str = "NORMAL",
+        profiler: Optional[QueryProfiler] = None,
+    ):
+        self.db_path = Path(db_path)
+        self.readers_count = readers
+        self.busy_timeout = busy_timeout
+        self.synchronous = synchronous
+        self.profiler = profiler
+        self.writer: Optional[aiosqlite.Connection] = None
+        self._readers: List[aiosqlite.Connection] = []
+        self._idle: Optional[asyncio.Queue] = None
+        self._write_lock = asyncio.Lock()
+
+    async def open(self):
+        """Открываем писателя и читателей"""
+        self.writer = await self._open_connection()
+        # WAL позволяет читателям работать параллельно с писателем
+        async with self.writer.execute("PRAGMA journal_mode = WAL") as cursor:
+            mode = (await cursor.fetchone())[0]
+        if mode != "wal":
+            logger.warning(f"Не удалось включить WAL, режим журнала: {mode}")
+        await self.writer.execute(f"PRAGMA synchronous = {self.synchronous}")
+
+        self._idle = asyncio.Queue()
+        for _ in range(self.readers_count):
+            conn = await self._open_connection()
+            await conn.execute("PRAGMA query_only = ON")
+            self._readers.append(conn)
+            self._idle.put_nowait(conn)
+
+        logger.info(
+            f"Пул соединений открыт: 1 писатель, {self.readers_count} читателей"
+        )
+        return self
+
+    async def _open_connection(self) -> aiosqlite.Connection:
+        # isolation_level=None: транзакциями управляем сами через BEGIN/COMMIT
+        conn = await aiosqlite.connect(
+            self.db_path, timeout=self.busy_timeout / 1000, isolation_level=None
+        )
+        conn.row_factory = aiosqlite.Row
+        await conn.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout)}")
+        await conn.execute("PRAGMA foreign_keys = ON")
+        if self.profiler:
+            return ProfiledConnection(conn, self.profiler)
+        return conn
+
+    @asynccontextmanager
+    async def reader(self):
+        """Выдаем свободное соединение для чтения"""
+        started = time.perf_counter()
+        if not self._readers:
+            # Без читателей все запросы идут через писателя, как раньше. Замок
+            # не дает читать посреди чужой транзакции и видеть ее до COMMIT
+            try:
+                async with self._write_lock:
+                    yield self.writer
+            finally:
+                metrics.observe_db("read", time.perf_counter() - started)
+            return
+
+        conn = await self._idle.get()
+        try:
+            yield conn
+        finally:
+            self._idle.put_nowait(conn)
+            # Ожидание свободного читателя тоже время обработчика в базе
+            metrics.observe_db("read", time.perf_counter() - started)
+
+    @asynccontextmanager
+    async def transaction(self):
+        """Эксклюзивная транзакция на соединении писателя"""
+        async with self._write_lock:
+            await self.writer.execute("BEGIN IMMEDIATE")
+            try:
+                yield self.writer
+            except BaseException:
+                await self.writer.execute("ROLLBACK")
+                raise
+            else:
+                await self.writer.execute("COMMIT")
+
+    async def executescript(self, script: str):
+        """Выполняем DDL-скрипт на соединении писателя"""
+        async with self._write_lock:
+            await self.writer.executescript(script)
+
+    async def close(self):
+        """Закрываем все соединения пула"""
+        for conn in self._readers:
+            await conn.close()
+        self._readers.clear()
+        if self.writer:
+            await self.writer.close()
+            self.writer = None
@@ -0,0 +1,207 @@
+import logging
+import re
+import time
+from collections import deque
+from contextvars import ContextVar
+from typing import Any, Dict, Iterable, List, Optional
+
+import aiosqlite
+from aiosqlite.context import contextmanager
+
+logger = logging.getLogger(__name__)
+
+_SPACES = re.compile(r"\s+")
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_LISTS = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+# Нормализованные тексты: запросы в коде почти все постоянные строки
+SHAPE_CACHE_SIZE = 5000
+
+
+def normalize(sql: str) -> str:
+    """Форма запроса: без литералов, лишних пробелов и длины списков IN"""
+    shape = _SPACES.sub(" ", sql).strip()
+    shape = _LITERALS.sub("?", shape)
+    return _LISTS.sub("(?, ...)", shape)
+
+
+class Statement:
+    """Один выполненный запрос: время и строки растут по мере fetch"""
+
+    __slots__ = ("shape", "duration", "rows")
+
+    def __init__(self, shape: str, duration: float, rows: int):
+        self.shape = shape
+        self.duration = duration
+        self.rows = rows
+
+
+class ShapeStats:
+    """Сводка по форме запроса за все время профилирования"""
+
+    __slots__ = ("count", "total", "max", "rows")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.rows = 0
+
+
+class UpdateProfile:
+    """Запросы, выполненные при обработке одного апдейта"""
+
+    __slots__ = ("label", "statements")
+
+    def __init__(self, label: str):
+        self.label = label
+        self.statements: List[Statement] = []
+
+
+current_profile: ContextVar[Optional[UpdateProfile]] = ContextVar(
+    "current_profile", default=None
+)
+
+
+class QueryProfiler:
+    """Профиль SQL-запросов Database: формы запросов и поиск N+1.
+
+    Включается DB_PROFILE=1: пул отдает ProfiledConnection, и каждый
+    execute попадает сюда. Апдейт, выполнивший одну форму запроса больше
+    repeat раз, попадает в flagged и в лог.
+    """
+
+    def __init__(self, repeat: int = 5, keep: int = 100):
+        self.repeat = repeat
+        self.shapes: Dict[str, ShapeStats] = {}
+        self.flagged = deque(maxlen=keep)
+        self.updates = 0
+        self._normalized: Dict[str, str] = {}
+
+    def shape(self, sql: str) -> str:
+        shape = self._normalized.get(sql)
+        if shape is None:
+            if len(self._normalized) >= SHAPE_CACHE_SIZE:
+                self._normalized.clear()
+            shape = self._normalized[sql] = normalize(sql)
+        return shape
+
+    def record(self, sql: str, duration: float, rows: int) -> Statement:
+        statement = Statement(self.shape(sql), duration, rows)
+        stats = self.shapes.get(statement.shape)
+        if stats is None:
+            stats = self.shapes[statement.shape] = ShapeStats()
+        stats.count += 1
+        stats.total += duration
+        stats.rows += rows
+        stats.max = max(stats.max, duration)
+        profile = current_profile.get()
+        if profile is not None:
+            profile.statements.append(statement)
+        return statement
+
+    def extend(self, statement: Statement, duration: float, rows: int):
+        """Досчитываем fetch к уже записанному запросу"""
+        statement.duration += duration
+        statement.rows += rows
+        stats = self.shapes[statement.shape]
+        stats.total += duration
+        stats.rows += rows
+        stats.max = max(stats.max, statement.duration)
+
+    def finish(self, profile: UpdateProfile):
+        """Ищем в запросах апдейта формы, повторенные больше repeat раз"""
+        self.updates += 1
+        counts: Dict[str, List[Statement]] = {}
+        for statement in profile.statements:
+            counts.setdefault(statement.shape, []).append(statement)
+        for shape, statements in counts.items():
+            if len(statements) > self.repeat:
+                total = sum(statement.duration for statement in statements)
+                self.flagged.append((profile.label, shape, len(statements), total))
+                logger.warning(
+                    f"N+1 в апдейте {profile.label}: {len(statements)} раз "
+                    f"за {total * 1000:.1f} мс — {shape}"
+                )
+
+    def top(self, n: int = 10) -> list:
+        """Самые дорогие формы запросов по суммарному времени"""
+        return sorted(
+            self.shapes.items(), key=lambda item: item[1].total, reverse=True
+        )[:n]
+
+    def report(self, n: int = 10, width: int = 200) -> str:
+        lines = [f"Апдейтов: {self.updates}, форм запросов: {len(self.shapes)}"]
+        for shape, stats in self.top(n):
+            lines.append(
+                f"{stats.total * 1000:.1f} мс всего, {stats.count} раз, "
+                f"avg {stats.total / stats.count * 1000:.2f} мс, "
+                f"max {stats.max * 1000:.2f} мс, "
+                f"{stats.rows / stats.count:.1f} строк: {shape[:width]}"
+            )
+        if self.flagged:
+            lines.append("N+1:")
+            for label, shape, count, total in list(self.flagged)[-n:]:
+                lines.append(
+                    f"{label}: {count} раз, {total * 1000:.1f} мс: {shape[:width]}"
+                )
+        return "\n".join(lines)
+
+    def dump(self, n: int = 10):
+        logger.info(f"Профиль запросов:\n{self.report(n)}")
+
+
+class ProfiledCursor(aiosqlite.Cursor):
+    """Курсор, который досчитывает время и строки fetch к своему запросу"""
+
+    def __init__(self, conn, cursor, profiler: QueryProfiler, statement: Statement):
+        super().__init__(conn, cursor)
+        self._profiler = profiler
+        self._statement = statement
+
+    async def fetchone(self):
+        started = time.perf_counter()
+        row = await super().fetchone()
+        self._profiler.extend(
+            self._statement, time.perf_counter() - started, int(row is not None)
+        )
+        return row
+
+    async def fetchall(self):
+        started = time.perf_counter()
+        rows = await super().fetchall()
+        self._profiler.extend(self._statement, time.perf_counter() - started, len(rows))
+        return rows
+
+    async def fetchmany(self, size: Optional[int] = None):
+        started = time.perf_counter()
+        rows = await super().fetchmany(size)
+        self._profiler.extend(self._statement, time.perf_counter() - started, len(rows))
+        return rows
+
+
+class ProfiledConnection:
+    """Соединение aiosqlite, каждый execute которого пишется в профиль"""
+
+    def __init__(self, conn: aiosqlite.Connection, profiler: QueryProfiler):
+        self._conn = conn
+        self._profiler = profiler
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._conn, name)
+
+    @contextmanager
+    async def execute(self, sql: str, parameters: Optional[Iterable[Any]] = None):
+        return await self._profiled(self._conn.execute, sql, parameters)
+
+    @contextmanager
+    async def executemany(self, sql: str, parameters: Iterable[Iterable[Any]]):
+        return await self._profiled(self._conn.executemany, sql, parameters)
+
+    async def _profiled(self, execute, sql: str, parameters) -> ProfiledCursor:
+        started = time.perf_counter()
+        cursor = await execute(sql, parameters)
+        # До fetch у SELECT rowcount равен -1, строки досчитает курсор
+        statement = self._profiler.record(
+            sql, time.perf_counter() - started, max(cursor.rowcount, 0)
+        )
+        return ProfiledCursor(self._conn, cursor._cursor, self._profiler, statement)
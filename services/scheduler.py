@@ -0,0 +1,235 @@
+import asyncio
+import heapq
+import json
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+JobHandler = Callable[[Any, Dict[str, Any]], Awaitable[None]]
+
+
+class Scheduler:
+    """Отложенные задачи в таблице jobs.
+
+    В памяти держим только кучу (run_at, job_id), данные задачи читаются из
+    базы в момент запуска. Один фоновый цикл ждет ближайшую задачу и
+    забирает созревшие пачками до batch_size. Забранная задача арендуется
+    на lease секунд и удаляется только после успешного выполнения: если
+    процесс упал посреди пачки, при следующем запуске задача выполнится
+    снова. Каждая аренда считается попыткой.
+    """
+
+    def __init__(
+        self,
+        db,
+        batch_size: int = 100,
+        max_attempts: int = 5,
+        retry_delay: float = 60,
+        lease: float = 300,
+    ):
+        self.db = db
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.lease = lease
+        self.bot = None
+        self.fired = 0
+        self.failed = 0
+        self.dropped = 0
+        self._handlers: Dict[str, JobHandler] = {}
+        self._heap: List[Tuple[float, int]] = []
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+
+    def job(self, kind: str):
+        """Декоратор обработчика задач вида kind: handler(bot, payload)"""
+
+        def decorator(handler: JobHandler) -> JobHandler:
+            self._handlers[kind] = handler
+            return handler
+
+        return decorator
+
+    async def start(self, bot):
+        """Загружаем сроки задач из базы и запускаем цикл"""
+        if self._task is not None:
+            return
+        self.bot = bot
+        # Аренды с истекшим сроком остались от упавшего процесса: задачи
+        # возвращаем в очередь, чужие живые аренды ждем до их окончания
+        rows = await self.db._execute(
+            "UPDATE jobs SET locked_until = NULL "
+            "WHERE locked_until <= ? RETURNING job_id",
+            (time.time(),),
+        )
+        if rows:
+            logger.info(f"Возвращено в очередь незавершенных задач: {len(rows)}")
+        async with self.db.pool.reader() as conn:
+            async with conn.execute(
+                "SELECT MAX(run_at, COALESCE(locked_until, 0)), job_id FROM jobs"
+            ) as cursor:
+                self._heap = [tuple(row) for row in await cursor.fetchall()]
+        heapq.heapify(self._heap)
+        logger.info(f"Планировщик запущен, задач в очереди: {len(self._heap)}")
+        self._closing = False
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        """Дожидаемся текущей пачки и останавливаем цикл"""
+        if self._task is None:
+            return
+        self._closing = True
+        self._wakeup.set()
+        await self._task
+        self._task = None
+
+    async def schedule(
+        self,
+        kind: str,
+        delay: float = 0,
+        payload: Optional[Dict[str, Any]] = None,
+        run_at: Optional[float] = None,
+    ) -> int:
+        """Ставим задачу на run_at (или через delay секунд), возвращаем job_id"""
+        if run_at is None:
+            run_at = time.time() + delay
+        rows = await self.db._execute(
+            "INSERT INTO jobs (kind, run_at, payload) VALUES (?, ?, ?) RETURNING job_id",
+            (kind, run_at, json.dumps(payload or {}, ensure_ascii=False)),
+        )
+        job_id = rows[0][0]
+        self._push(run_at, job_id)
+        return job_id
+
+    async def cancel(self, job_id: int) -> bool:
+        """Удаляем задачу; запись в куче останется и будет пропущена"""
+        rows = await self.db._execute(
+            "DELETE FROM jobs WHERE job_id = ? RETURNING job_id", (job_id,)
+        )
+        return bool(rows)
+
+    def _push(self, run_at: float, job_id: int):
+        heapq.heappush(self._heap, (run_at, job_id))
+        # Новая задача раньше той, которую ждет цикл
+        if self._heap[0][1] == job_id:
+            self._wakeup.set()
+
+    async def _run(self):
+        while not self._closing:
+            delay = self._heap[0][0] - time.time() if self._heap else None
+            if delay is None or delay > 0:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            try:
+                await self._fire()
+            except Exception as e:
+                logger.error(f"Ошибка запуска отложенных задач: {e}")
+                await asyncio.sleep(1)
+
+    async def _fire(self) -> int:
+        """Забираем и выполняем пачку созревших задач"""
+        now = time.time()
+        due = []
+        while self._heap and self._heap[0][0] <= now and len(due) < self.batch_size:
+            due.append(heapq.heappop(self._heap))
+
+        # Задачи забираем арендой: отмененные в RETURNING не попадут, а
+        # занятые другим процессом вернем в кучу на конец его аренды
+        ids = [job_id for _, job_id in due]
+        marks = ", ".join("?" * len(ids))
+
+        async def claim(conn):
+            async with conn.execute(
+                "UPDATE jobs SET locked_until = ?, attempts = attempts + 1 "
+                f"WHERE job_id IN ({marks}) "
+                "AND (locked_until IS NULL OR locked_until <= ?) "
+                "RETURNING job_id, kind, payload, attempts",
+                [now + self.lease, *ids, now],
+            ) as cursor:
+                claimed = await cursor.fetchall()
+            async with conn.execute(
+                f"SELECT job_id, locked_until FROM jobs WHERE job_id IN ({marks}) "
+                "AND locked_until > ?",
+                [*ids, now],
+            ) as cursor:
+                leased = await cursor.fetchall()
+            return claimed, leased
+
+        try:
+            rows, leased = await self.db._write(claim)
+        except Exception:
+            for item in due:
+                heapq.heappush(self._heap, item)
+            raise
+        claimed = {row[0] for row in rows}
+        for job_id, locked_until in leased:
+            if job_id not in claimed:
+                self._push(locked_until, job_id)
+
+        results = await asyncio.gather(*(self._call(row) for row in rows))
+        finished = [(job_id,) for job_id, run_at in results if run_at is None]
+        retries = [(run_at, job_id) for job_id, run_at in results if run_at]
+
+        async def op(conn):
+            await conn.executemany("DELETE FROM jobs WHERE job_id = ?", finished)
+            await conn.executemany(
+                "UPDATE jobs SET run_at = ?, locked_until = NULL WHERE job_id = ?",
+                retries,
+            )
+
+        if finished or retries:
+            try:
+                await self.db._write(op)
+            except Exception:
+                # Аренда не снята: задачи повторятся, когда она истечет
+                for job_id, _ in results:
+                    self._push(now + self.lease, job_id)
+                raise
+        for run_at, job_id in retries:
+            self._push(run_at, job_id)
+        return len(rows)
+
+    async def _call(self, row) -> Tuple[int, Optional[float]]:
+        """Выполняем задачу; возвращаем job_id и срок повтора или None"""
+        job_id, kind, payload, attempts = row
+        handler = self._handlers.get(kind)
+        if handler is None:
+            self.dropped += 1
+            logger.error(f"Нет обработчика для задачи {job_id} вида {kind}")
+            return job_id, None
+        # Попытки, прерванные падением процесса, тоже на счету задачи
+        if attempts > self.max_attempts:
+            self.dropped += 1
+            logger.error(
+                f"Задача {job_id} ({kind}) отброшена после {attempts - 1} попыток"
+            )
+            return job_id, None
+        try:
+            await handler(self.bot, json.loads(payload))
+            self.fired += 1
+            return job_id, None
+        except Exception as e:
+            self.failed += 1
+            if attempts >= self.max_attempts:
+                self.dropped += 1
+                logger.error(
+                    f"Задача {job_id} ({kind}) отброшена после {attempts} попыток: {e}"
+                )
+                return job_id, None
+            logger.error(f"Ошибка задачи {job_id} ({kind}), попытка {attempts}: {e}")
+            return job_id, time.time() + self.retry_delay * 2 ** (attempts - 1)
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self._heap),
+            "fired": self.fired,
+            "failed": self.failed,
+            "dropped": self.dropped,
+        }
@@ -0,0 +1,37 @@
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.methods import TelegramMethod
+from aiohttp import FormData
+
+from keyboards.cache import markup_cache
+
+
+class BotSession(AiohttpSession):
+    """HTTP-сессия бота: кэшированные клавиатуры уходят уже готовым JSON"""
+
+    def build_form_data(self, bot: Bot, method: TelegramMethod) -> FormData:
+        markup = getattr(method, "reply_markup", None)
+        if markup is None or not markup_cache.is_cached(markup):
+            return super().build_form_data(bot, method)
+
+        serialized = markup_cache.serialized(markup)
+        if serialized is None:
+            serialized = self.prepare_value(markup, bot=bot, files={})
+            markup_cache.remember(markup, serialized)
+
+        form = FormData(quote_fields=False)
+        files = {}
+        dumped = method.model_dump(warnings=False, exclude={"reply_markup"})
+        for key, value in dumped.items():
+            value = self.prepare_value(value, bot=bot, files=files)
+            if not value:
+                continue
+            form.add_field(key, value)
+        form.add_field("reply_markup", serialized)
+        for key, value in files.items():
+            form.add_field(
+                key,
+                value.read(bot),
+                filename=value.filename or key,
+            )
+        return form
@@ -0,0 +1,144 @@
+import asyncio
+import hmac
+import logging
+import secrets
+import signal
+from contextlib import suppress
+from typing import Optional, Set
+
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+from aiogram.webhook.aiohttp_server import setup_application
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+class WebhookServer:
+    """Прием апдейтов по вебхуку.
+
+    Telegram получает ответ сразу после проверки секрета, а апдейт уходит в
+    диспетчер отдельной задачей: очередь чатов и лимит одновременных
+    обработчиков держит SequentialDispatcher. Когда в работе уже queue_size
+    апдейтов, отвечаем 503, и Telegram повторит доставку позже.
+    """
+
+    def __init__(
+        self,
+        bot: Bot,
+        dp: Dispatcher,
+        url: str,
+        path: str = "/webhook",
+        secret: Optional[str] = None,
+        queue_size: int = 10000,
+        drain_timeout: float = 30,
+    ):
+        self.bot = bot
+        self.dp = dp
+        self.url = url.rstrip("/") + path
+        self.path = path
+        # Без заданного секрета создаем свой: setWebhook все равно вызываем мы
+        self.secret = secret or secrets.token_urlsafe(32)
+        self.queue_size = queue_size
+        self.drain_timeout = drain_timeout
+        self.received = 0
+        self.rejected = 0
+        self.handled = 0
+        self.failed = 0
+        self._pending: Set[asyncio.Task] = set()
+        self._accepting = False
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post(self.path, self.handle)
+        app.on_startup.append(self._on_startup)
+        # Очередь дорабатываем до того, как диспетчер закроет FSM и задачи
+        app.on_shutdown.append(self._on_shutdown)
+        setup_application(app, self.dp, bot=self.bot)
+        return app
+
+    async def handle(self, request: web.Request) -> web.Response:
+        token = request.headers.get(SECRET_HEADER, "")
+        if not hmac.compare_digest(token, self.secret):
+            return web.Response(status=401, text="Unauthorized")
+        if not self._accepting:
+            return web.Response(status=503, text="Shutting down")
+        if len(self._pending) >= self.queue_size:
+            self.rejected += 1
+            return web.Response(status=503, text="Busy")
+        try:
+            update = Update.model_validate(
+                await request.json(loads=self.bot.session.json_loads),
+                context={"bot": self.bot},
+            )
+        except Exception as e:
+            logger.error(f"Некорректный апдейт в вебхуке: {e}")
+            return web.Response(status=400, text="Bad update")
+        task = asyncio.create_task(self._feed(update))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+        self.received += 1
+        return web.json_response({})
+
+    async def _feed(self, update: Update):
+        try:
+            await self.dp.feed_update(self.bot, update)
+            self.handled += 1
+        except Exception as e:
+            self.failed += 1
+            logger.error(f"Ошибка обработки апдейта {update.update_id}: {e}")
+
+    async def _on_startup(self, app: web.Application):
+        self._accepting = True
+        await self.bot.set_webhook(
+            self.url,
+            secret_token=self.secret,
+            allowed_updates=self.dp.resolve_used_update_types(),
+        )
+        logger.info(f"Вебхук установлен: {self.url}")
+
+    async def _on_shutdown(self, app: web.Application):
+        # Вебхук не снимаем: пока бот перезапускается, апдейты ждут в Telegram
+        self._accepting = False
+        if not self._pending:
+            return
+        _, pending = await asyncio.wait(self._pending, timeout=self.drain_timeout)
+        if pending:
+            logger.error(f"Не обработано апдейтов при остановке: {len(pending)}")
+            for task in pending:
+                task.cancel()
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self._pending),
+            "received": self.received,
+            "rejected": self.rejected,
+            "handled": self.handled,
+            "failed": self.failed,
+        }
+
+
+async def wait_for_signal():
+    """Ждем SIGINT или SIGTERM"""
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        # На Windows обработчиков сигналов в цикле событий нет
+        with suppress(NotImplementedError):
+            loop.add_signal_handler(sig, stop.set)
+    await stop.wait()
+
+
+async def run_webhook(server: WebhookServer, host: str, port: int):
+    """Запускаем aiohttp-сервер и ждем сигнала остановки"""
+    runner = web.AppRunner(server.app())
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    logger.info(f"Вебхук слушает {host}:{port}{server.path}")
+    try:
+        await wait_for_signal()
+    finally:
+        await runner.cleanup()
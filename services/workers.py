@@ -0,0 +1,340 @@
+import asyncio
+import hmac
+import json
+import logging
+import multiprocessing
+import os
+import queue
+import secrets
+import signal
+from functools import partial
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+from aiohttp import web
+
+from services.webhook import SECRET_HEADER, wait_for_signal
+
+logger = logging.getLogger(__name__)
+
+# Сообщения во входящей очереди воркера: (вид, данные)
+UPDATE = "update"
+INVALIDATE = "invalidate"
+STOP = "stop"
+
+# Сколько сообщений воркер забирает из очереди за один переход в поток
+RECEIVE_BATCH = 100
+
+AppFactory = Callable[..., Awaitable[Tuple[Bot, Dispatcher, Any]]]
+
+
+def chat_id_of(update: dict) -> int:
+    """Чат апдейта по сырому JSON; для событий без чата — ID пользователя"""
+    for key, event in update.items():
+        if key == "update_id" or not isinstance(event, dict):
+            continue
+        chat = event.get("chat") or (event.get("message") or {}).get("chat")
+        if chat:
+            return chat["id"]
+        user = event.get("from") or event.get("user")
+        if user:
+            return user["id"]
+    return 0
+
+
+def shard(chat_id: int, workers: int) -> int:
+    return chat_id % workers
+
+
+async def bot_app(index: int, workers: int):
+    """Бот, диспетчер и база из loader с теми же обработчиками, что в main.py"""
+    import loader
+    from handlers import register_all_handlers
+    from middlewares import register_all_middlewares
+
+    # Общий лимит Telegram делим между процессами, лимиты чатов — нет:
+    # каждый чат обслуживает ровно один воркер
+    loader.flood_control.global_rate /= workers
+    # У каждого воркера свои метрики и свой порт: METRICS_PORT + 1 + index
+    if loader.metrics_server:
+        loader.metrics_server.port += 1 + index
+    bot, dp, db = await loader.setup()
+    register_all_middlewares(dp)
+    register_all_handlers(dp)
+    return bot, dp, db
+
+
+class Worker:
+    """Процесс-обработчик: свои Bot, Dispatcher, Database и кэши.
+
+    Апдейты одного чата выполняются строго по очереди, разных чатов —
+    параллельно: очередь чатов держит SequentialDispatcher из factory.
+    """
+
+    def __init__(
+        self,
+        index: int,
+        inboxes: list,
+        factory: AppFactory,
+        options: Dict[str, Any],
+        max_pending: int = 1000,
+    ):
+        self.index = index
+        self.inboxes = inboxes
+        self.inbox = inboxes[index]
+        self.factory = factory
+        self.options = options
+        self.max_pending = max_pending
+        self.bot: Optional[Bot] = None
+        self.dp: Optional[Dispatcher] = None
+        self.db = None
+        self._parent = os.getppid()
+        self._pending: Set[asyncio.Task] = set()
+
+    async def run(self):
+        self.bot, self.dp, self.db = await self.factory(
+            self.index, len(self.inboxes), **self.options
+        )
+        if self.db is not None:
+            self.db.menu_cache.on_invalidate = partial(self._broadcast, "menu")
+        workflow_data = {"bot": self.bot, **self.dp.workflow_data}
+        await self.dp.emit_startup(**workflow_data)
+        logger.info(f"Воркер {self.index} запущен")
+
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                while len(self._pending) >= self.max_pending:
+                    await asyncio.wait(
+                        self._pending, return_when=asyncio.FIRST_COMPLETED
+                    )
+                messages = await loop.run_in_executor(None, self._receive)
+                if not self._dispatch(messages):
+                    break
+        finally:
+            if self._pending:
+                await asyncio.wait(self._pending)
+            await self.dp.emit_shutdown(**workflow_data)
+            if self.db is not None:
+                await self.db.close()
+            await self.bot.session.close()
+            logger.info(f"Воркер {self.index} остановлен")
+
+    def _receive(self) -> list:
+        """Блокирующее чтение очереди в потоке: первое сообщение и все готовые"""
+        try:
+            messages = [self.inbox.get(timeout=1)]
+        except queue.Empty:
+            # Входной процесс умер, не прислав STOP
+            if os.getppid() != self._parent:
+                return [(STOP, None)]
+            return []
+        while len(messages) < RECEIVE_BATCH:
+            try:
+                messages.append(self.inbox.get_nowait())
+            except queue.Empty:
+                break
+        return messages
+
+    def _dispatch(self, messages: list) -> bool:
+        """Раскладываем сообщения очереди; False — пора останавливаться"""
+        for kind, payload in messages:
+            if kind == UPDATE:
+                # chat_id нужен только входному процессу для раскладки
+                self._submit(payload[1])
+            elif kind == INVALIDATE and self.db is not None:
+                self.db.menu_cache.invalidate(notify=False)
+            elif kind == STOP:
+                return False
+        return True
+
+    def _submit(self, raw):
+        task = asyncio.create_task(self._handle(raw))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def _handle(self, raw):
+        try:
+            update = Update.model_validate_json(raw, context={"bot": self.bot})
+            await self.dp.feed_update(self.bot, update)
+        except Exception as e:
+            logger.error(f"Ошибка обработки апдейта в воркере {self.index}: {e}")
+
+    def _broadcast(self, cache: str):
+        """Сообщаем остальным воркерам, что кэш устарел"""
+        loop = asyncio.get_running_loop()
+        for index, inbox in enumerate(self.inboxes):
+            if index != self.index:
+                # Очередь может быть полна: кладем из потока, не блокируя цикл
+                loop.run_in_executor(None, inbox.put, (INVALIDATE, cache))
+
+
+def worker_main(index: int, inboxes: list, factory: AppFactory, options: dict):
+    """Точка входа процесса-обработчика"""
+    # Остановку присылает входной процесс, Ctrl+C в терминале ее не ломает
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(processName)s - %(name)s - %(levelname)s - %(message)s",
+        force=True,
+    )
+    asyncio.run(Worker(index, inboxes, factory, options).run())
+
+
+class WorkerPool:
+    """Процессы-обработчики и раскладка апдейтов по ним по chat_id"""
+
+    def __init__(
+        self,
+        workers: int,
+        factory: AppFactory = bot_app,
+        options: Optional[Dict[str, Any]] = None,
+        queue_size: int = 10000,
+    ):
+        context = multiprocessing.get_context("spawn")
+        self.inboxes = [context.Queue(queue_size) for _ in range(workers)]
+        self.processes = [
+            context.Process(
+                target=worker_main,
+                args=(index, self.inboxes, factory, options or {}),
+                name=f"worker-{index}",
+            )
+            for index in range(workers)
+        ]
+        self.routed = [0] * workers
+        self.rejected = 0
+
+    def start(self):
+        for process in self.processes:
+            process.start()
+
+    def submit_nowait(self, chat_id: int, raw) -> bool:
+        """Кладем апдейт в очередь воркера чата; False, если очередь полна"""
+        index = shard(chat_id, len(self.inboxes))
+        try:
+            self.inboxes[index].put_nowait((UPDATE, (chat_id, raw)))
+        except queue.Full:
+            self.rejected += 1
+            return False
+        self.routed[index] += 1
+        return True
+
+    async def submit(self, chat_id: int, raw):
+        """Как submit_nowait, но при полной очереди ждем места"""
+        if self.submit_nowait(chat_id, raw):
+            return
+        index = shard(chat_id, len(self.inboxes))
+        await asyncio.get_running_loop().run_in_executor(
+            None, self.inboxes[index].put, (UPDATE, (chat_id, raw))
+        )
+        self.routed[index] += 1
+
+    async def stop(self, timeout: float = 30):
+        """Воркеры дорабатывают очередь и останавливаются"""
+        loop = asyncio.get_running_loop()
+        for inbox in self.inboxes:
+            await loop.run_in_executor(None, inbox.put, (STOP, None))
+        for process in self.processes:
+            await loop.run_in_executor(None, process.join, timeout)
+            if process.is_alive():
+                logger.error(f"{process.name} не остановился за {timeout} с")
+                process.terminate()
+
+    def stats(self) -> dict:
+        return {"routed": list(self.routed), "rejected": self.rejected}
+
+
+async def poll(bot: Bot, pool: WorkerPool, allowed_updates: List[str]):
+    """Long polling во входном процессе: апдейты уходят воркерам"""
+    offset = None
+    while True:
+        try:
+            updates = await bot.get_updates(
+                offset=offset, timeout=30, allowed_updates=allowed_updates
+            )
+        except Exception as e:
+            logger.error(f"Ошибка получения апдейтов: {e}")
+            await asyncio.sleep(1)
+            continue
+        for update in updates:
+            data = update.model_dump(mode="json", exclude_unset=True, by_alias=True)
+            await pool.submit(chat_id_of(data), json.dumps(data))
+            offset = update.update_id + 1
+
+
+class IngressWebhook:
+    """Вебхук входного процесса: проверяет секрет и раздает тело воркерам"""
+
+    def __init__(
+        self,
+        bot: Bot,
+        pool: WorkerPool,
+        url: str,
+        secret: Optional[str],
+        allowed_updates: List[str],
+        path: str = "/webhook",
+    ):
+        self.bot = bot
+        self.pool = pool
+        self.url = url.rstrip("/") + path
+        self.path = path
+        self.secret = secret or secrets.token_urlsafe(32)
+        self.allowed_updates = allowed_updates
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post(self.path, self.handle)
+        app.on_startup.append(self._on_startup)
+        return app
+
+    async def handle(self, request: web.Request) -> web.Response:
+        token = request.headers.get(SECRET_HEADER, "")
+        if not hmac.compare_digest(token, self.secret):
+            return web.Response(status=401, text="Unauthorized")
+        body = await request.read()
+        try:
+            chat_id = chat_id_of(json.loads(body))
+        except ValueError:
+            return web.Response(status=400, text="Bad update")
+        # Разбор апдейта целиком — работа воркера, здесь только маршрут
+        if not self.pool.submit_nowait(chat_id, body):
+            return web.Response(status=503, text="Busy")
+        return web.json_response({})
+
+    async def _on_startup(self, app: web.Application):
+        await self.bot.set_webhook(
+            self.url, secret_token=self.secret, allowed_updates=self.allowed_updates
+        )
+        logger.info(f"Вебхук установлен: {self.url}")
+
+
+async def run_ingress(
+    bot: Bot,
+    pool: WorkerPool,
+    allowed_updates: List[str],
+    webhook: Optional[IngressWebhook] = None,
+    host: str = "0.0.0.0",
+    port: int = 8080,
+):
+    """Принимаем апдейты поллингом или вебхуком до SIGINT/SIGTERM"""
+    pool.start()
+    try:
+        if webhook is None:
+            task = asyncio.create_task(poll(bot, pool, allowed_updates))
+            await wait_for_signal()
+            # Апдейты, не отданные воркерам, Telegram пришлет снова:
+            # offset подтверждается только следующим getUpdates
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+        else:
+            runner = web.AppRunner(webhook.app())
+            await runner.setup()
+            await web.TCPSite(runner, host, port).start()
+            logger.info(f"Вебхук слушает {host}:{port}{webhook.path}")
+            try:
+                await wait_for_signal()
+            finally:
+                await runner.cleanup()
+    finally:
+        await pool.stop()
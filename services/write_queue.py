@@ -0,0 +1,133 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, List, Optional, Tuple
+
+import aiosqlite
+
+from services.pool import ConnectionPool
+
+logger = logging.getLogger(__name__)
+
+WriteOp = Callable[[aiosqlite.Connection], Awaitable[Any]]
+
+
+class WriteQueue:
+    """Групповой коммит: записи за несколько миллисекунд уходят одной транзакцией"""
+
+    def __init__(
+        self, pool: ConnectionPool, max_batch: int = 64, max_latency: float = 0.005
+    ):
+        self.pool = pool
+        self.max_batch = max_batch
+        self.max_latency = max_latency
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+        # Счетчики для мониторинга
+        self.batches = 0
+        self.writes = 0
+        self.failed_writes = 0
+        self.max_batch_seen = 0
+        self.commit_time = 0.0
+
+    async def start(self):
+        """Запускаем задачу писателя"""
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Дописываем очередь и останавливаем писателя"""
+        if not self._task:
+            return
+        await self._queue.put(None)
+        await self._task
+        self._task = None
+
+    async def submit(self, op: WriteOp):
+        """Ставим op(conn) в очередь и ждем, пока его пачка будет записана"""
+        if not self._task:
+            raise ConnectionError("Очередь записи не запущена")
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((op, future))
+        return await future
+
+    async def _collect(self, first) -> Tuple[List[tuple], bool]:
+        """Собираем пачку, пока не истекло окно ожидания или не набран максимум"""
+        batch = [first]
+        stopping = False
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_latency
+        while len(batch) < self.max_batch:
+            try:
+                item = self._queue.get_nowait()
+            except asyncio.QueueEmpty:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            if item is None:
+                stopping = True
+                break
+            batch.append(item)
+        return batch, stopping
+
+    async def _run(self):
+        stopping = False
+        while not stopping:
+            first = await self._queue.get()
+            if first is None:
+                break
+            batch, stopping = await self._collect(first)
+            await self._flush(batch)
+
+    async def _flush(self, batch: List[tuple]):
+        results = []
+        try:
+            async with self.pool.transaction() as conn:
+                for op, _ in batch:
+                    # Savepoint изолирует ошибку одной записи от остальной пачки
+                    await conn.execute("SAVEPOINT write_op")
+                    try:
+                        results.append((True, await op(conn)))
+                    except Exception as e:
+                        await conn.execute("ROLLBACK TO write_op")
+                        results.append((False, e))
+                        self.failed_writes += 1
+                    await conn.execute("RELEASE write_op")
+                started = time.perf_counter()
+            self.commit_time += time.perf_counter() - started
+        except Exception as e:
+            logger.error(f"Ошибка группового коммита ({len(batch)} записей): {e}")
+            results = [(False, e)] * len(batch)
+
+        self.batches += 1
+        self.writes += len(batch)
+        self.max_batch_seen = max(self.max_batch_seen, len(batch))
+
+        for (_, future), (ok, value) in zip(batch, results):
+            if future.done():
+                continue
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
+
+    def stats(self) -> dict:
+        """Сводка по пачкам и времени коммита"""
+        return {
+            "batches": self.batches,
+            "writes": self.writes,
+            "failed_writes": self.failed_writes,
+            "avg_batch_size": (
+                round(self.writes / self.batches, 2) if self.batches else 0
+            ),
+            "max_batch_size": self.max_batch_seen,
+            "avg_commit_ms": (
+                round(self.commit_time / self.batches * 1000, 3) if self.batches else 0
+            ),
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+        }
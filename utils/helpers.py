@@ -15,15 +15,15 @@ def format_cart(cart_items):
     return text, total
 
 
-def format_order(order_items):
-    if not order_items:
+def format_order(order_details):
+    if not order_details or not order_details.get("order"):
         return "Информация о заказе недоступна"
 
-    order = order_items[0]
-    text = f"📦 <b>Заказ #{order['id']}</b>\n"
+    order = order_details["order"]
+    text = f"📦 <b>Заказ #{order['order_id']}</b>\n"
     text += f"📅 {order['created_at']}\n"
     text += f"🚚 Способ: {order['delivery_type']}\n"
-    text += f"📞 Телефон: {order['phone_number']}\n"
+    text += f"📞 Телефон: {order['phone']}\n"
 
     if order["delivery_type"] == "delivery":
         text += f"🏠 Адрес: {order['address']}\n"
@@ -31,7 +31,7 @@ def format_order(order_items):
     text += "\n<b>Состав заказа:</b>\n"
 
     items_text = []
-    for item in order_items:
+    for item in order_details["items"]:
         items_text.append(
             f"• {item['name']} x{item['quantity']} = {item['price'] * item['quantity']} руб."
         )
@@ -52,5 +52,42 @@ def is_current_month(date_str):
     return date_obj.month == now.month and date_obj.year == now.year
 
 
-async def is_admin(user_id):
+def is_admin(user_id):
     return user_id in list(map(int, os.getenv("ADMIN_IDS").split(",")))
+
+
+def format_metrics(registry, top=15):
+    """Краткая сводка метрик для админа: самые нагруженные обработчики"""
+    handlers = sorted(
+        (stats for stats in registry.handlers.values() if stats.count),
+        key=lambda stats: stats.latency.sum,
+        reverse=True,
+    )
+    text = "📈 <b>Обработчики</b> (вызовы, ошибки, p95, в среднем БД / API):\n"
+    for stats in handlers[:top]:
+        text += (
+            f"• {stats.router}.{stats.name}: {stats.count}, {stats.errors} ош., "
+            f"p95 ≤ {stats.latency.percentile(95) * 1000:g} мс, "
+            f"{stats.db / stats.count * 1000:.1f} / "
+            f"{stats.api / stats.count * 1000:.1f} мс\n"
+        )
+    if not handlers:
+        text += "• пока нет вызовов\n"
+
+    text += "\n🗄 <b>База</b>:\n"
+    for kind, histogram in registry.db.items():
+        text += (
+            f"• {kind}: {histogram.count}, "
+            f"p95 ≤ {histogram.percentile(95) * 1000:g} мс\n"
+        )
+
+    text += "\n📨 <b>Bot API</b>:\n"
+    for method, histogram in sorted(
+        registry.api.items(), key=lambda item: item[1].count, reverse=True
+    )[:5]:
+        errors = registry.api_errors.get(method, 0)
+        text += (
+            f"• {method}: {histogram.count}, {errors} ош., "
+            f"p95 ≤ {histogram.percentile(95) * 1000:g} мс\n"
+        )
+    return text
@@ -0,0 +1,71 @@
+from typing import List, Optional, Sequence, Tuple
+
+from aiogram.types import InlineKeyboardButton
+
+# Telegram принимает callback_data не длиннее 64 байт
+CALLBACK_LIMIT = 64
+CURSOR_SEPARATOR = "~"
+
+NEXT = "n"
+PREV = "p"
+
+
+class Page:
+    """Страница выборки с курсорами соседних страниц"""
+
+    def __init__(
+        self,
+        rows: list,
+        next_cursor: Optional[tuple] = None,
+        prev_cursor: Optional[tuple] = None,
+    ):
+        self.rows = rows
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+
+def encode_cursor(cursor: Optional[Sequence]) -> str:
+    if not cursor:
+        return ""
+    return CURSOR_SEPARATOR.join(str(value) for value in cursor)
+
+
+def decode_cursor(raw: str) -> Optional[tuple]:
+    if not raw:
+        return None
+    return tuple(
+        int(value) if value.lstrip("-").isdigit() else value
+        for value in raw.split(CURSOR_SEPARATOR)
+    )
+
+
+def page_callback(prefix: str, direction: str, cursor: Optional[Sequence]) -> str:
+    """callback_data вида prefix:n:курсор"""
+    data = f"{prefix}:{direction}:{encode_cursor(cursor)}"
+    if len(data.encode()) > CALLBACK_LIMIT:
+        raise ValueError(f"callback_data длиннее {CALLBACK_LIMIT} байт: {data}")
+    return data
+
+
+def parse_page_callback(data: str) -> Tuple[str, Optional[tuple]]:
+    """Направление и курсор из callback_data страницы"""
+    _, direction, raw = data.split(":", 2)
+    return direction, decode_cursor(raw)
+
+
+def pagination_row(prefix: str, page: Page) -> List[InlineKeyboardButton]:
+    """Кнопки «назад» и «вперед» для страницы, если соседние страницы есть"""
+    row = []
+    if page.prev_cursor:
+        row.append(
+            InlineKeyboardButton(
+                text="⬅️", callback_data=page_callback(prefix, PREV, page.prev_cursor)
+            )
+        )
+    if page.next_cursor:
+        row.append(
+            InlineKeyboardButton(
+                text="➡️", callback_data=page_callback(prefix, NEXT, page.next_cursor)
+            )
+        )
+    return row